@@ -0,0 +1,34 @@
+import gymnasium as gym
+import raccoon_gym
+import torch as th
+
+from raccoon_gym.datasets import DatasetLoader, DatasetRecorder
+
+ENV = "RaccoonKr16ReachJoints-v1"
+DATASET = "datasets/kr16_reach_random"
+N_STEPS = 200_000
+
+
+if __name__ == "__main__":
+    # random policy, as in kr16_reach_no_policy.py, the transitions are written in the background
+    env = DatasetRecorder(gym.make(ENV, headless=True), DATASET, shard_size=50_000)
+    observation, info = env.reset(seed=0)
+    for _ in range(N_STEPS):
+        observation, reward, terminated, truncated, info = env.step(env.action_space.sample())
+        if terminated or truncated:
+            observation, info = env.reset()
+    env.close()
+
+    # behavior cloning on the recorded transitions, read in shuffled batches from the memory-mapped shards
+    loader = DatasetLoader([DATASET], batch_size=256, columns=["observation", "desired_goal", "action"], seed=0)
+    n_inputs = env.observation_space["observation"].shape[0] + env.observation_space["desired_goal"].shape[0]
+    policy = th.nn.Sequential(th.nn.Linear(n_inputs, 256), th.nn.ReLU(), th.nn.Linear(256, env.action_space.shape[0]))
+    optimizer = th.optim.Adam(policy.parameters(), lr=1e-3)
+    for epoch in range(5):
+        for batch in loader:
+            inputs = th.cat([th.as_tensor(batch["observation"]), th.as_tensor(batch["desired_goal"])], dim=1)
+            loss = th.nn.functional.mse_loss(policy(inputs), th.as_tensor(batch["action"]))
+            optimizer.zero_grad()
+            loss.backward()
+            optimizer.step()
+        print(f"epoch {epoch}: loss {loss.item():.4f}")
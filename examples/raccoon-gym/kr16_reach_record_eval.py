@@ -0,0 +1,41 @@
+from dataclasses import replace
+
+import gymnasium as gym
+import raccoon_gym
+from sb3_contrib import TQC
+from stable_baselines3.common.env_util import make_vec_env
+from stable_baselines3.common.vec_env import SubprocVecEnv
+
+from raccoon_gym.rendering import VideoRecorder, tile_frames
+
+ENV = "RaccoonKr16Reach-v1"
+N_ENVS = 4
+N_STEPS = 500
+MODEL_PATH = "logs/tqc_kuka_reach"
+
+
+def lower_resolution(env):
+    # 240x160 frames without shadows render about 20 times faster than the default 720x480
+    env.unwrapped.camera = replace(env.unwrapped.camera, width=240, height=160, shadow=False)
+    return env
+
+
+if __name__ == "__main__":
+    # every subprocess renders its own frame, in parallel
+    envs = make_vec_env(
+        ENV,
+        n_envs=N_ENVS,
+        env_kwargs=dict(control_type="joints"),
+        wrapper_class=lower_resolution,
+        vec_env_cls=SubprocVecEnv,
+    )
+    model = TQC.load(MODEL_PATH, env=envs)
+
+    obs = envs.reset()
+    # frames are encoded in a background thread, the loop only waits for the rendering
+    with VideoRecorder("kr16_reach_eval.mp4", fps=envs.get_attr("metadata")[0]["render_fps"]) as recorder:
+        for _ in range(N_STEPS):
+            action, _ = model.predict(obs, deterministic=True)
+            obs, reward, done, info = envs.step(action)
+            recorder.add_frame(tile_frames(envs.get_images()))
+    envs.close()
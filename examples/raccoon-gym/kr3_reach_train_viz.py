@@ -14,7 +14,7 @@ OUTPUT_FILE = "{}-ddpg-{}".format(ENV, datetime.now().strftime("%y%m%dT%H%M"))
 BASE_PATH = "logs"
 TIMESTAMP = datetime.now().strftime("%Y%m%d%H%M%S")
 
-env = gym.make(ENV, control_type="joints")
+env = gym.make(ENV, control_type="joints", headless=True)
 # model = DDPG(policy="MultiInputPolicy", env=env, verbose=1)
 
 model = TQC(
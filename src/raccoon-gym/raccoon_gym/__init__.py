@@ -1,109 +1,37 @@
-import os
-
 from gymnasium.envs.registration import register
 
+from raccoon_gym.envs.specs import ROBOT_SPECS, RobotSpec
+
 __version__ = "0.0.1"
 
 ENV_IDS = []
 
-# KUKA KR300 R2500 Ultra
-for task in ["Reach"]:
-    for reward_type in ["sparse", "dense"]:
-        for control_type in ["ee", "joints"]:
-            reward_suffix = "Dense" if reward_type == "dense" else ""
-            control_suffix = "Joints" if control_type == "joints" else ""
-            env_id = f"RaccoonKr300R2500Ultra{task}{control_suffix}{reward_suffix}-v1"
-
-            register(
-                id=env_id,
-                entry_point=f"raccoon_gym.envs:Kr300R2500Ultra{task}Env",
-                kwargs={"reward_type": reward_type, "control_type": control_type},
-                max_episode_steps=100
-            )
-
-            ENV_IDS.append(env_id)
-
-# KUKA KR210
-for task in ["Reach"]:
-    for reward_type in ["sparse", "dense"]:
-        for control_type in ["ee", "joints"]:
-            reward_suffix = "Dense" if reward_type == "dense" else ""
-            control_suffix = "Joints" if control_type == "joints" else ""
-            env_id = f"RaccoonKr16{task}{control_suffix}{reward_suffix}-v1"
-
-            register(
-                id=env_id,
-                entry_point=f"raccoon_gym.envs:Kr16{task}Env",
-                kwargs={"reward_type": reward_type, "control_type": control_type},
-                max_episode_steps=100
-            )
-
-            ENV_IDS.append(env_id)
-
-# KUKA KR210
-for task in ["Reach"]:
-    for reward_type in ["sparse", "dense"]:
-        for control_type in ["ee", "joints"]:
-            reward_suffix = "Dense" if reward_type == "dense" else ""
-            control_suffix = "Joints" if control_type == "joints" else ""
-            env_id = f"RaccoonKr210{task}{control_suffix}{reward_suffix}-v1"
-
-            register(
-                id=env_id,
-                entry_point=f"raccoon_gym.envs:Kr210{task}Env",
-                kwargs={"reward_type": reward_type, "control_type": control_type},
-                max_episode_steps=100
-            )
-
-            ENV_IDS.append(env_id)
-
-# KUKA KR3
-for task in ["Reach"]:
-    for reward_type in ["sparse", "dense"]:
-        for control_type in ["ee", "joints"]:
-            reward_suffix = "Dense" if reward_type == "dense" else ""
-            control_suffix = "Joints" if control_type == "joints" else ""
-            env_id = f"RaccoonKr3{task}{control_suffix}{reward_suffix}-v1"
-
-            register(
-                id=env_id,
-                entry_point=f"raccoon_gym.envs:Kr3{task}Env",
-                kwargs={"reward_type": reward_type, "control_type": control_type},
-                max_episode_steps=100
-            )
 
-            ENV_IDS.append(env_id)
+def register_robot(spec: RobotSpec) -> None:
+    """Add a robot to `ROBOT_SPECS` and register its environments.
 
-# Mitsubishi RV7F
-for task in ["Reach"]:
-    for reward_type in ["sparse", "dense"]:
-        for control_type in ["ee", "joints"]:
-            reward_suffix = "Dense" if reward_type == "dense" else ""
-            control_suffix = "Joints" if control_type == "joints" else ""
-            env_id = f"RaccoonRv7f{task}{control_suffix}{reward_suffix}-v1"
+    The ids are "<env_name><task><control><reward>-v1", e.g. "RaccoonKr16ReachJointsDense-v1".
 
-            register(
-                id=env_id,
-                entry_point=f"raccoon_gym.envs:Rv7f{task}Env",
-                kwargs={"reward_type": reward_type, "control_type": control_type},
-                max_episode_steps=100
-            )
+    Args:
+        spec (RobotSpec): Description of the robot.
+    """
+    ROBOT_SPECS[spec.name] = spec
+    for task in ["Reach"]:
+        for reward_type in ["sparse", "dense"]:
+            for control_type in ["ee", "joints"]:
+                reward_suffix = "Dense" if reward_type == "dense" else ""
+                control_suffix = "Joints" if control_type == "joints" else ""
+                env_id = f"{spec.env_name}{task}{control_suffix}{reward_suffix}-v1"
 
-            ENV_IDS.append(env_id)
+                register(
+                    id=env_id,
+                    entry_point=f"raccoon_gym.envs.raccoon_env:{task}Env",
+                    kwargs={"robot": spec.name, "reward_type": reward_type, "control_type": control_type},
+                    max_episode_steps=100,
+                )
 
-# Raccoon West RCCNWestRobotReachEnv
-for task in ["Reach"]:
-    for reward_type in ["sparse", "dense"]:
-        for control_type in ["ee", "joints"]:
-            reward_suffix = "Dense" if reward_type == "dense" else ""
-            control_suffix = "Joints" if control_type == "joints" else ""
-            env_id = f"RCCNWestRobot{task}{control_suffix}{reward_suffix}-v1"
+                ENV_IDS.append(env_id)
 
-            register(
-                id=env_id,
-                entry_point=f"raccoon_gym.envs:RCCNWestRobot{task}Env",
-                kwargs={"reward_type": reward_type, "control_type": control_type},
-                max_episode_steps=100
-            )
 
-            ENV_IDS.append(env_id)
+for spec in list(ROBOT_SPECS.values()):
+    register_robot(spec)
@@ -0,0 +1,405 @@
+"""Asynchronous actor/learner training of the off-policy algorithms: the envs step while the networks train.
+
+`raccoon_gym.train` alternates between stepping the envs and updating the networks, so that one always waits for the
+other. Here, `n_actors` processes each step a `DummyVecEnv` of raccoon envs with a copy of the policy, and the main
+process, the learner, trains on their transitions without waiting for them:
+
+- the actors send every finished episode to the learner through a bounded queue, and the learner adds it to the
+  replay buffer of the model, e.g. `HerReplayBuffer` or `CompactHerReplayBuffer`. The buffer has a single env: the
+  episodes are added whole, one after the other, so that HER relabels within episodes although the actors do not
+  step in sync;
+- every `publish_freq` gradient steps, the learner writes the parameters of the actor network to a shared memory
+  block, under a version counter. Every `sync_freq` steps, the actors copy them if the version changed, and copy again
+  if the learner wrote them meanwhile;
+- the learner publishes the number of steps it received: until `learning_starts`, the actors take random actions.
+
+The queue holds at most `max_queued_episodes` episodes: when the learner falls behind, the actors wait, which bounds
+the lag of their policy. `max_replay_ratio` bounds the gradient steps per received step, e.g. 1 as `raccoon_gym.train`
+with the default `train_freq` and `gradient_steps`. By default, the learner trains continuously.
+
+The checkpoints, the curriculum state and the logs are the ones of `raccoon_gym.train`, plus "async/policy_lag", the
+mean number of weight versions the actors of the last episodes were behind the learner. `normalize` is not supported,
+the actors would need the running statistics of the learner.
+
+Usage:
+    python -m raccoon_gym.train --env-id RaccoonKr16Reach-v1 --n-actors 4
+"""
+import multiprocessing as mp
+import os
+import queue as queue_module
+import tempfile
+import time
+from collections import deque
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from raccoon_gym.evaluate import algo_class
+from raccoon_gym.train import load_hyperparams, run_name
+
+OFF_POLICY_ALGOS = ("tqc", "sac", "td3", "ddpg")
+
+
+class _SharedWeights:
+    """Flat float32 parameters of the actor network, written by the learner and read by the actors.
+
+    The version counter is odd while the learner writes: a reader copies the parameters, then checks that the counter
+    did not change. The second slot of the header is the number of steps the learner received.
+
+    Args:
+        n_params (int): Number of parameters.
+        name (str, optional): Name of the block to attach to. Defaults to None, a new block.
+    """
+
+    def __init__(self, n_params: int, name: Optional[str] = None) -> None:
+        self._owner = name is None
+        if self._owner:
+            self._block = shared_memory.SharedMemory(create=True, size=16 + 4 * n_params)
+        else:
+            self._block = shared_memory.SharedMemory(name=name)
+        self._header = np.ndarray((2,), dtype=np.int64, buffer=self._block.buf)
+        self._vector = np.ndarray((n_params,), dtype=np.float32, buffer=self._block.buf, offset=16)
+        if self._owner:
+            self._header[:] = 0
+
+    @property
+    def name(self) -> str:
+        return self._block.name
+
+    @property
+    def version(self) -> int:
+        return int(self._header[0]) // 2
+
+    @property
+    def n_timesteps(self) -> int:
+        return int(self._header[1])
+
+    @n_timesteps.setter
+    def n_timesteps(self, value: int) -> None:
+        self._header[1] = value
+
+    def publish(self, vector: np.ndarray) -> None:
+        self._header[0] += 1
+        self._vector[:] = vector
+        self._header[0] += 1
+
+    def read(self, out: np.ndarray, version: int) -> int:
+        """Copy the parameters into `out` if they are newer than `version`.
+
+        Returns:
+            int: The version of `out`.
+        """
+        while True:
+            counter = int(self._header[0])
+            if counter % 2:
+                time.sleep(0)  # the learner is writing
+                continue
+            if counter // 2 == version:
+                return version
+            out[:] = self._vector
+            if int(self._header[0]) == counter:
+                return counter // 2
+
+    def close(self) -> None:
+        self._header = self._vector = None
+        self._block.close()
+        if self._owner:
+            self._block.unlink()
+
+
+def _synced_module(policy):
+    # the actors only run the actor network, e.g. without the critics of SAC and TQC
+    return getattr(policy, "actor", policy)
+
+
+def _actor(
+    index: int,
+    env_id: str,
+    env_kwargs: Dict[str, Any],
+    n_envs: int,
+    seed: int,
+    policy_class: type,
+    policy_path: str,
+    weights_name: str,
+    n_params: int,
+    episodes_queue: mp.Queue,
+    stop: Any,
+    sync_freq: int,
+    learning_starts: int,
+    exploration_noise: float,
+) -> None:
+    import torch as th
+    from stable_baselines3.common.env_util import make_vec_env
+    from stable_baselines3.common.vec_env import DummyVecEnv
+    from torch.nn.utils import vector_to_parameters
+
+    import raccoon_gym  # noqa: F401, registers the envs
+
+    th.set_num_threads(1)  # the CPUs go to the other actors and to the learner
+    th.manual_seed(seed)
+    envs = make_vec_env(env_id, n_envs=n_envs, seed=seed, env_kwargs=env_kwargs, vec_env_cls=DummyVecEnv)
+    envs.action_space.seed(seed)
+    rng = np.random.default_rng(seed)
+    policy = policy_class.load(policy_path, device="cpu")
+    policy.set_training_mode(False)
+    parameters = list(_synced_module(policy).parameters())
+    weights = _SharedWeights(n_params, name=weights_name)
+    vector = np.empty(n_params, dtype=np.float32)
+    version = -1
+
+    observation = envs.reset()
+    episodes = [_new_episode(observation, i) for i in range(n_envs)]
+    n_steps = 0
+    try:
+        while not stop.is_set():
+            if n_steps % sync_freq == 0:
+                new_version = weights.read(vector, version)
+                if new_version != version:
+                    version = new_version
+                    with th.no_grad():
+                        vector_to_parameters(th.as_tensor(vector), parameters)
+            if weights.n_timesteps < learning_starts:
+                actions = np.array([envs.action_space.sample() for _ in range(n_envs)])
+            else:
+                actions, _ = policy.predict(observation, deterministic=False)
+                if exploration_noise > 0:
+                    actions = actions + rng.normal(0.0, exploration_noise, actions.shape)
+                    actions = np.clip(actions, envs.action_space.low, envs.action_space.high)
+            observation, rewards, dones, infos = envs.step(actions)
+            n_steps += 1
+            for i, episode in enumerate(episodes):
+                episode["action"].append(actions[i])
+                episode["reward"].append(rewards[i])
+                if not dones[i]:
+                    for key, values in episode["observation"].items():
+                        values.append(observation[key][i])
+                    continue
+                for key, values in episode["observation"].items():
+                    values.append(infos[i]["terminal_observation"][key])
+                payload = _pack(episode, infos[i], version)
+                while not stop.is_set():
+                    try:
+                        episodes_queue.put(payload, timeout=0.1)
+                        break
+                    except queue_module.Full:
+                        continue
+                episodes[i] = _new_episode(observation, i)
+    finally:
+        # exit without waiting for the learner to read the last episodes
+        episodes_queue.cancel_join_thread()
+        envs.close()
+        weights.close()
+
+
+def _new_episode(observation: Dict[str, np.ndarray], i: int) -> Dict[str, Any]:
+    return {"observation": {key: [value[i]] for key, value in observation.items()}, "action": [], "reward": []}
+
+
+def _pack(episode: Dict[str, Any], info: Dict[str, Any], version: int) -> Dict[str, Any]:
+    return {
+        "observation": {key: np.stack(values) for key, values in episode["observation"].items()},
+        "action": np.stack(episode["action"]),
+        "reward": np.array(episode["reward"], dtype=np.float32),
+        "truncated": bool(info.get("TimeLimit.truncated", False)),
+        "is_success": bool(info.get("is_success", False)),
+        "episode": info.get("episode"),  # Monitor statistics
+        "version": version,
+    }
+
+
+def _drain(episodes_queue: mp.Queue, block: bool, max_episodes: int) -> List[Dict[str, Any]]:
+    episodes = []
+    try:
+        if block:
+            episodes.append(episodes_queue.get(timeout=1.0))
+        while len(episodes) < max_episodes:
+            episodes.append(episodes_queue.get_nowait())
+    except queue_module.Empty:
+        pass
+    return episodes
+
+
+def train_async(
+    env_id: str,
+    algo: str = "tqc",
+    hyperparams: Optional[str] = None,
+    seed: int = 0,
+    log_dir: str = "logs",
+    n_timesteps: Optional[int] = None,
+    n_actors: int = 2,
+    n_envs_per_actor: Optional[int] = None,
+    sync_freq: int = 10,
+    publish_freq: int = 10,
+    max_replay_ratio: Optional[float] = None,
+    max_queued_episodes: Optional[int] = None,
+    exploration_noise: float = 0.1,
+    checkpoint_freq: int = 10_000,
+    log_interval: int = 100,
+    cpus: Optional[Sequence[int]] = None,
+    start_method: Optional[str] = None,
+    verbose: int = 1,
+) -> str:
+    """Train one run with asynchronous actors.
+
+    Args:
+        env_id (str): Registered id, and key of the hyperparameters.
+        algo (str, optional): Off-policy algorithm, one of `OFF_POLICY_ALGOS`. Defaults to "tqc".
+        hyperparams (str, optional): YAML file. Defaults to "hyperparams/<algo>.yml".
+        seed (int, optional): Seed of the model, of the env of the learner, and of the actors after it. Defaults to 0.
+        log_dir (str, optional): Root of the checkpoints and TensorBoard logs. Defaults to "logs".
+        n_timesteps (int, optional): Overrides the number of steps of the YAML. Defaults to None.
+        n_actors (int, optional): Number of actor processes. Defaults to 2.
+        n_envs_per_actor (int, optional): Envs stepped together by every actor. Defaults to `n_envs` of the YAML.
+        sync_freq (int, optional): Steps of an actor between two checks of the weights. Defaults to 10.
+        publish_freq (int, optional): Gradient steps between two publications of the weights. Defaults to 10.
+        max_replay_ratio (float, optional): Maximum gradient steps per received step, after `learning_starts`.
+            Defaults to None, no limit.
+        max_queued_episodes (int, optional): Capacity of the episode queue. Defaults to 4 episodes per env.
+        exploration_noise (float, optional): Standard deviation of the Gaussian noise added to the actions of the
+            deterministic policies of "td3" and "ddpg". Defaults to 0.1.
+        checkpoint_freq (int, optional): Received steps between two checkpoints. Defaults to 10000.
+        log_interval (int, optional): Episodes between two logs. Defaults to 100.
+        cpus (Sequence[int], optional): CPUs to pin the learner and the actors to. Also sets the number of torch
+            threads of the learner. Defaults to all the CPUs.
+        start_method (str, optional): Multiprocessing start method. Defaults to "forkserver" when available,
+            "spawn" otherwise.
+        verbose (int, optional): Verbosity of the algorithm. Defaults to 1.
+
+    Returns:
+        str: Path of the final model.
+    """
+    import torch as th
+    from stable_baselines3.common.callbacks import CheckpointCallback
+    from stable_baselines3.common.env_util import make_vec_env
+    from stable_baselines3.common.vec_env import DummyVecEnv
+    from torch.nn.utils import parameters_to_vector
+
+    import raccoon_gym  # noqa: F401, registers the envs
+    from raccoon_gym.callbacks import CurriculumCallback
+    from raccoon_gym.curriculum import Curriculum
+
+    if algo not in OFF_POLICY_ALGOS:
+        raise ValueError(f"Asynchronous training needs an off-policy algorithm, one of {OFF_POLICY_ALGOS}, got {algo}.")
+    if cpus is not None:
+        os.sched_setaffinity(0, cpus)  # inherited by the actors
+        th.set_num_threads(len(cpus))
+    kwargs, settings = load_hyperparams(hyperparams or os.path.join("hyperparams", f"{algo}.yml"), env_id)
+    if settings["normalize"] is not False:
+        raise ValueError("Asynchronous training does not support normalize.")
+    n_envs_per_actor = n_envs_per_actor or settings["n_envs"]
+    env_kwargs = dict(settings["env_kwargs"], headless=True)
+    curriculum = Curriculum(**settings["curriculum"]) if settings["curriculum"] is not False else None
+    if curriculum is not None:
+        env_kwargs["curriculum"] = curriculum
+    # the env of the learner is never stepped, it gives the spaces and the rewards of HER
+    env = make_vec_env(env_id, n_envs=1, seed=seed, env_kwargs=env_kwargs, vec_env_cls=DummyVecEnv)
+
+    name = run_name(env_id, algo, seed)
+    model_dir = os.path.join(log_dir, "models", name)
+    model = algo_class(algo)(
+        env=env, seed=seed, tensorboard_log=os.path.join(log_dir, "tensorboard"), verbose=verbose, **kwargs
+    )
+    callbacks = [CheckpointCallback(save_freq=checkpoint_freq, save_path=model_dir, name_prefix=f"{algo}_reach")]
+    if curriculum is not None:
+        callbacks.append(
+            CurriculumCallback(
+                curriculum, save_freq=checkpoint_freq, save_path=model_dir, name_prefix=f"{algo}_reach"
+            )
+        )
+    total_timesteps, callback = model._setup_learn(n_timesteps or settings["n_timesteps"], callbacks, tb_log_name=name)
+    callback.on_training_start(locals(), globals())
+
+    parameters = list(_synced_module(model.policy).parameters())
+    n_params = sum(parameter.numel() for parameter in parameters)
+    weights = _SharedWeights(n_params)
+    weights.publish(parameters_to_vector(parameters).detach().cpu().numpy())
+    if start_method is None:
+        start_method = "forkserver" if "forkserver" in mp.get_all_start_methods() else "spawn"
+    ctx = mp.get_context(start_method)
+    max_queued_episodes = max_queued_episodes or 4 * n_actors * n_envs_per_actor
+    episodes_queue = ctx.Queue(maxsize=max_queued_episodes)
+    stop = ctx.Event()
+    processes = []
+    policy_lags: deque = deque(maxlen=model._stats_window_size)
+    with tempfile.TemporaryDirectory() as temporary_dir:
+        policy_path = os.path.join(temporary_dir, "policy.pth")
+        model.policy.save(policy_path)
+        try:
+            for index in range(n_actors):
+                actor_seed = seed + 1 + index * n_envs_per_actor
+                args = (index, env_id, env_kwargs, n_envs_per_actor, actor_seed, type(model.policy), policy_path)
+                args += (weights.name, n_params, episodes_queue, stop, sync_freq, model.learning_starts)
+                args += (exploration_noise if algo in ("td3", "ddpg") else 0.0,)
+                process = ctx.Process(target=_actor, args=args, daemon=True)
+                process.start()
+                processes.append(process)
+
+            n_updates = 0
+            level = curriculum.level if curriculum is not None else None
+            continue_training = True
+            while continue_training and model.num_timesteps < total_timesteps:
+                n_learning_steps = model.num_timesteps - model.learning_starts
+                training = n_learning_steps > 0 and (
+                    max_replay_ratio is None or n_updates < max_replay_ratio * n_learning_steps
+                )
+                # before learning_starts, and when the replay ratio is reached, the learner waits for episodes
+                for episode in _drain(episodes_queue, block=not training, max_episodes=max_queued_episodes):
+                    continue_training = _add_episode(model, callback, episode) and continue_training
+                    policy_lags.append(weights.version - episode["version"])
+                    if model._episode_num % log_interval == 0:
+                        model.logger.record("async/policy_lag", float(np.mean(policy_lags)))
+                        model._dump_logs()
+                weights.n_timesteps = model.num_timesteps
+                if curriculum is not None and curriculum.level != level:
+                    # the HER rewards are computed with the success radius of the current level
+                    level = curriculum.level
+                    env.reset()
+                if training:
+                    model._update_current_progress_remaining(model.num_timesteps, total_timesteps)
+                    model.train(gradient_steps=publish_freq, batch_size=model.batch_size)
+                    n_updates += publish_freq
+                    weights.publish(parameters_to_vector(parameters).detach().cpu().numpy())
+                for index, process in enumerate(processes):
+                    if process.exitcode is not None:
+                        raise RuntimeError(f"Actor {index} exited with code {process.exitcode}.")
+        finally:
+            stop.set()
+            for process in processes:
+                process.join(timeout=10.0)
+                if process.is_alive():
+                    process.terminate()
+            weights.close()
+    callback.on_training_end()
+
+    model_path = os.path.join(model_dir, "final_model")
+    model.save(model_path)
+    env.close()
+    if curriculum is not None:
+        curriculum.save(os.path.join(model_dir, "curriculum.json"))
+        curriculum.close()
+    return model_path + ".zip"
+
+
+def _add_episode(model, callback, episode: Dict[str, Any]) -> bool:
+    """Add the transitions of an episode to the replay buffer, one at a time as a single env."""
+    observations = episode["observation"]
+    n_steps = len(episode["action"])
+    continue_training = True
+    for t in range(n_steps):
+        last = t == n_steps - 1
+        model.replay_buffer.add(
+            {key: values[t : t + 1] for key, values in observations.items()},
+            {key: values[t + 1 : t + 2] for key, values in observations.items()},
+            episode["action"][t : t + 1],
+            episode["reward"][t : t + 1],
+            np.array([last]),
+            [{"TimeLimit.truncated": last and episode["truncated"]}],
+        )
+        model.num_timesteps += 1
+        continue_training = callback.on_step() and continue_training
+    model._episode_num += 1
+    if episode["episode"] is not None:
+        model.ep_info_buffer.append(episode["episode"])
+    model.ep_success_buffer.append(episode["is_success"])
+    return continue_training
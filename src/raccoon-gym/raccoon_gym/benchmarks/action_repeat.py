@@ -0,0 +1,94 @@
+"""Action repeat benchmark: policy steps per second, simulated time and success rate for several action repeats.
+
+The policy is the greedy end-effector controller of `raccoon_gym.benchmarks.horizon`, so the ids must use "ee"
+control. Its gain is divided by the action repeat, as a trained policy would learn smaller actions when each one is
+applied several times, otherwise it overshoots the goal. Every episode is limited to 100 policy steps, as in the
+registered ids, so an action repeat of N simulates up to N times longer episodes.
+
+Usage:
+    python -m raccoon_gym.benchmarks.action_repeat --env-id RaccoonKr3Reach-v1 --action-repeats 1 2 4
+"""
+import argparse
+import time
+from typing import Dict, List, Optional
+
+import gymnasium as gym
+import numpy as np
+
+import raccoon_gym  # noqa: F401
+
+
+def benchmark_action_repeat(
+    env_id: str = "RaccoonKr16Reach-v1",
+    action_repeats: List[int] = (1, 2, 4),
+    n_episodes: int = 20,
+    solver_iterations: Optional[int] = None,
+    seed: int = 0,
+) -> Dict[int, Dict[str, float]]:
+    """Run the same episodes for every action repeat.
+
+    Args:
+        env_id (str, optional): Environment id, with "ee" control. Defaults to "RaccoonKr16Reach-v1".
+        action_repeats (List[int], optional): Action repeats. Defaults to (1, 2, 4).
+        n_episodes (int, optional): Number of episodes. Defaults to 20.
+        solver_iterations (int, optional): Constraint solver iterations. Defaults to None, the one of the robot.
+        seed (int, optional): Seed of the first episode. Defaults to 0.
+
+    Returns:
+        dict: For every action repeat, the policy steps per second, the simulated seconds per wall clock second, the
+            mean simulated time to the goal of the successful episodes, in s, and the success rate.
+    """
+    results = {}
+    for action_repeat in action_repeats:
+        env = gym.make(env_id, headless=True, action_repeat=action_repeat, solver_iterations=solver_iterations)
+        sim = env.unwrapped.sim
+        gain = 10.0 / action_repeat
+        n_steps, n_successes, times_to_goal = 0, 0, []
+        wall_time = 0.0
+        for episode in range(n_episodes):
+            observation, _ = env.reset(seed=seed + episode)
+            terminated = truncated = False
+            start = time.perf_counter()
+            episode_steps = 0
+            while not (terminated or truncated):
+                action = np.clip(gain * (observation["desired_goal"] - observation["achieved_goal"]), -1.0, 1.0)
+                observation, _, terminated, truncated, info = env.step(action)
+                episode_steps += 1
+            wall_time += time.perf_counter() - start
+            n_steps += episode_steps
+            if info["is_success"]:
+                n_successes += 1
+                times_to_goal.append(episode_steps * action_repeat * sim.dt)
+        env.close()
+        results[action_repeat] = {
+            "policy_steps_per_second": n_steps / wall_time,
+            # the repeats of the last step of a successful episode may stop early, this slightly overestimates
+            "simulated_seconds_per_second": n_steps * action_repeat * sim.dt / wall_time,
+            "time_to_goal_s": float(np.mean(times_to_goal)) if times_to_goal else float("nan"),
+            "success_rate": n_successes / n_episodes,
+        }
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--env-id", default="RaccoonKr16Reach-v1")
+    parser.add_argument("--action-repeats", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--n-episodes", type=int, default=20)
+    parser.add_argument("--solver-iterations", type=int, default=None)
+    args = parser.parse_args()
+
+    if "Joints" in args.env_id:
+        parser.error("The greedy policy needs an 'ee' control id.")
+    results = benchmark_action_repeat(args.env_id, args.action_repeats, args.n_episodes, args.solver_iterations)
+    print(f"{args.env_id}, {args.n_episodes} episodes")
+    for action_repeat, result in results.items():
+        print(
+            f"  action_repeat {action_repeat}: {result['policy_steps_per_second']:6.0f} policy steps/s, "
+            f"{result['simulated_seconds_per_second']:5.1f} simulated s/s, success {result['success_rate']:.0%}, "
+            f"goal reached in {result['time_to_goal_s']:.2f} s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Actor/learner benchmark: env steps and gradient steps per second of the synchronous and asynchronous training.
+
+Both train the same env id for the same number of steps, from the same hyperparameters, in a temporary log
+directory. The asynchronous runs use `raccoon_gym.actor_learner` with every number of actors of `--n-actors`. Their
+gain depends on the CPUs: with fewer CPUs than actors plus one, the actors and the learner share them.
+
+Usage:
+    python -m raccoon_gym.benchmarks.actor_learner --env-id RaccoonKr16Reach-v1 --n-timesteps 5000 --n-actors 2 4
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+import zipfile
+from typing import Dict, List, Optional
+
+from raccoon_gym.actor_learner import train_async
+from raccoon_gym.train import train
+
+
+def _n_updates(model_path: str) -> int:
+    # read from the saved attributes, loading a HER model would need an env
+    with zipfile.ZipFile(model_path) as archive:
+        return int(json.loads(archive.read("data"))["_n_updates"])
+
+
+def benchmark_actor_learner(
+    env_id: str = "RaccoonKr16Reach-v1",
+    algo: str = "tqc",
+    hyperparams: Optional[str] = None,
+    n_timesteps: int = 5000,
+    n_actors: List[int] = (2,),
+) -> Dict[str, Dict[str, float]]:
+    """Train synchronously, then asynchronously with every number of actors.
+
+    Args:
+        env_id (str, optional): Env id, with hyperparameters. Defaults to "RaccoonKr16Reach-v1".
+        algo (str, optional): Off-policy algorithm. Defaults to "tqc".
+        hyperparams (str, optional): YAML file. Defaults to "hyperparams/<algo>.yml".
+        n_timesteps (int, optional): Env steps of every run. Defaults to 5000.
+        n_actors (List[int], optional): Numbers of actors of the asynchronous runs. Defaults to (2,).
+
+    Returns:
+        dict: For "sync" and every "async_<n>_actors" run, the wall time, in s, and the env steps and gradient steps
+            per second.
+    """
+    results = {}
+    runs = [("sync", None)] + [(f"async_{n}_actors", n) for n in n_actors]
+    for name, actors in runs:
+        with tempfile.TemporaryDirectory() as log_dir:
+            kwargs = dict(algo=algo, hyperparams=hyperparams, log_dir=log_dir, n_timesteps=n_timesteps, verbose=0)
+            start = time.perf_counter()
+            if actors is None:
+                model_path = train(env_id, checkpoint_freq=n_timesteps, **kwargs)
+            else:
+                model_path = train_async(env_id, n_actors=actors, checkpoint_freq=n_timesteps, **kwargs)
+            wall_time = time.perf_counter() - start
+            results[name] = {
+                "wall_time_s": wall_time,
+                "env_steps_per_second": n_timesteps / wall_time,
+                "gradient_steps_per_second": _n_updates(model_path) / wall_time,
+            }
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--env-id", default="RaccoonKr16Reach-v1")
+    parser.add_argument("--algo", default="tqc")
+    parser.add_argument("--hyperparams", default=None, help="Defaults to hyperparams/<algo>.yml.")
+    parser.add_argument("--n-timesteps", type=int, default=5000)
+    parser.add_argument("--n-actors", type=int, nargs="+", default=[2])
+    args = parser.parse_args()
+
+    results = benchmark_actor_learner(args.env_id, args.algo, args.hyperparams, args.n_timesteps, args.n_actors)
+    print(f"{args.env_id}, {args.algo}, {args.n_timesteps} steps, {len(os.sched_getaffinity(0))} CPUs")
+    for name, result in results.items():
+        print(
+            f"  {name:>16}: {result['wall_time_s']:6.1f} s, {result['env_steps_per_second']:7.1f} env steps/s, "
+            f"{result['gradient_steps_per_second']:6.1f} gradient steps/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
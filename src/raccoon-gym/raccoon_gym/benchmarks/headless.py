@@ -0,0 +1,102 @@
+"""Headless benchmark: startup time, memory and steps per second of the default and the headless (training) mode.
+
+Each mode runs in fresh interpreters, so that the memory of one does not count in the other. The URDF cache is warmed
+by a first run, not timed.
+
+Usage:
+    python -m raccoon_gym.benchmarks.headless --env-id RaccoonKr16ReachJoints-v1 --n-runs 5
+"""
+import argparse
+import json
+import subprocess
+import sys
+from typing import Dict, List
+
+import numpy as np
+
+# run in a fresh interpreter, so that nothing is already loaded
+_PROBE = """
+import json, time
+import gymnasium as gym
+import raccoon_gym
+from raccoon_gym.benchmarks.throughput import _rss_bytes
+
+start_rss = _rss_bytes()
+start = time.perf_counter()
+env = gym.make({env_id!r}, headless={headless!r})
+env.reset(seed=0)
+make_time = time.perf_counter() - start
+first_rss = _rss_bytes()
+envs = [gym.make({env_id!r}, headless={headless!r}) for _ in range({n_envs!r})]
+end_rss = _rss_bytes()
+for other in envs:
+    other.close()
+
+env.action_space.seed(0)
+actions = [env.action_space.sample() for _ in range({n_steps!r})]
+start = time.perf_counter()
+for action in actions:
+    _, _, terminated, truncated, _ = env.step(action)
+    if terminated or truncated:
+        env.reset()
+steps_per_second = len(actions) / (time.perf_counter() - start)
+env.close()
+print(json.dumps(dict(
+    make_time=make_time,
+    first_env_mb=(first_rss - start_rss) / 2**20,
+    per_env_mb=(end_rss - first_rss) / {n_envs!r} / 2**20,
+    steps_per_second=steps_per_second,
+)))
+"""
+
+
+def _probe(env_id: str, headless: bool, n_envs: int, n_steps: int) -> Dict:
+    code = _PROBE.format(env_id=env_id, headless=headless, n_envs=n_envs, n_steps=n_steps)
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    # pybullet writes its warnings on stdout, without newlines: the result is the last json object
+    return json.loads(output[output.rindex("{") :])
+
+
+def benchmark_headless(
+    env_id: str = "RaccoonKr16ReachJoints-v1", n_runs: int = 5, n_envs: int = 4, n_steps: int = 1000
+) -> Dict:
+    """Compare the default and the headless mode of an environment.
+
+    Args:
+        env_id (str, optional): Environment id to make. Defaults to "RaccoonKr16ReachJoints-v1".
+        n_runs (int, optional): Number of interpreters started per mode. Defaults to 5.
+        n_envs (int, optional): Number of envs built after the first one, to measure the memory per env.
+            Defaults to 4.
+        n_steps (int, optional): Number of timed steps. Defaults to 1000.
+
+    Returns:
+        dict: For "default" and "headless", the medians of the time to make and reset the first env, in s, of the
+            memory of the first env and per additional env, in MB, and of the steps per second.
+    """
+    result = {}
+    for mode, headless in (("default", False), ("headless", True)):
+        _probe(env_id, headless, n_envs=1, n_steps=1)  # fill the URDF cache
+        runs: List[Dict] = [_probe(env_id, headless, n_envs, n_steps) for _ in range(n_runs)]
+        result[mode] = {key: float(np.median([run[key] for run in runs])) for key in runs[0]}
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--env-id", default="RaccoonKr16ReachJoints-v1")
+    parser.add_argument("--n-runs", type=int, default=5)
+    parser.add_argument("--n-envs", type=int, default=4)
+    parser.add_argument("--n-steps", type=int, default=1000)
+    args = parser.parse_args()
+
+    result = benchmark_headless(args.env_id, n_runs=args.n_runs, n_envs=args.n_envs, n_steps=args.n_steps)
+    print(f"{args.env_id} (median of {args.n_runs} runs)")
+    for mode, measures in result.items():
+        print(
+            f"  {mode:>8}: make {measures['make_time'] * 1e3:.1f} ms, first env {measures['first_env_mb']:.1f} MB, "
+            f"{measures['per_env_mb']:.1f} MB/env, {measures['steps_per_second']:.0f} steps/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""HER sampling benchmark: time to sample a batch from `HerReplayBuffer` and from `CompactHerReplayBuffer`.
+
+The buffers are filled with the same episodes of 50 random transitions. "compact" computes the rewards of the
+relabeled transitions with the env, as `HerReplayBuffer` does, "compact_local" with `reach_reward` in the process.
+For scale, "tqc_train_step" is the time of a TQC gradient step on batches of the same size, sampling included, with
+the architecture of the examples.
+
+Usage:
+    python -m raccoon_gym.benchmarks.her_sampling --buffer-size 100000 --batch-size 2048 --n-sampled-goal 4
+"""
+import argparse
+import time
+from functools import partial
+from typing import Callable, Dict
+
+import gymnasium as gym
+import numpy as np
+import torch as th
+
+import raccoon_gym  # noqa: F401
+from raccoon_gym.buffers import CompactHerReplayBuffer
+from raccoon_gym.utils import reach_reward
+
+
+def _time(function: Callable, n_repeats: int) -> float:
+    function()  # warm up
+    start = time.perf_counter()
+    for _ in range(n_repeats):
+        function()
+    return (time.perf_counter() - start) / n_repeats
+
+
+def benchmark_her_sampling(
+    env_id: str = "RaccoonKr16ReachJoints-v1",
+    buffer_size: int = 100_000,
+    batch_size: int = 2048,
+    n_sampled_goal: int = 4,
+    n_repeats: int = 50,
+    n_threads: int = 1,
+) -> Dict[str, float]:
+    """Time the sampling of a batch.
+
+    Args:
+        env_id (str, optional): Environment id, for the spaces and the reward. Defaults to "RaccoonKr16ReachJoints-v1".
+        buffer_size (int, optional): Number of transitions in the buffers. Defaults to 100000.
+        batch_size (int, optional): Sampled batch size. Defaults to 2048.
+        n_sampled_goal (int, optional): Number of virtual transitions per real transition. Defaults to 4.
+        n_repeats (int, optional): Number of timed calls. Defaults to 50.
+        n_threads (int, optional): Number of torch threads. Defaults to 1.
+
+    Returns:
+        dict: Time per batch in ms of "HerReplayBuffer", "compact" and "compact_local", and of "tqc_train_step" with
+            each of them.
+    """
+    from sb3_contrib import TQC
+    from stable_baselines3 import HerReplayBuffer
+    from stable_baselines3.common.logger import Logger
+    from stable_baselines3.common.vec_env import DummyVecEnv
+
+    th.set_num_threads(n_threads)
+    env = DummyVecEnv([lambda: gym.make(env_id, headless=True)])
+    task = env.envs[0].unwrapped.task
+    compute_reward = partial(reach_reward, distance_threshold=task.distance_threshold, reward_type=task.reward_type)
+    spaces = dict(observation_space=env.observation_space, action_space=env.action_space, env=env, device="cpu")
+    buffers = {
+        "HerReplayBuffer": HerReplayBuffer(buffer_size, n_sampled_goal=n_sampled_goal, **spaces),
+        "compact": CompactHerReplayBuffer(buffer_size, n_sampled_goal=n_sampled_goal, **spaces),
+        "compact_local": CompactHerReplayBuffer(
+            buffer_size, n_sampled_goal=n_sampled_goal, compute_reward=compute_reward, **spaces
+        ),
+    }
+
+    rng = np.random.default_rng(0)
+    obs_dim = env.observation_space["observation"].shape[0]
+    goal = rng.uniform(-1.0, 1.0, size=(1, 3)).astype(np.float32)
+    observation = rng.uniform(-1.0, 1.0, size=(1, obs_dim)).astype(np.float32)
+    for step in range(buffer_size):
+        next_observation = rng.uniform(-1.0, 1.0, size=(1, obs_dim)).astype(np.float32)
+        obs = dict(observation=observation, achieved_goal=observation[:, :3], desired_goal=goal)
+        next_obs = dict(observation=next_observation, achieved_goal=next_observation[:, :3], desired_goal=goal)
+        action = rng.uniform(-1.0, 1.0, size=(1,) + env.action_space.shape).astype(np.float32)
+        done = np.array([step % 50 == 49])
+        for buffer in buffers.values():
+            buffer.add(obs, next_obs, action, np.full(1, -1.0), done, [{"TimeLimit.truncated": bool(done[0])}])
+        observation = next_observation
+        if done[0]:
+            goal = rng.uniform(-1.0, 1.0, size=(1, 3)).astype(np.float32)
+
+    model = TQC(
+        "MultiInputPolicy",
+        env,
+        buffer_size=1,
+        batch_size=batch_size,
+        policy_kwargs=dict(net_arch=[512, 512, 512], n_critics=2),
+        device="cpu",
+    )
+    model.set_logger(Logger(None, []))
+    results = {}
+    for name, buffer in buffers.items():
+        results[name] = _time(lambda: buffer.sample(batch_size), n_repeats) * 1e3
+    for name, buffer in buffers.items():
+        model.replay_buffer = buffer
+        results[f"tqc_train_step ({name})"] = _time(lambda: model.train(1, batch_size), n_repeats // 5 or 1) * 1e3
+    env.close()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--env-id", default="RaccoonKr16ReachJoints-v1")
+    parser.add_argument("--buffer-size", type=int, default=100_000)
+    parser.add_argument("--batch-size", type=int, default=2048)
+    parser.add_argument("--n-sampled-goal", type=int, default=4)
+    parser.add_argument("--n-repeats", type=int, default=50)
+    parser.add_argument("--n-threads", type=int, default=1)
+    args = parser.parse_args()
+
+    results = benchmark_her_sampling(
+        args.env_id,
+        buffer_size=args.buffer_size,
+        batch_size=args.batch_size,
+        n_sampled_goal=args.n_sampled_goal,
+        n_repeats=args.n_repeats,
+        n_threads=args.n_threads,
+    )
+    print(f"{args.env_id}, {args.buffer_size} transitions, batch {args.batch_size}, n_sampled_goal {args.n_sampled_goal}")
+    for name, ms in results.items():
+        print(f"  {name:>38}: {ms:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Horizon benchmark: simulated steps and success rate of the episodes, with and without early termination and
+adaptive horizon.
+
+The policies are "random" actions and, for the "ee" control ids, "greedy" actions towards the goal, the proportional
+controller `clip(10 * (desired_goal - achieved_goal), -1, 1)`, as a stand-in for a trained policy.
+
+Usage:
+    python -m raccoon_gym.benchmarks.horizon --env-id RaccoonKr16Reach-v1 --n-episodes 50
+"""
+import argparse
+from typing import Dict
+
+import gymnasium as gym
+import numpy as np
+
+import raccoon_gym  # noqa: F401
+
+MODES = {
+    "no_termination": dict(terminate_on_success=False),
+    "terminate_on_success": dict(),
+    "adaptive_horizon": dict(adaptive_horizon=True),
+}
+
+
+def benchmark_horizon(
+    env_id: str = "RaccoonKr16Reach-v1", policy: str = "greedy", n_episodes: int = 50, seed: int = 0
+) -> Dict[str, Dict[str, float]]:
+    """Run the same episodes in every mode of `MODES`.
+
+    Args:
+        env_id (str, optional): Environment id. Defaults to "RaccoonKr16Reach-v1".
+        policy (str, optional): "greedy" or "random". Defaults to "greedy".
+        n_episodes (int, optional): Number of episodes. Defaults to 50.
+        seed (int, optional): Seed of the first episode, and of the random actions. Defaults to 0.
+
+    Returns:
+        dict: For every mode, the mean number of steps per episode and the success rate.
+    """
+    results = {}
+    for mode, kwargs in MODES.items():
+        env = gym.make(env_id, headless=True, **kwargs)
+        env.action_space.seed(seed)
+        steps, successes = 0, 0
+        for episode in range(n_episodes):
+            observation, _ = env.reset(seed=seed + episode)
+            terminated = truncated = False
+            while not (terminated or truncated):
+                if policy == "greedy":
+                    action = np.clip(10.0 * (observation["desired_goal"] - observation["achieved_goal"]), -1.0, 1.0)
+                else:
+                    action = env.action_space.sample()
+                observation, _, terminated, truncated, info = env.step(action)
+                steps += 1
+            successes += bool(info["is_success"])
+        env.close()
+        results[mode] = {"steps_per_episode": steps / n_episodes, "success_rate": successes / n_episodes}
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--env-id", default="RaccoonKr16Reach-v1")
+    parser.add_argument("--policy", choices=("greedy", "random"), default="greedy")
+    parser.add_argument("--n-episodes", type=int, default=50)
+    args = parser.parse_args()
+
+    if args.policy == "greedy" and "Joints" in args.env_id:
+        parser.error("The greedy policy needs an 'ee' control id.")
+    results = benchmark_horizon(args.env_id, args.policy, args.n_episodes)
+    print(f"{args.env_id}, {args.policy} policy, {args.n_episodes} episodes")
+    for mode, result in results.items():
+        print(f"  {mode:>20}: {result['steps_per_episode']:6.1f} steps/episode, success {result['success_rate']:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Inference benchmark: time to compute the actions of M envs with `model.predict` and with `BatchedPolicy`.
+
+The policy is an untrained TQC actor with the architecture of the examples ([512, 512, 512]). "predict_each" calls
+`model.predict` once per env, as the test scripts do, "predict_batch" once for the M envs, and the other columns
+are the backends of `BatchedPolicy`.
+
+Usage:
+    python -m raccoon_gym.benchmarks.inference --batch-sizes 1 8 32 --n-repeats 200
+"""
+import argparse
+import time
+from typing import Callable, Dict, List
+
+import gymnasium as gym
+import numpy as np
+import torch as th
+
+import raccoon_gym  # noqa: F401
+from raccoon_gym.inference import BACKENDS, BatchedPolicy
+
+
+def _time(function: Callable, n_repeats: int) -> float:
+    function()  # warm up
+    start = time.perf_counter()
+    for _ in range(n_repeats):
+        function()
+    return (time.perf_counter() - start) / n_repeats
+
+
+def benchmark_inference(
+    env_id: str = "RaccoonKr16ReachJoints-v1",
+    batch_sizes: List[int] = (1, 8, 32),
+    n_repeats: int = 200,
+    n_threads: int = 1,
+) -> Dict[int, Dict[str, float]]:
+    """Time the actions of a batch of observations.
+
+    Args:
+        env_id (str, optional): Environment id, for the observation and action spaces.
+            Defaults to "RaccoonKr16ReachJoints-v1".
+        batch_sizes (List[int], optional): Numbers of envs M. Defaults to (1, 8, 32).
+        n_repeats (int, optional): Number of timed calls. Defaults to 200.
+        n_threads (int, optional): Number of torch threads. Defaults to 1.
+
+    Returns:
+        dict: For every batch size, the time per batch of every method, in ms. Unavailable backends are skipped.
+    """
+    from sb3_contrib import TQC
+
+    th.set_num_threads(n_threads)
+    env = gym.make(env_id, headless=True)
+    model = TQC(
+        "MultiInputPolicy", env, buffer_size=1, policy_kwargs=dict(net_arch=[512, 512, 512], n_critics=2), device="cpu"
+    )
+    policies = {}
+    for backend in BACKENDS:
+        try:
+            policies[backend] = BatchedPolicy(model, backend=backend)
+        except ImportError:
+            pass
+
+    results = {}
+    for batch_size in batch_sizes:
+        observations = [env.reset(seed=i)[0] for i in range(batch_size)]
+        batch = {key: np.stack([observation[key] for observation in observations]) for key in observations[0]}
+        result = {
+            "predict_each": _time(lambda: [model.predict(obs, deterministic=True) for obs in observations], n_repeats),
+            "predict_batch": _time(lambda: model.predict(batch, deterministic=True), n_repeats),
+        }
+        for backend, policy in policies.items():
+            result[backend] = _time(lambda: policy(batch), n_repeats)
+        results[batch_size] = {method: seconds * 1e3 for method, seconds in result.items()}
+    env.close()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--env-id", default="RaccoonKr16ReachJoints-v1")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--n-repeats", type=int, default=200)
+    parser.add_argument("--n-threads", type=int, default=1)
+    args = parser.parse_args()
+
+    results = benchmark_inference(args.env_id, args.batch_sizes, n_repeats=args.n_repeats, n_threads=args.n_threads)
+    methods = list(next(iter(results.values())))
+    print("ms per batch".ljust(14) + "".join(method.rjust(15) for method in methods))
+    for batch_size, result in results.items():
+        print(f"M = {batch_size}".ljust(14) + "".join(f"{result[method]:15.3f}" for method in methods))
+
+
+if __name__ == "__main__":
+    main()
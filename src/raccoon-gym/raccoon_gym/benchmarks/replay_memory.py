@@ -0,0 +1,97 @@
+"""Replay memory benchmark: memory of `HerReplayBuffer` and of `CompactHerReplayBuffer`, filled with transitions.
+
+Each buffer is allocated and filled in a fresh interpreter, which does not load the simulation, with episodes of 50
+random transitions, and measured by the growth of the resident memory of the process.
+
+Usage:
+    python -m raccoon_gym.benchmarks.replay_memory --buffer-size 100000
+"""
+import argparse
+import json
+import subprocess
+import sys
+from typing import Dict
+
+_PROBE = """
+import json
+import numpy as np
+from gymnasium import spaces
+from stable_baselines3 import HerReplayBuffer
+from raccoon_gym.benchmarks.throughput import _rss_bytes
+from raccoon_gym.buffers import CompactHerReplayBuffer
+
+observation_space = spaces.Dict(
+    {{key: spaces.Box(-10.0, 10.0, shape, np.float32) for key, shape in {shapes!r}.items()}}
+)
+action_space = spaces.Box(-1.0, 1.0, {action_shape!r}, np.float32)
+rng = np.random.default_rng(0)
+start_rss = _rss_bytes()
+if {kind!r} == "her":
+    buffer = HerReplayBuffer({buffer_size!r}, observation_space, action_space, env=None, device="cpu")
+else:
+    buffer = CompactHerReplayBuffer(
+        {buffer_size!r}, observation_space, action_space, env=None, device="cpu", dtype={kind!r}
+    )
+obs_dim = observation_space["observation"].shape[0]
+observation = rng.standard_normal((1, obs_dim)).astype(np.float32)
+for step in range({buffer_size!r}):
+    next_observation = rng.standard_normal((1, obs_dim)).astype(np.float32)
+    obs = dict(observation=observation, achieved_goal=observation[:, :3], desired_goal=np.ones((1, 3), np.float32))
+    next_obs = dict(
+        observation=next_observation, achieved_goal=next_observation[:, :3], desired_goal=np.ones((1, 3), np.float32)
+    )
+    done = np.array([step % 50 == 49])
+    infos = [{{"TimeLimit.truncated": bool(done[0])}}]
+    buffer.add(obs, next_obs, action_space.sample()[None], np.zeros(1), done, infos)
+    observation = next_observation
+print(json.dumps(dict(mb=(_rss_bytes() - start_rss) / 2**20)))
+"""
+
+
+def _probe(shapes: Dict[str, tuple], action_shape: tuple, kind: str, buffer_size: int) -> float:
+    code = _PROBE.format(shapes=shapes, action_shape=action_shape, kind=kind, buffer_size=buffer_size)
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    # pybullet writes its warnings on stdout, without newlines: the result is the last json object
+    return json.loads(output[output.rindex("{") :])["mb"]
+
+
+def benchmark_replay_memory(env_id: str = "RaccoonKr16ReachJoints-v1", buffer_size: int = 100_000) -> Dict[str, float]:
+    """Measure the memory of full replay buffers.
+
+    Args:
+        env_id (str, optional): Environment id, for the observation and action spaces.
+            Defaults to "RaccoonKr16ReachJoints-v1".
+        buffer_size (int, optional): Number of transitions. Defaults to 100000.
+
+    Returns:
+        dict: Memory in MB of "HerReplayBuffer", and of `CompactHerReplayBuffer` in "float32" and "float16".
+    """
+    import gymnasium as gym
+
+    import raccoon_gym  # noqa: F401
+
+    env = gym.make(env_id, headless=True)
+    shapes = {key: space.shape for key, space in env.observation_space.spaces.items()}
+    action_shape = env.action_space.shape
+    env.close()
+    return {
+        name: _probe(shapes, action_shape, kind, buffer_size)
+        for name, kind in (("HerReplayBuffer", "her"), ("float32", "float32"), ("float16", "float16"))
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--env-id", default="RaccoonKr16ReachJoints-v1")
+    parser.add_argument("--buffer-size", type=int, default=100_000)
+    args = parser.parse_args()
+
+    result = benchmark_replay_memory(args.env_id, args.buffer_size)
+    print(f"{args.env_id}, {args.buffer_size} transitions")
+    for name, mb in result.items():
+        ratio = "" if name == "HerReplayBuffer" else f" ({mb / result['HerReplayBuffer']:.0%})"
+        print(f"  {name:>15}: {mb:.1f} MB{ratio}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Micro-benchmark of the batched reach reward, as used by HER relabeling.
+
+Usage:
+    python -m raccoon_gym.benchmarks.reward --batch-size 2048 --n-sampled-goal 4
+"""
+import argparse
+import time
+
+import numpy as np
+
+from raccoon_gym.utils import reach_reward, reach_success
+
+
+def benchmark_reward(
+    batch_size: int = 2048,
+    n_sampled_goal: int = 4,
+    reward_type: str = "sparse",
+    distance_threshold: float = 0.05,
+    n_iters: int = 1000,
+    seed: int = 0,
+) -> dict:
+    """Time `reach_reward` and `reach_success` on float32 goal batches.
+
+    Every call relabels `batch_size * n_sampled_goal` transitions, like `HerReplayBuffer` does for one sampled
+    batch with the "future" strategy.
+
+    Args:
+        batch_size (int, optional): Sampled batch size. Defaults to 2048.
+        n_sampled_goal (int, optional): Number of relabeled goals per transition. Defaults to 4.
+        reward_type (str, optional): "sparse" or "dense". Defaults to "sparse".
+        distance_threshold (float, optional): Success radius. Defaults to 0.05.
+        n_iters (int, optional): Number of timed calls. Defaults to 1000.
+        seed (int, optional): Seed of the random goals. Defaults to 0.
+
+    Returns:
+        dict: Relabels per second for the reward and the success computation.
+    """
+    n = batch_size * n_sampled_goal
+    rng = np.random.default_rng(seed)
+    achieved_goal = rng.uniform(-1.0, 1.0, size=(n, 3)).astype(np.float32)
+    desired_goal = rng.uniform(-1.0, 1.0, size=(n, 3)).astype(np.float32)
+
+    reward = reach_reward(achieved_goal, desired_goal, distance_threshold, reward_type)
+    success = reach_success(achieved_goal, desired_goal, distance_threshold)
+    assert reward.shape == (n,) and reward.dtype == np.float32
+    assert success.shape == (n,) and success.dtype == bool
+
+    start = time.perf_counter()
+    for _ in range(n_iters):
+        reach_reward(achieved_goal, desired_goal, distance_threshold, reward_type)
+    reward_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(n_iters):
+        reach_success(achieved_goal, desired_goal, distance_threshold)
+    success_time = time.perf_counter() - start
+
+    return {
+        "batch": n,
+        "reward_per_second": n * n_iters / reward_time,
+        "success_per_second": n * n_iters / success_time,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=2048)
+    parser.add_argument("--n-sampled-goal", type=int, default=4)
+    parser.add_argument("--reward-type", choices=["sparse", "dense"], default="sparse")
+    parser.add_argument("--n-iters", type=int, default=1000)
+    parser.add_argument("--target", type=float, default=1e6, help="Minimum relabels per second.")
+    args = parser.parse_args()
+
+    result = benchmark_reward(
+        batch_size=args.batch_size,
+        n_sampled_goal=args.n_sampled_goal,
+        reward_type=args.reward_type,
+        n_iters=args.n_iters,
+    )
+    for key in ["reward_per_second", "success_per_second"]:
+        status = "OK" if result[key] >= args.target else "BELOW TARGET"
+        print(f"{key}: {result[key]:,.0f} relabels/s (batch {result['batch']}) [{status}]")
+    if min(result["reward_per_second"], result["success_per_second"]) < args.target:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
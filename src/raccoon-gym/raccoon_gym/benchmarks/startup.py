@@ -0,0 +1,79 @@
+"""Startup benchmark: time to import raccoon_gym and to make a first environment, in a fresh interpreter.
+
+Also lists the heavy modules loaded at each stage, to check that importing the package does not load pybullet and
+that making one env does not load the modules of the other robots.
+
+Usage:
+    python -m raccoon_gym.benchmarks.startup --env-id RaccoonKr16Reach-v1 --n-runs 10
+"""
+import argparse
+import json
+import subprocess
+import sys
+from typing import Dict, List
+
+import numpy as np
+
+# run in a fresh interpreter, so that nothing is already imported
+_PROBE = """
+import json, sys, time
+
+def loaded():
+    return sorted(name for name in sys.modules if name == "pybullet" or name.startswith("raccoon_gym.envs."))
+
+start = time.perf_counter()
+import raccoon_gym
+import_time = time.perf_counter() - start
+import_modules = loaded()
+
+import gymnasium as gym
+
+start = time.perf_counter()
+env = gym.make({env_id!r})
+make_time = time.perf_counter() - start
+make_modules = loaded()
+env.close()
+print(json.dumps(dict(import_time=import_time, import_modules=import_modules, make_time=make_time, make_modules=make_modules)))
+"""
+
+
+def benchmark_startup(env_id: str = "RaccoonKr16Reach-v1", n_runs: int = 10) -> Dict:
+    """Time `import raccoon_gym` and `gym.make(env_id)` in `n_runs` fresh interpreters.
+
+    Args:
+        env_id (str, optional): Environment id to make. Defaults to "RaccoonKr16Reach-v1".
+        n_runs (int, optional): Number of interpreters started. Defaults to 10.
+
+    Returns:
+        dict: Median import and make times, in s, and the modules loaded after each of them.
+    """
+    runs: List[Dict] = []
+    for _ in range(n_runs):
+        output = subprocess.run(
+            [sys.executable, "-c", _PROBE.format(env_id=env_id)], capture_output=True, text=True, check=True
+        ).stdout
+        # pybullet writes its warnings on stdout, without newlines: the result is the last json object
+        runs.append(json.loads(output[output.rindex("{") :]))
+    return {
+        "import_time": float(np.median([run["import_time"] for run in runs])),
+        "make_time": float(np.median([run["make_time"] for run in runs])),
+        "import_modules": runs[-1]["import_modules"],
+        "make_modules": runs[-1]["make_modules"],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--env-id", default="RaccoonKr16Reach-v1")
+    parser.add_argument("--n-runs", type=int, default=10)
+    args = parser.parse_args()
+
+    result = benchmark_startup(env_id=args.env_id, n_runs=args.n_runs)
+    print(f"import raccoon_gym: {result['import_time'] * 1e3:.1f} ms (median of {args.n_runs})")
+    print(f"  loaded: {', '.join(result['import_modules']) or 'none'}")
+    print(f"gym.make({args.env_id!r}): {result['make_time'] * 1e3:.1f} ms")
+    print(f"  loaded: {', '.join(result['make_modules'])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+"""Throughput benchmark of the registered environments, written as JSON for regression tracking.
+
+For every id, measures the reset latency, the step latency percentiles, the steps per second of a single env and of
+a `VectorReachEnv`, the share of the step spent in the inverse kinematics ("ee" ids) and the memory per env.
+Ids that fail to build (e.g. missing URDF submodules) are reported with their error.
+
+Usage:
+    python -m raccoon_gym.benchmarks.throughput --output throughput.json
+    python -m raccoon_gym.benchmarks.throughput --env-ids RaccoonKr16Reach-v1 RaccoonKr16ReachJoints-v1
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import resource
+import sys
+import time
+from typing import Dict, Iterator, List, Optional
+
+import gymnasium as gym
+import numpy as np
+
+import raccoon_gym
+
+
+def _rss_bytes() -> int:
+    """Current resident set size of the process."""
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        # peak, not current, resident set size: in KB on Linux, in bytes on macOS
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+@contextlib.contextmanager
+def _stdout_to_stderr() -> Iterator[None]:
+    """Redirect the stdout file descriptor to stderr, including the messages PyBullet prints from C."""
+    sys.stdout.flush()
+    stdout_fd = os.dup(1)
+    os.dup2(2, 1)
+    try:
+        yield
+    finally:
+        sys.stdout.flush()
+        os.dup2(stdout_fd, 1)
+        os.close(stdout_fd)
+
+
+def _percentiles(latencies: List[float]) -> Dict[str, float]:
+    p50, p90, p99 = np.percentile(latencies, [50, 90, 99]) * 1e3
+    return {"mean_ms": float(np.mean(latencies) * 1e3), "p50_ms": p50, "p90_ms": p90, "p99_ms": p99}
+
+
+def benchmark_env(env_id: str, n_steps: int = 1000, n_resets: int = 50, seed: int = 0) -> Dict:
+    """Reset and step latencies, steps per second and IK share of a single environment.
+
+    Args:
+        env_id (str): Registered id.
+        n_steps (int, optional): Number of timed steps. Defaults to 1000.
+        n_resets (int, optional): Number of timed resets. Defaults to 50.
+        seed (int, optional): Seed of the environment and of the actions. Defaults to 0.
+
+    Returns:
+        dict: The measures.
+    """
+    env = gym.make(env_id)
+    env.action_space.seed(seed)
+    robot = env.unwrapped.robot
+    ik_time = [0.0]
+    if robot.control_type == "ee":
+        # time the IK through the instance attribute, the class is left untouched
+        ik = robot.ee_displacement_to_target_arm_angles
+
+        def timed_ik(ee_displacement: np.ndarray) -> np.ndarray:
+            start = time.perf_counter()
+            target_arm_angles = ik(ee_displacement)
+            ik_time[0] += time.perf_counter() - start
+            return target_arm_angles
+
+        robot.ee_displacement_to_target_arm_angles = timed_ik
+
+    reset_latencies = []
+    for i in range(n_resets):
+        start = time.perf_counter()
+        env.reset(seed=seed + i)
+        reset_latencies.append(time.perf_counter() - start)
+
+    actions = [env.action_space.sample() for _ in range(n_steps)]
+    step_latencies = []
+    ik_time[0] = 0.0
+    for action in actions:
+        start = time.perf_counter()
+        _, _, terminated, truncated, _ = env.step(action)
+        step_latencies.append(time.perf_counter() - start)
+        if terminated or truncated:
+            env.reset()
+    env.close()
+
+    total = sum(step_latencies)
+    return {
+        "reset": _percentiles(reset_latencies),
+        "step": _percentiles(step_latencies),
+        "steps_per_second": n_steps / total,
+        "ik_share": ik_time[0] / total if robot.control_type == "ee" else None,
+    }
+
+
+def benchmark_vector_env(env_id: str, num_envs: int = 16, n_steps: int = 200, seed: int = 0) -> Dict:
+    """Steps per second of a `VectorReachEnv` simulating `num_envs` copies of the env in one client.
+
+    Args:
+        env_id (str): Registered id.
+        num_envs (int, optional): Number of copies. Defaults to 16.
+        n_steps (int, optional): Number of timed vector steps. Defaults to 200.
+        seed (int, optional): Seed. Defaults to 0.
+
+    Returns:
+        dict: Steps per second, counted as single env steps.
+    """
+    from raccoon_gym.envs.vector_env import VectorReachEnv
+
+    kwargs = gym.spec(env_id).kwargs
+    envs = VectorReachEnv(
+        kwargs["robot"],
+        num_envs=num_envs,
+        reward_type=kwargs["reward_type"],
+        control_type=kwargs["control_type"],
+    )
+    envs.action_space.seed(seed)
+    envs.reset(seed=seed)
+    actions = [envs.action_space.sample() for _ in range(n_steps)]
+    start = time.perf_counter()
+    for action in actions:
+        envs.step(action)
+    total = time.perf_counter() - start
+    envs.close()
+    return {"num_envs": num_envs, "steps_per_second": num_envs * n_steps / total}
+
+
+def benchmark_memory(env_id: str, n_envs: int = 4) -> Dict:
+    """Resident memory added by each env, once the first one is built.
+
+    The first env loads the shared libraries and fills the URDF cache, so it is measured separately.
+
+    Args:
+        env_id (str): Registered id.
+        n_envs (int, optional): Number of envs built after the first one. Defaults to 4.
+
+    Returns:
+        dict: Memory of the first env and per additional env, in MB.
+    """
+    start = _rss_bytes()
+    envs = [gym.make(env_id)]
+    first = _rss_bytes()
+    envs += [gym.make(env_id) for _ in range(n_envs)]
+    end = _rss_bytes()
+    for env in envs:
+        env.close()
+    return {"first_env_mb": (first - start) / 2**20, "per_env_mb": (end - first) / n_envs / 2**20}
+
+
+def run(
+    env_ids: Optional[List[str]] = None,
+    n_steps: int = 1000,
+    n_resets: int = 50,
+    num_envs: int = 16,
+    seed: int = 0,
+) -> Dict:
+    """Benchmark every id, and collect the results with the platform description.
+
+    Args:
+        env_ids (List[str], optional): Ids to benchmark. Defaults to `raccoon_gym.ENV_IDS`.
+        n_steps (int, optional): Number of timed steps per id. Defaults to 1000.
+        n_resets (int, optional): Number of timed resets per id. Defaults to 50.
+        num_envs (int, optional): Number of copies of the vectorized env. Defaults to 16.
+        seed (int, optional): Seed. Defaults to 0.
+
+    Returns:
+        dict: JSON serializable results, keyed by id.
+    """
+    import pybullet
+
+    env_ids = env_ids if env_ids is not None else raccoon_gym.ENV_IDS
+    results = {}
+    for env_id in env_ids:
+        try:
+            result = benchmark_env(env_id, n_steps=n_steps, n_resets=n_resets, seed=seed)
+            result["vector"] = benchmark_vector_env(env_id, num_envs=num_envs, n_steps=max(n_steps // num_envs, 1))
+            result["memory"] = benchmark_memory(env_id)
+        except Exception as error:  # a missing URDF must not stop the other ids
+            result = {"error": f"{type(error).__name__}: {error}"}
+        results[env_id] = result
+    return {
+        "metadata": {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "gymnasium": gym.__version__,
+            "pybullet_api": pybullet.getAPIVersion(),
+            "raccoon_gym": raccoon_gym.__version__,
+            "n_steps": n_steps,
+            "n_resets": n_resets,
+        },
+        "results": results,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--env-ids", nargs="+", default=None, help="Defaults to every registered id.")
+    parser.add_argument("--n-steps", type=int, default=1000)
+    parser.add_argument("--n-resets", type=int, default=50)
+    parser.add_argument("--num-envs", type=int, default=16, help="Copies of the vectorized env.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="JSON file. Defaults to stdout.")
+    args = parser.parse_args()
+
+    # summary and PyBullet messages on stderr, so that stdout is only the JSON
+    with _stdout_to_stderr():
+        report = run(
+            args.env_ids, n_steps=args.n_steps, n_resets=args.n_resets, num_envs=args.num_envs, seed=args.seed
+        )
+    for env_id, result in report["results"].items():
+        if "error" in result:
+            print(f"{env_id}: {result['error']}", file=sys.stderr)
+        else:
+            ik_share = f", IK {result['ik_share']:.0%}" if result["ik_share"] is not None else ""
+            print(
+                f"{env_id}: {result['steps_per_second']:.0f} steps/s (p99 {result['step']['p99_ms']:.2f} ms{ik_share}), "
+                f"vector {result['vector']['steps_per_second']:.0f} steps/s, "
+                f"reset {result['reset']['p50_ms']:.2f} ms, {result['memory']['per_env_mb']:.1f} MB/env",
+                file=sys.stderr,
+            )
+    text = json.dumps(report, indent=2)
+    if args.output is None:
+        print(text)
+    else:
+        with open(args.output, "w") as file:
+            file.write(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Workspace benchmark: share of the goals of the default box that the robots can reach, and cost of the workspace.
+
+For every robot whose URDF is available, the workspace is computed in a temporary cache, then loaded from it. The
+"reachable" share is the share of the goals drawn uniformly in the goal box that lie in the workspace: the episodes
+of the other goals can not succeed.
+
+Usage:
+    python -m raccoon_gym.benchmarks.workspace --n-goals 100000
+"""
+import argparse
+import os
+import tempfile
+import time
+from typing import Dict
+
+import numpy as np
+
+from raccoon_gym.envs.specs import ROBOT_SPECS
+from raccoon_gym.workspace import reachable_workspace
+
+
+def benchmark_workspace(n_goals: int = 100_000, seed: int = 0) -> Dict[str, Dict[str, float]]:
+    """Measure the workspace of every robot.
+
+    Args:
+        n_goals (int, optional): Number of goals drawn in the goal box. Defaults to 100000.
+        seed (int, optional): Seed of the goals. Defaults to 0.
+
+    Returns:
+        dict: For every robot, the time to compute and to load the workspace, in s, its volume, in m^3, the share
+            of reachable box goals, and the time to sample a goal in the box and in the workspace, in us.
+    """
+    results = {}
+    rng = np.random.default_rng(seed)
+    with tempfile.TemporaryDirectory() as cache_dir:
+        for name, spec in ROBOT_SPECS.items():
+            if not os.path.exists(spec.file_name):
+                continue
+            start = time.perf_counter()
+            workspace = reachable_workspace(spec, cache_dir=cache_dir)
+            build_time = time.perf_counter() - start
+            reachable_workspace.cache_clear()
+            start = time.perf_counter()
+            workspace = reachable_workspace(spec, cache_dir=cache_dir)
+            load_time = time.perf_counter() - start
+
+            low = np.array([-spec.goal_range / 2, -spec.goal_range / 2, 0.0])
+            high = np.array([spec.goal_range / 2, spec.goal_range / 2, spec.goal_range])
+            goals = rng.uniform(low, high, size=(n_goals, 3))
+            restricted = workspace.restrict(low - spec.base_position, high - spec.base_position)
+            start = time.perf_counter()
+            for _ in range(1000):
+                rng.uniform(low, high)
+            box_time = (time.perf_counter() - start) / 1000
+            start = time.perf_counter()
+            for _ in range(1000):
+                restricted.sample(rng)
+            workspace_time = (time.perf_counter() - start) / 1000
+            results[name] = {
+                "build_s": build_time,
+                "load_s": load_time,
+                "volume_m3": workspace.volume,
+                "reachable": float(workspace.contains(goals - spec.base_position).mean()),
+                "box_sample_us": box_time * 1e6,
+                "workspace_sample_us": workspace_time * 1e6,
+            }
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n-goals", type=int, default=100_000)
+    args = parser.parse_args()
+
+    for name, result in benchmark_workspace(args.n_goals).items():
+        print(
+            f"{name:>16}: {result['reachable']:.0%} of the box goals reachable, workspace {result['volume_m3']:.2f} m^3 "
+            f"computed in {result['build_s']:.1f} s, loaded in {result['load_s'] * 1e3:.0f} ms, goal sampled in "
+            f"{result['workspace_sample_us']:.1f} us (box {result['box_sample_us']:.1f} us)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,345 @@
+"""Compact HER replay buffer for the reach tasks.
+
+`HerReplayBuffer` stores, for every transition, the observation, achieved goal and desired goal twice (observation
+and next observation), and an empty info dict. For the reach tasks, the achieved goal is the end-effector position,
+the first 3 values of the observation, and the next observation of a transition is the observation of the next one,
+except at the end of an episode. `CompactHerReplayBuffer` stores each observation once, without the achieved goal,
+in float32 or float16, keeps the last observations of the episodes in a small separate pool, and can back its
+arrays with memory-mapped files.
+
+Its sampling is vectorized over the batch: the episode of every transition is known from its start and length, so
+the "future" goals are gathered with index arithmetic, and the rewards of the relabeled transitions are computed in
+one call.
+
+Use it as a drop-in replacement of `HerReplayBuffer`:
+
+    model = TQC("MultiInputPolicy", env, replay_buffer_class=CompactHerReplayBuffer,
+                replay_buffer_kwargs=dict(goal_selection_strategy="future", n_sampled_goal=4, dtype="float16"))
+"""
+import copy
+import os
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+import torch as th
+from gymnasium import spaces
+
+from stable_baselines3.common.buffers import BaseBuffer
+from stable_baselines3.common.type_aliases import DictReplayBufferSamples
+from stable_baselines3.common.vec_env import VecEnv, VecNormalize
+from stable_baselines3.her.goal_selection_strategy import KEY_TO_GOAL_STRATEGY, GoalSelectionStrategy
+from stable_baselines3.her.her_replay_buffer import HerReplayBuffer
+
+
+class CompactHerReplayBuffer(HerReplayBuffer):
+    """HER replay buffer storing each observation once, without the achieved goal.
+
+    The arguments of `HerReplayBuffer` are supported, except `optimize_memory_usage`, which this buffer always does.
+
+    Args:
+        buffer_size (int): Max number of transitions per env.
+        observation_space (spaces.Dict): Observation space, with "observation", "achieved_goal" and "desired_goal".
+        action_space (spaces.Space): Action space.
+        env (VecEnv): The training environment, used to compute the rewards of the relabeled transitions.
+        device (th.device or str, optional): PyTorch device. Defaults to "auto".
+        n_envs (int, optional): Number of parallel environments. Defaults to 1.
+        optimize_memory_usage (bool, optional): Unused. Defaults to False.
+        handle_timeout_termination (bool, optional): Bootstrap on timeouts. Defaults to True.
+        n_sampled_goal (int, optional): Number of virtual transitions per real transition. Defaults to 4.
+        goal_selection_strategy (GoalSelectionStrategy or str, optional): "episode", "final" or "future".
+            Defaults to "future".
+        copy_info_dict (bool, optional): Whether to store the info dicts for `compute_reward`. Defaults to False.
+        dtype (str, optional): Storage type of the observations, goals and actions, "float32" or "float16". float16
+            rounds positions of about 2 m to 2 mm. Defaults to "float32".
+        achieved_goal_slice (Tuple[int, int], optional): Slice of the observation equal to the achieved goal.
+            Checked on every add. Defaults to (0, 3), the end-effector position.
+        memmap_dir (str, optional): Directory of the files backing the arrays, which are then paged by the OS
+            instead of being held in memory. Defaults to None, in memory.
+        compute_reward (Callable, optional): Batched reward of (achieved goals, desired goals), called in the
+            learner process, e.g. `partial(reach_reward, distance_threshold=0.05, reward_type="sparse")`. Saves a
+            round trip to the env process with a `SubprocVecEnv`. Defaults to None, `compute_reward` of the first env.
+    """
+
+    def __init__(
+        self,
+        buffer_size: int,
+        observation_space: spaces.Dict,
+        action_space: spaces.Space,
+        env: VecEnv,
+        device: Union[th.device, str] = "auto",
+        n_envs: int = 1,
+        optimize_memory_usage: bool = False,
+        handle_timeout_termination: bool = True,
+        n_sampled_goal: int = 4,
+        goal_selection_strategy: Union[GoalSelectionStrategy, str] = "future",
+        copy_info_dict: bool = False,
+        dtype: str = "float32",
+        achieved_goal_slice: Tuple[int, int] = (0, 3),
+        memmap_dir: Optional[str] = None,
+        compute_reward: Optional[Callable[[np.ndarray, np.ndarray], np.ndarray]] = None,
+    ) -> None:
+        # the arrays of DictReplayBuffer are not allocated
+        BaseBuffer.__init__(self, buffer_size, observation_space, action_space, device=device, n_envs=n_envs)
+        self.buffer_size = max(buffer_size // n_envs, 1)
+        self.optimize_memory_usage = False
+        self.handle_timeout_termination = handle_timeout_termination
+        self.env = env
+        self.copy_info_dict = copy_info_dict
+        if isinstance(goal_selection_strategy, str):
+            goal_selection_strategy = KEY_TO_GOAL_STRATEGY[goal_selection_strategy.lower()]
+        self.goal_selection_strategy = goal_selection_strategy
+        self.n_sampled_goal = n_sampled_goal
+        self.her_ratio = 1 - (1.0 / (self.n_sampled_goal + 1))
+        self.compute_reward = compute_reward
+
+        self.dtype = np.dtype(dtype)
+        if self.dtype not in (np.float32, np.float16):
+            raise ValueError(f"Unsupported storage type {dtype}, expected float32 or float16.")
+        self.memmap_dir = memmap_dir
+        self.goal_slice = slice(*achieved_goal_slice)
+        obs_dim = self.obs_shape["observation"][0]
+        goal_dim = self.obs_shape["desired_goal"][0]
+        if self.goal_slice.stop - self.goal_slice.start != self.obs_shape["achieved_goal"][0]:
+            raise ValueError(f"achieved_goal_slice {achieved_goal_slice} does not match the achieved goal shape.")
+
+        size = (self.buffer_size, self.n_envs)
+        self.observations = self._allocate("observations", size + (obs_dim,), self.dtype)
+        self.desired_goals = self._allocate("desired_goals", size + (goal_dim,), self.dtype)
+        self.actions = self._allocate("actions", size + (self.action_dim,), self.dtype)
+        self.rewards = self._allocate("rewards", size, np.float32)
+        self.dones = self._allocate("dones", size, np.bool_)
+        self.timeouts = self._allocate("timeouts", size, np.bool_)
+        self.ep_start = self._allocate("ep_start", size, np.int32)
+        self.ep_length = self._allocate("ep_length", size, np.int32)
+        self._current_ep_start = np.zeros(self.n_envs, dtype=np.int64)
+        if self.copy_info_dict:
+            self.infos = np.array([[{} for _ in range(self.n_envs)] for _ in range(self.buffer_size)])
+
+        # last observation of the episodes, in a pool that grows with the number of episodes in the buffer:
+        # final_index[row, env] is the slot of the next observation of the transition, or -1 if it is in row + 1
+        self.final_index = self._allocate("final_index", size, np.int32)
+        self.final_index[:] = -1
+        capacity = max(self.buffer_size * self.n_envs // 64, 16)
+        self.final_observations = np.zeros((capacity, obs_dim), dtype=self.dtype)
+        self._final_owners = np.full((capacity, 2), -1, dtype=np.int64)
+        self._final_pos = 0
+
+    def _allocate(self, name: str, shape: Tuple[int, ...], dtype: Any) -> np.ndarray:
+        if self.memmap_dir is None:
+            return np.zeros(shape, dtype=dtype)
+        os.makedirs(self.memmap_dir, exist_ok=True)
+        return np.lib.format.open_memmap(os.path.join(self.memmap_dir, f"{name}.npy"), "w+", dtype, shape)
+
+    @property
+    def nbytes(self) -> int:
+        """Memory of the stored transitions, in bytes, whether in memory or memory-mapped."""
+        arrays = (
+            self.observations,
+            self.desired_goals,
+            self.actions,
+            self.rewards,
+            self.dones,
+            self.timeouts,
+            self.ep_start,
+            self.ep_length,
+            self.final_index,
+            self.final_observations,
+            self._final_owners,
+        )
+        return sum(array.nbytes for array in arrays)
+
+    def _check_achieved_goal(self, obs: Dict[str, np.ndarray]) -> None:
+        if not np.array_equal(obs["achieved_goal"], obs["observation"][..., self.goal_slice]):
+            raise ValueError(
+                f"The achieved goal is not observation[{self.goal_slice.start}:{self.goal_slice.stop}], "
+                "set achieved_goal_slice or use HerReplayBuffer."
+            )
+
+    def _store_final(self, row: int, env_idx: int, observation: np.ndarray) -> None:
+        slot = self._final_pos
+        owner_row, owner_env = self._final_owners[slot]
+        if owner_row >= 0 and self.final_index[owner_row, owner_env] == slot:
+            # the slot is still used by a transition of the buffer: grow the pool, the used slots keep their index
+            capacity = len(self.final_observations)
+            self.final_observations = np.concatenate([self.final_observations, np.zeros_like(self.final_observations)])
+            self._final_owners = np.concatenate([self._final_owners, np.full((capacity, 2), -1, dtype=np.int64)])
+            slot = capacity
+        self.final_observations[slot] = observation
+        self._final_owners[slot] = (row, env_idx)
+        self.final_index[row, env_idx] = slot
+        self._final_pos = (slot + 1) % len(self.final_observations)
+
+    def add(  # type: ignore[override]
+        self,
+        obs: Dict[str, np.ndarray],
+        next_obs: Dict[str, np.ndarray],
+        action: np.ndarray,
+        reward: np.ndarray,
+        done: np.ndarray,
+        infos: List[Dict[str, Any]],
+    ) -> None:
+        self._check_achieved_goal(obs)
+        # the episodes being overwritten can not be sampled anymore, as in HerReplayBuffer.add
+        for env_idx in range(self.n_envs):
+            episode_start = self.ep_start[self.pos, env_idx]
+            episode_length = self.ep_length[self.pos, env_idx]
+            if episode_length > 0:
+                episode_end = episode_start + episode_length
+                episode_indices = np.arange(self.pos, episode_end) % self.buffer_size
+                self.ep_length[episode_indices, env_idx] = 0
+        self.ep_start[self.pos] = self._current_ep_start
+        if self.copy_info_dict:
+            self.infos[self.pos] = infos
+
+        self.observations[self.pos] = obs["observation"].reshape(self.n_envs, -1)
+        self.desired_goals[self.pos] = obs["desired_goal"].reshape(self.n_envs, -1)
+        self.actions[self.pos] = np.asarray(action).reshape(self.n_envs, self.action_dim)
+        self.rewards[self.pos] = reward
+        self.dones[self.pos] = done
+        if self.handle_timeout_termination:
+            self.timeouts[self.pos] = [info.get("TimeLimit.truncated", False) for info in infos]
+        # the next observation is the observation of the next add, except at the end of an episode
+        self.final_index[self.pos] = -1
+        for env_idx in np.flatnonzero(done):
+            self._check_achieved_goal({key: value[env_idx] for key, value in next_obs.items()})
+            self._store_final(self.pos, env_idx, next_obs["observation"][env_idx])
+
+        self.pos += 1
+        if self.pos == self.buffer_size:
+            self.full = True
+            self.pos = 0
+        for env_idx in np.flatnonzero(done):
+            self._compute_episode_length(env_idx)
+
+    def _next_observations(self, batch_indices: np.ndarray, env_indices: np.ndarray) -> np.ndarray:
+        next_observations = self.observations[(batch_indices + 1) % self.buffer_size, env_indices].astype(np.float32)
+        final_index = self.final_index[batch_indices, env_indices]
+        is_final = final_index >= 0
+        next_observations[is_final] = self.final_observations[final_index[is_final]]
+        return next_observations
+
+    def sample(self, batch_size: int, env: Optional[VecNormalize] = None) -> DictReplayBufferSamples:
+        """Sample a batch, of which a fraction `her_ratio` is relabeled with new goals.
+
+        Unlike `HerReplayBuffer.sample`, the transitions are drawn by rejection instead of listing the valid ones,
+        and the real and virtual transitions are gathered together, with one call to the reward function.
+
+        Args:
+            batch_size (int): Number of transitions.
+            env (VecNormalize, optional): Normalizes the observations and rewards. Defaults to None.
+
+        Returns:
+            DictReplayBufferSamples: The transitions, the virtual ones first.
+        """
+        batch_indices, env_indices = self._sample_transitions(batch_size)
+        return self._get_samples(batch_indices, env_indices, int(self.her_ratio * batch_size), env)
+
+    def _sample_transitions(self, batch_size: int, max_tries: int = 4) -> Tuple[np.ndarray, np.ndarray]:
+        # the transitions of unfinished or overwritten episodes, with ep_length 0, can not be sampled
+        upper_bound = self.buffer_size if self.full else self.pos
+        batch_indices = np.random.randint(0, max(upper_bound, 1), size=batch_size)
+        env_indices = np.random.randint(0, self.n_envs, size=batch_size)
+        for _ in range(max_tries):
+            invalid = np.flatnonzero(self.ep_length[batch_indices, env_indices] == 0)
+            if len(invalid) == 0:
+                return batch_indices, env_indices
+            batch_indices[invalid] = np.random.randint(0, max(upper_bound, 1), size=len(invalid))
+            env_indices[invalid] = np.random.randint(0, self.n_envs, size=len(invalid))
+        # mostly invalid transitions, e.g. before the end of the first episodes: draw among the valid ones
+        valid_indices = np.flatnonzero(self.ep_length > 0)
+        if len(valid_indices) == 0:
+            raise RuntimeError(
+                "Unable to sample before the end of the first episode. We recommend choosing a value "
+                "for learning_starts that is greater than the maximum number of timesteps in the environment."
+            )
+        invalid = np.flatnonzero(self.ep_length[batch_indices, env_indices] == 0)
+        sampled_indices = np.random.choice(valid_indices, size=len(invalid), replace=True)
+        batch_indices[invalid], env_indices[invalid] = np.unravel_index(sampled_indices, self.ep_length.shape)
+        return batch_indices, env_indices
+
+    def _get_samples(
+        self, batch_indices: np.ndarray, env_indices: np.ndarray, n_virtual: int, env: Optional[VecNormalize]
+    ) -> DictReplayBufferSamples:
+        # the first n_virtual transitions get a new goal and reward
+        observations = self.observations[batch_indices, env_indices].astype(np.float32)
+        next_observations = self._next_observations(batch_indices, env_indices)
+        desired_goals = self.desired_goals[batch_indices, env_indices].astype(np.float32)
+        rewards = self.rewards[batch_indices, env_indices].copy()
+        if n_virtual > 0:
+            desired_goals[:n_virtual] = self._sample_goals(batch_indices[:n_virtual], env_indices[:n_virtual])
+            rewards[:n_virtual] = self._compute_virtual_rewards(
+                next_observations[:n_virtual, self.goal_slice],
+                desired_goals[:n_virtual],
+                batch_indices[:n_virtual],
+                env_indices[:n_virtual],
+            )
+        obs = {
+            "observation": observations,
+            "achieved_goal": observations[:, self.goal_slice],
+            "desired_goal": desired_goals,
+        }
+        next_obs = {
+            "observation": next_observations,
+            "achieved_goal": next_observations[:, self.goal_slice],
+            "desired_goal": desired_goals,
+        }
+        obs = self._normalize_obs(obs, env)  # type: ignore[assignment]
+        next_obs = self._normalize_obs(next_obs, env)  # type: ignore[assignment]
+        dones = self.dones[batch_indices, env_indices] & ~self.timeouts[batch_indices, env_indices]
+        return DictReplayBufferSamples(
+            observations={key: self.to_torch(value) for key, value in obs.items()},
+            actions=self.to_torch(self.actions[batch_indices, env_indices].astype(np.float32)),
+            next_observations={key: self.to_torch(value) for key, value in next_obs.items()},
+            dones=self.to_torch(dones.astype(np.float32)).reshape(-1, 1),
+            rewards=self.to_torch(self._normalize_reward(rewards.reshape(-1, 1), env)),
+        )
+
+    def _compute_virtual_rewards(
+        self,
+        achieved_goals: np.ndarray,
+        desired_goals: np.ndarray,
+        batch_indices: np.ndarray,
+        env_indices: np.ndarray,
+    ) -> np.ndarray:
+        if self.compute_reward is not None:
+            return np.asarray(self.compute_reward(achieved_goals, desired_goals), dtype=np.float32)
+        if self.copy_info_dict:
+            infos = copy.deepcopy(self.infos[batch_indices, env_indices])
+        else:
+            infos = [{} for _ in range(len(batch_indices))]
+        assert self.env is not None, "You must initialize HerReplayBuffer with a VecEnv so it can compute rewards"
+        rewards = self.env.env_method("compute_reward", achieved_goals, desired_goals, infos, indices=[0])
+        return rewards[0].astype(np.float32)  # env_method returns a list containing one element
+
+    def _get_real_samples(
+        self, batch_indices: np.ndarray, env_indices: np.ndarray, env: Optional[VecNormalize] = None
+    ) -> DictReplayBufferSamples:
+        return self._get_samples(batch_indices, env_indices, 0, env)
+
+    def _get_virtual_samples(
+        self, batch_indices: np.ndarray, env_indices: np.ndarray, env: Optional[VecNormalize] = None
+    ) -> DictReplayBufferSamples:
+        return self._get_samples(batch_indices, env_indices, len(batch_indices), env)
+
+    def _sample_goals(self, batch_indices: np.ndarray, env_indices: np.ndarray) -> np.ndarray:
+        # the episode of a transition is [ep_start, ep_start + ep_length), modulo the buffer size
+        batch_ep_start = self.ep_start[batch_indices, env_indices]
+        batch_ep_length = self.ep_length[batch_indices, env_indices]
+        if self.goal_selection_strategy == GoalSelectionStrategy.FINAL:
+            transition_indices_in_episode = batch_ep_length - 1
+        elif self.goal_selection_strategy == GoalSelectionStrategy.FUTURE:
+            current_indices_in_episode = (batch_indices - batch_ep_start) % self.buffer_size
+            transition_indices_in_episode = np.random.randint(current_indices_in_episode, batch_ep_length)
+        elif self.goal_selection_strategy == GoalSelectionStrategy.EPISODE:
+            transition_indices_in_episode = np.random.randint(0, batch_ep_length)
+        else:
+            raise ValueError(f"Strategy {self.goal_selection_strategy} for sampling goals not supported!")
+        transition_indices = (transition_indices_in_episode + batch_ep_start) % self.buffer_size
+        return self._next_observations(transition_indices, env_indices)[:, self.goal_slice]
+
+    def truncate_last_trajectory(self) -> None:
+        # the last observation of a truncated episode is unknown, the one of its last transition is used instead
+        last = (self.pos - 1) % self.buffer_size
+        for env_idx in np.flatnonzero(self._current_ep_start != self.pos):
+            self._store_final(last, env_idx, self.observations[last, env_idx])
+        super().truncate_last_trajectory()
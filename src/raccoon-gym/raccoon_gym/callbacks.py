@@ -0,0 +1,128 @@
+"""Stable-Baselines3 callbacks."""
+import os
+from typing import Dict, List, Optional
+
+import numpy as np
+import torch as th
+
+from stable_baselines3.common.callbacks import BaseCallback
+
+from raccoon_gym.curriculum import Curriculum
+from raccoon_gym.profiler import BIN_LOWER_NS, BIN_UPPER_NS, N_BINS, PHASES, StepProfiler
+
+
+class StepProfilerCallback(BaseCallback):
+    """Log the per-phase step timing of the training envs, made with `profile=True`, beside the learning curves.
+
+    Every `log_freq` calls, the time recorded since the previous log is summed over the envs and written as
+    "env_profile/<phase>_mean_ms" and "env_profile/<phase>_share" scalars, and "env_profile/<phase>" histograms.
+
+    Args:
+        log_freq (int, optional): Number of callback calls (vectorized steps) between two logs. Defaults to 1000.
+        histograms (bool, optional): Whether to log the duration histograms. Defaults to True.
+        verbose (int, optional): Verbosity level. Defaults to 0.
+    """
+
+    def __init__(self, log_freq: int = 1000, histograms: bool = True, verbose: int = 0) -> None:
+        super().__init__(verbose)
+        self.log_freq = log_freq
+        self.histograms = histograms
+        self._previous: Optional[List[StepProfiler]] = None
+        # the histograms are rebuilt from the centers of the bins, in ms
+        self._bin_centers_ms = (BIN_LOWER_NS + BIN_UPPER_NS) / 2 * 1e-6
+
+    def _fetch(self) -> List[StepProfiler]:
+        # copies with SubprocVecEnv, the env instances themselves with DummyVecEnv
+        profilers = self.training_env.env_method("get_wrapper_attr", "profiler")
+        if any(profiler is None for profiler in profilers):
+            raise ValueError("StepProfilerCallback needs envs made with profile=True.")
+        return [_copy(profiler) for profiler in profilers]
+
+    def _on_training_start(self) -> None:
+        self._previous = self._fetch()
+
+    def _on_step(self) -> bool:
+        if self.n_calls % self.log_freq != 0:
+            return True
+        current = self._fetch()
+        total_ns: Dict[str, int] = {phase: 0 for phase in PHASES}
+        counts: Dict[str, int] = {phase: 0 for phase in PHASES}
+        histograms = {phase: np.zeros(N_BINS, dtype=np.int64) for phase in PHASES}
+        for now, before in zip(current, self._previous):
+            for phase in PHASES:
+                total_ns[phase] += now.total_ns[phase] - before.total_ns[phase]
+                counts[phase] += now.counts[phase] - before.counts[phase]
+                histograms[phase] += np.subtract(now.histograms[phase], before.histograms[phase])
+        self._previous = current
+
+        for phase in PHASES:
+            if counts[phase] == 0:
+                continue
+            self.logger.record(f"env_profile/{phase}_mean_ms", total_ns[phase] / counts[phase] * 1e-6)
+            if total_ns["step"]:
+                self.logger.record(f"env_profile/{phase}_share", total_ns[phase] / total_ns["step"])
+            if self.histograms:
+                durations = th.as_tensor(np.repeat(self._bin_centers_ms, histograms[phase]))
+                self.logger.record(f"env_profile/{phase}", durations, exclude=("stdout", "log", "json", "csv"))
+        return True
+
+
+class CurriculumCallback(BaseCallback):
+    """Log the state of the `Curriculum` of the training envs, and checkpoint it beside the models.
+
+    Every `log_freq` calls, "curriculum/level", "curriculum/goal_range_scale", "curriculum/distance_threshold" and
+    "curriculum/success_rate" are recorded. Every `save_freq` calls, the state is written to
+    "<save_path>/<name_prefix>_curriculum_<steps>_steps.json", beside the files of a `CheckpointCallback` with the same
+    prefix and frequency, to resume with `Curriculum.load`.
+
+    Args:
+        curriculum (Curriculum): Curriculum of the training envs.
+        save_freq (int, optional): Number of callback calls between two checkpoints. Defaults to 0, never.
+        save_path (str, optional): Directory of the checkpoints. Defaults to None.
+        name_prefix (str, optional): Prefix of the checkpoints. Defaults to "rl_model".
+        log_freq (int, optional): Number of callback calls between two logs. Defaults to 1000.
+        verbose (int, optional): Verbosity level. Defaults to 0.
+    """
+
+    def __init__(
+        self,
+        curriculum: Curriculum,
+        save_freq: int = 0,
+        save_path: Optional[str] = None,
+        name_prefix: str = "rl_model",
+        log_freq: int = 1000,
+        verbose: int = 0,
+    ) -> None:
+        super().__init__(verbose)
+        if save_freq and save_path is None:
+            raise ValueError("CurriculumCallback needs a save_path to save checkpoints.")
+        self.curriculum = curriculum
+        self.save_freq = save_freq
+        self.save_path = save_path
+        self.name_prefix = name_prefix
+        self.log_freq = log_freq
+
+    def _init_callback(self) -> None:
+        if self.save_path is not None:
+            os.makedirs(self.save_path, exist_ok=True)
+
+    def _on_step(self) -> bool:
+        if self.n_calls % self.log_freq == 0:
+            state = self.curriculum.state_dict()
+            for key in ("level", "goal_range_scale", "distance_threshold", "success_rate"):
+                if state[key] is not None:
+                    self.logger.record(f"curriculum/{key}", state[key])
+        if self.save_freq and self.n_calls % self.save_freq == 0:
+            file_name = os.path.join(self.save_path, f"{self.name_prefix}_curriculum_{self.num_timesteps}_steps.json")
+            self.curriculum.save(file_name)
+            if self.verbose >= 2:
+                print(f"Saving curriculum to {file_name}")
+        return True
+
+
+def _copy(profiler: StepProfiler) -> StepProfiler:
+    copy = StepProfiler()
+    copy.total_ns = dict(profiler.total_ns)
+    copy.counts = dict(profiler.counts)
+    copy.histograms = {phase: list(histogram) for phase, histogram in profiler.histograms.items()}
+    return copy
@@ -0,0 +1,248 @@
+"""Goal curriculum of the reach tasks: the goal box grows and the success radius shrinks as the success rate rises.
+
+The level of the curriculum and its success counters live in a `multiprocessing.shared_memory` block, so that every
+env of a run, in the main process or in `SubprocVecEnv` / `SharedMemoryReachVecEnv` workers, draws its goals at the
+same level and contributes to the same success rate. A `Curriculum` is pickled as the name of its block: passing it
+in the `env_kwargs` is enough for the workers to attach to it.
+
+Difficulty updates are batched: every process buffers the outcomes of its episodes, and adds them to the shared
+counters every `flush_episodes` episodes, under a file lock. Once `window` episodes of the current level are counted,
+the success rate is evaluated and the level moves up, down, or stays, then the counters restart. The episodes still
+buffered for another level are dropped, so that every evaluation only counts episodes played at the evaluated level.
+The tasks read the level at reset, which is a read of the shared block, without the lock.
+"""
+import fcntl
+import json
+import math
+import os
+import tempfile
+from multiprocessing import shared_memory
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+# layout of the shared state
+_LEVEL, _EPISODES, _SUCCESSES, _TOTAL_EPISODES, _TOTAL_SUCCESSES, _N_UPDATES, _SUCCESS_RATE = range(7)
+_STATE_SIZE = 7
+
+
+class Curriculum:
+    """Goal box and success radius of the reach tasks, scheduled on the success rate shared by all the envs.
+
+    The levels interpolate linearly from the first to the last value of `goal_range_scale` and `distance_threshold`.
+
+    Args:
+        goal_range_scale (Tuple[float, float], optional): Side of the goal sampling box at the first and at the last
+            level, as a fraction of the goal range of the task. Defaults to (0.2, 1.0).
+        distance_threshold (Tuple[float, float], optional): Success radius at the first and at the last level, in
+            m. Defaults to (0.15, 0.05).
+        n_levels (int, optional): Number of levels. Defaults to 10.
+        window (int, optional): Number of episodes of the current level between two evaluations of the success
+            rate. Defaults to 200.
+        promote_success_rate (float, optional): Success rate from which the next level starts. Defaults to 0.8.
+        demote_success_rate (float, optional): Success rate under which the previous level comes back. Defaults
+            to None, never.
+        flush_episodes (int, optional): Number of episodes every process buffers before adding them to the shared
+            counters. Defaults to 10.
+        name (str, optional): Name of the shared memory block of an existing curriculum, to attach to it, with the
+            same arguments. Defaults to None, a new curriculum at level 0.
+    """
+
+    def __init__(
+        self,
+        goal_range_scale: Tuple[float, float] = (0.2, 1.0),
+        distance_threshold: Tuple[float, float] = (0.15, 0.05),
+        n_levels: int = 10,
+        window: int = 200,
+        promote_success_rate: float = 0.8,
+        demote_success_rate: Optional[float] = None,
+        flush_episodes: int = 10,
+        name: Optional[str] = None,
+    ) -> None:
+        if n_levels < 1:
+            raise ValueError(f"n_levels must be at least 1, got {n_levels}.")
+        if demote_success_rate is not None and demote_success_rate >= promote_success_rate:
+            raise ValueError("demote_success_rate must be lower than promote_success_rate.")
+        self.goal_range_scale = (float(goal_range_scale[0]), float(goal_range_scale[1]))
+        self.distance_threshold = (float(distance_threshold[0]), float(distance_threshold[1]))
+        self.n_levels = n_levels
+        self.window = window
+        self.promote_success_rate = promote_success_rate
+        self.demote_success_rate = demote_success_rate
+        self.flush_episodes = flush_episodes
+        self._owner = name is None
+        if self._owner:
+            self._block = shared_memory.SharedMemory(create=True, size=_STATE_SIZE * 8)
+        else:
+            self._block = shared_memory.SharedMemory(name=name)
+        self._state = np.ndarray((_STATE_SIZE,), dtype=np.float64, buffer=self._block.buf)
+        if self._owner:
+            self._state[:] = 0.0
+            self._state[_SUCCESS_RATE] = math.nan
+        self._lock_file: Optional[int] = None  # opened on first use, in every process
+        # outcomes not yet flushed, per level: [episodes, successes]
+        self._pending: Dict[int, np.ndarray] = {}
+
+    @property
+    def name(self) -> str:
+        """Name of the shared memory block."""
+        return self._block.name
+
+    @property
+    def level(self) -> int:
+        """Current level, from 0 to `n_levels` - 1."""
+        return int(self._state[_LEVEL])
+
+    @property
+    def success_rate(self) -> float:
+        """Success rate of the last evaluation, nan before the first one."""
+        return float(self._state[_SUCCESS_RATE])
+
+    def params(self, level: Optional[int] = None) -> Tuple[float, float]:
+        """Goal range scale and distance threshold of a level.
+
+        Args:
+            level (int, optional): Level. Defaults to the current level.
+
+        Returns:
+            Tuple[float, float]: The scale of the goal box of the task, and the success radius, in m.
+        """
+        level = self.level if level is None else level
+        fraction = level / (self.n_levels - 1) if self.n_levels > 1 else 1.0
+        goal_range_scale = self.goal_range_scale[0] + fraction * (self.goal_range_scale[1] - self.goal_range_scale[0])
+        distance_threshold = self.distance_threshold[0] + fraction * (
+            self.distance_threshold[1] - self.distance_threshold[0]
+        )
+        return goal_range_scale, distance_threshold
+
+    def record(self, success: bool, level: int) -> None:
+        """Count the outcome of an episode, flushed to the shared counters every `flush_episodes` episodes.
+
+        Args:
+            success (bool): Whether the episode ended on success.
+            level (int): Level the episode was played at.
+        """
+        pending = self._pending.get(level)
+        if pending is None:
+            pending = self._pending[level] = np.zeros(2, dtype=np.int64)
+        pending[0] += 1
+        pending[1] += bool(success)
+        if sum(int(counts[0]) for counts in self._pending.values()) >= self.flush_episodes:
+            self.flush()
+
+    def flush(self) -> None:
+        """Add the buffered outcomes of the current level to the shared counters, and evaluate the level once
+        `window` episodes are counted."""
+        with self._locked():
+            level = self.level
+            pending = self._pending.get(level)
+            self._pending.clear()
+            if pending is None:
+                return
+            state = self._state
+            state[_EPISODES] += pending[0]
+            state[_SUCCESSES] += pending[1]
+            state[_TOTAL_EPISODES] += pending[0]
+            state[_TOTAL_SUCCESSES] += pending[1]
+            if state[_EPISODES] < self.window:
+                return
+            success_rate = state[_SUCCESSES] / state[_EPISODES]
+            if success_rate >= self.promote_success_rate and level < self.n_levels - 1:
+                state[_LEVEL] = level + 1
+            elif self.demote_success_rate is not None and success_rate < self.demote_success_rate and level > 0:
+                state[_LEVEL] = level - 1
+            state[_SUCCESS_RATE] = success_rate
+            state[_EPISODES] = state[_SUCCESSES] = 0
+            state[_N_UPDATES] += 1
+
+    def state_dict(self) -> Dict[str, Any]:
+        """Shared state, e.g. to checkpoint it beside a model."""
+        state = self._state.copy()
+        return {
+            "level": int(state[_LEVEL]),
+            "goal_range_scale": self.params(int(state[_LEVEL]))[0],
+            "distance_threshold": self.params(int(state[_LEVEL]))[1],
+            "success_rate": None if math.isnan(state[_SUCCESS_RATE]) else float(state[_SUCCESS_RATE]),
+            "episodes": int(state[_EPISODES]),
+            "successes": int(state[_SUCCESSES]),
+            "total_episodes": int(state[_TOTAL_EPISODES]),
+            "total_successes": int(state[_TOTAL_SUCCESSES]),
+            "n_updates": int(state[_N_UPDATES]),
+        }
+
+    def load_state_dict(self, state_dict: Dict[str, Any]) -> None:
+        """Restore a state returned by `state_dict`, e.g. to resume a run."""
+        with self._locked():
+            self._state[_LEVEL] = min(int(state_dict["level"]), self.n_levels - 1)
+            success_rate = state_dict.get("success_rate")
+            self._state[_SUCCESS_RATE] = math.nan if success_rate is None else success_rate
+            for index, key in [
+                (_EPISODES, "episodes"),
+                (_SUCCESSES, "successes"),
+                (_TOTAL_EPISODES, "total_episodes"),
+                (_TOTAL_SUCCESSES, "total_successes"),
+                (_N_UPDATES, "n_updates"),
+            ]:
+                self._state[index] = state_dict.get(key, 0)
+
+    def save(self, file_name: str) -> None:
+        """Write `state_dict` to a JSON file."""
+        with open(file_name, "w") as file:
+            json.dump(self.state_dict(), file, indent=2)
+
+    def load(self, file_name: str) -> None:
+        """Restore the state of a JSON file written by `save`."""
+        with open(file_name) as file:
+            self.load_state_dict(json.load(file))
+
+    def close(self) -> None:
+        """Detach from the shared state. The curriculum that created it also frees it."""
+        if self._block is None:
+            return
+        self._state = None
+        self._block.close()
+        if self._owner:
+            self._block.unlink()
+            if os.path.exists(self._lock_path()):
+                os.remove(self._lock_path())
+        if self._lock_file is not None:
+            os.close(self._lock_file)
+            self._lock_file = None
+        self._block = None
+
+    def _lock_path(self) -> str:
+        return os.path.join(tempfile.gettempdir(), f"raccoon_gym_curriculum_{self.name.lstrip('/')}.lock")
+
+    def _locked(self) -> "_FileLock":
+        if self._lock_file is None:
+            self._lock_file = os.open(self._lock_path(), os.O_RDWR | os.O_CREAT, 0o600)
+        return _FileLock(self._lock_file)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # the workers attach to the block by name, and start with no buffered outcome
+        return {
+            "goal_range_scale": self.goal_range_scale,
+            "distance_threshold": self.distance_threshold,
+            "n_levels": self.n_levels,
+            "window": self.window,
+            "promote_success_rate": self.promote_success_rate,
+            "demote_success_rate": self.demote_success_rate,
+            "flush_episodes": self.flush_episodes,
+            "name": self.name,
+        }
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__init__(**state)
+
+
+class _FileLock:
+    """Exclusive `flock` of an open file, shared by the processes of a run."""
+
+    def __init__(self, fd: int) -> None:
+        self.fd = fd
+
+    def __enter__(self) -> None:
+        fcntl.flock(self.fd, fcntl.LOCK_EX)
+
+    def __exit__(self, *args) -> None:
+        fcntl.flock(self.fd, fcntl.LOCK_UN)
@@ -0,0 +1,291 @@
+"""Record transitions to disk, and read them back in shuffled batches, for offline RL and behavior cloning.
+
+A dataset is a directory with a `metadata.json` and shards of `shard_size` transitions. Every shard holds one column
+per field: the keys of the observation, the same keys prefixed by "next_", "action", "reward", "terminated",
+"truncated", "is_success" and "episode". Uncompressed shards are directories of `.npy` files, which the loader
+memory-maps. Compressed shards are `.npz` files, decompressed when the loader reaches them.
+
+    env = DatasetRecorder(gym.make("RaccoonKr16ReachJoints-v1", headless=True), "datasets/kr16_random")
+    ...  # run any policy
+    env.close()
+
+    for batch in DatasetLoader(["datasets/kr16_random"], batch_size=256):
+        ...  # batch["observation"], batch["action"], ...
+"""
+import json
+import os
+import queue
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import gymnasium as gym
+import numpy as np
+
+METADATA = "metadata.json"
+
+
+def _write_json(path: str, data: Dict) -> None:
+    with open(path + ".tmp", "w") as file:
+        json.dump(data, file, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+class DatasetRecorder(gym.Wrapper):
+    """Record the transitions of an env with a `Dict` observation space to a dataset directory.
+
+    The transitions are copied into preallocated columns. When `shard_size` transitions are recorded, the columns are
+    handed to a background thread that writes them, and new columns are allocated. When the writer falls behind by
+    `max_queue` shards, `step` blocks until a shard is written, so that the memory stays bounded. An error of the
+    writer is raised by the next call. The metadata is updated after every shard, so that an interrupted recording
+    can be read up to its last shard.
+
+    Record every env of a vectorized env in its own directory, and give them all to the `DatasetLoader`.
+
+    Args:
+        env (gym.Env): Environment to record.
+        path (str): Directory of the dataset. It must not contain a dataset already.
+        shard_size (int, optional): Number of transitions per shard. Defaults to 100000.
+        compress (bool, optional): Write compressed `.npz` shards, which can not be memory-mapped. Defaults to False.
+        max_queue (int, optional): Maximum number of shards waiting to be written. Defaults to 2.
+    """
+
+    def __init__(
+        self, env: gym.Env, path: str, shard_size: int = 100_000, compress: bool = False, max_queue: int = 2
+    ) -> None:
+        super().__init__(env)
+        if not isinstance(env.observation_space, gym.spaces.Dict):
+            raise ValueError(f"DatasetRecorder needs a Dict observation space, got {env.observation_space}.")
+        if os.path.exists(os.path.join(path, METADATA)):
+            raise FileExistsError(f"{path} already contains a dataset.")
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.shard_size = shard_size
+        self.compress = compress
+        self.columns: Dict[str, Tuple[Tuple[int, ...], np.dtype]] = {}
+        for key, space in env.observation_space.spaces.items():
+            self.columns[key] = self.columns[f"next_{key}"] = (space.shape, np.dtype(space.dtype))
+        self.columns.update(
+            action=(env.action_space.shape, np.dtype(env.action_space.dtype)),
+            reward=((), np.dtype(np.float32)),
+            terminated=((), np.dtype(np.bool_)),
+            truncated=((), np.dtype(np.bool_)),
+            is_success=((), np.dtype(np.bool_)),
+            episode=((), np.dtype(np.int64)),
+        )
+        self.n_transitions = 0
+        self.n_episodes = 0
+        self._episode_steps = 0  # transitions of the current episode
+        self._shards: List[Dict[str, Any]] = []
+        self._n_shards = 0
+        self._data = self._allocate()
+        self._n = 0
+        self._observation: Optional[Dict[str, np.ndarray]] = None
+        self._closed = False
+        self._queue: "queue.Queue[Optional[Tuple[int, Dict[str, np.ndarray]]]]" = queue.Queue(maxsize=max_queue)
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._write, name="DatasetRecorder", daemon=True)
+        self._thread.start()
+
+    def _allocate(self) -> Dict[str, np.ndarray]:
+        return {name: np.empty((self.shard_size,) + shape, dtype) for name, (shape, dtype) in self.columns.items()}
+
+    def _write(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            if self._error is None:  # keep draining, so that step never blocks forever
+                try:
+                    self._write_shard(*item)
+                except BaseException as error:
+                    self._error = error
+
+    def _write_shard(self, index: int, data: Dict[str, np.ndarray]) -> None:
+        # written under a temporary name, then renamed, so that a shard is either complete or absent
+        name = f"shard_{index:06d}" + (".npz" if self.compress else "")
+        shard_path = os.path.join(self.path, name)
+        if self.compress:
+            with open(shard_path + ".tmp", "wb") as file:
+                np.savez_compressed(file, **data)
+        else:
+            os.makedirs(shard_path + ".tmp", exist_ok=True)
+            for column, array in data.items():
+                np.save(os.path.join(shard_path + ".tmp", f"{column}.npy"), array)
+        os.replace(shard_path + ".tmp", shard_path)
+        self._shards.append({"name": name, "n_transitions": len(data["episode"])})
+        self._write_metadata()
+
+    def _write_metadata(self) -> None:
+        columns = {name: {"shape": list(shape), "dtype": dtype.str} for name, (shape, dtype) in self.columns.items()}
+        _write_json(
+            os.path.join(self.path, METADATA),
+            {
+                "env_id": self.env.spec.id if self.env.spec is not None else None,
+                "columns": columns,
+                "n_transitions": sum(shard["n_transitions"] for shard in self._shards),
+                "shards": self._shards,
+            },
+        )
+
+    def _raise(self) -> None:
+        if self._error is not None:
+            raise RuntimeError(f"Could not write the dataset {self.path}") from self._error
+
+    def _flush(self) -> None:
+        if self._n == 0:
+            return
+        self._raise()
+        self._queue.put((self._n_shards, {name: array[: self._n] for name, array in self._data.items()}))
+        self._n_shards += 1
+        self._data = self._allocate()
+        self._n = 0
+
+    def reset(self, **kwargs: Any) -> Tuple[Dict[str, np.ndarray], Dict[str, Any]]:
+        observation, info = self.env.reset(**kwargs)
+        # an episode reset before its end gets its own id too
+        if self._episode_steps > 0:
+            self.n_episodes += 1
+            self._episode_steps = 0
+        # copied: the env may write its next observation in the same arrays
+        self._observation = {key: np.array(value) for key, value in observation.items()}
+        return observation, info
+
+    def step(self, action: np.ndarray) -> Tuple[Dict[str, np.ndarray], float, bool, bool, Dict[str, Any]]:
+        if self._observation is None:
+            raise RuntimeError("Call reset before step.")
+        observation, reward, terminated, truncated, info = self.env.step(action)
+        data, row = self._data, self._n
+        for key, value in self._observation.items():
+            data[key][row] = value
+            data[f"next_{key}"][row] = observation[key]
+            np.copyto(value, observation[key])
+        data["action"][row] = action
+        data["reward"][row] = reward
+        data["terminated"][row] = terminated
+        data["truncated"][row] = truncated
+        data["is_success"][row] = info.get("is_success", False)
+        data["episode"][row] = self.n_episodes
+        self._n += 1
+        self.n_transitions += 1
+        self._episode_steps += 1
+        if terminated or truncated:
+            self.n_episodes += 1
+            self._episode_steps = 0
+        if self._n == self.shard_size:
+            self._flush()
+        return observation, reward, terminated, truncated, info
+
+    def close(self) -> None:
+        """Write the last, partial, shard and the metadata, and close the env."""
+        if not self._closed:
+            self._closed = True
+            self._flush()
+            self._queue.put(None)
+            self._thread.join()
+            if self._error is None:
+                self._write_metadata()
+            self.env.close()
+        self._raise()
+
+
+class DatasetLoader:
+    """Iterate over the transitions of datasets, in shuffled batches, without loading them whole.
+
+    Every epoch, the shards are taken in a random order, `shards_in_memory` at a time, and the transitions of those
+    shards are shuffled together. Uncompressed shards are memory-mapped: only the rows of the batches are read.
+    Compressed shards are decompressed in memory while they are in use.
+
+    Args:
+        paths (Sequence[str]): Dataset directories, written by `DatasetRecorder`, with the same columns.
+        batch_size (int, optional): Number of transitions per batch. Defaults to 256.
+        shuffle (bool, optional): Shuffle the shards and the transitions. Defaults to True.
+        shards_in_memory (int, optional): Number of shards shuffled together. Defaults to 4.
+        columns (Sequence[str], optional): Columns to read. Defaults to all of them.
+        drop_last (bool, optional): Drop the last batch of an epoch if it is smaller than `batch_size`.
+            Defaults to False.
+        seed (int, optional): Seed of the shuffling. Defaults to None.
+    """
+
+    def __init__(
+        self,
+        paths: Sequence[str],
+        batch_size: int = 256,
+        shuffle: bool = True,
+        shards_in_memory: int = 4,
+        columns: Optional[Sequence[str]] = None,
+        drop_last: bool = False,
+        seed: Optional[int] = None,
+    ) -> None:
+        if isinstance(paths, str):
+            paths = [paths]
+        self.metadata = []
+        self.shards: List[Tuple[str, int]] = []
+        for path in paths:
+            with open(os.path.join(path, METADATA)) as file:
+                metadata = json.load(file)
+            if self.metadata and metadata["columns"] != self.metadata[0]["columns"]:
+                raise ValueError(f"The columns of {path} differ from the ones of {paths[0]}.")
+            self.metadata.append(metadata)
+            self.shards += [(os.path.join(path, shard["name"]), shard["n_transitions"]) for shard in metadata["shards"]]
+        self.columns = list(columns) if columns is not None else list(self.metadata[0]["columns"])
+        self.n_transitions = sum(n_transitions for _, n_transitions in self.shards)
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.shards_in_memory = shards_in_memory
+        self.drop_last = drop_last
+        self.rng = np.random.default_rng(seed)
+
+    def __len__(self) -> int:
+        """Number of batches per epoch."""
+        if self.drop_last:
+            return self.n_transitions // self.batch_size
+        return -(-self.n_transitions // self.batch_size)
+
+    def _open(self, shard_path: str) -> Dict[str, np.ndarray]:
+        if shard_path.endswith(".npz"):
+            with np.load(shard_path) as data:
+                return {column: data[column] for column in self.columns}
+        return {column: np.load(os.path.join(shard_path, f"{column}.npy"), mmap_mode="r") for column in self.columns}
+
+    def __iter__(self) -> Iterator[Dict[str, np.ndarray]]:
+        order = self.rng.permutation(len(self.shards)) if self.shuffle else np.arange(len(self.shards))
+        carry: Optional[Dict[str, np.ndarray]] = None
+        for start in range(0, len(order), self.shards_in_memory):
+            shards = [self._open(self.shards[i][0]) for i in order[start : start + self.shards_in_memory]]
+            sizes = [len(shard[self.columns[0]]) for shard in shards]
+            offsets = np.cumsum([0] + sizes)
+            rows = self.rng.permutation(offsets[-1]) if self.shuffle else np.arange(offsets[-1])
+            first = 0
+            if carry is not None:
+                # complete the last batch of the previous shards
+                first = self.batch_size - len(carry[self.columns[0]])
+                batch = self._gather(shards, offsets, rows[:first])
+                carry = {column: np.concatenate([carry[column], batch[column]]) for column in self.columns}
+                if len(carry[self.columns[0]]) < self.batch_size:
+                    continue
+                yield carry
+                carry = None
+            for batch_start in range(first, len(rows), self.batch_size):
+                batch = self._gather(shards, offsets, rows[batch_start : batch_start + self.batch_size])
+                if len(batch[self.columns[0]]) < self.batch_size:
+                    carry = batch
+                else:
+                    yield batch
+        if carry is not None and not self.drop_last:
+            yield carry
+
+    def _gather(
+        self, shards: List[Dict[str, np.ndarray]], offsets: np.ndarray, rows: np.ndarray
+    ) -> Dict[str, np.ndarray]:
+        # sorted, so that the memory-mapped files are read in order; the order within a batch does not matter
+        rows = np.sort(rows) if self.shuffle else rows
+        shard_indices = np.searchsorted(offsets, rows, side="right") - 1
+        selections = [(shard, rows[shard_indices == i] - offsets[i]) for i, shard in enumerate(shards)]
+        batch = {}
+        for column in self.columns:
+            metadata = self.metadata[0]["columns"][column]
+            parts = [shard[column][shard_rows] for shard, shard_rows in selections if len(shard_rows)]
+            batch[column] = (
+                np.concatenate(parts) if parts else np.empty([0] + metadata["shape"], np.dtype(metadata["dtype"]))
+            )
+        return batch
@@ -1,23 +1,31 @@
-from raccoon_gym.envs.raccoon_env import (
-    Kr300R2500UltraReachEnv
-)
+import importlib
 
-from raccoon_gym.envs.raccoon_env import (
-    Kr16ReachEnv
-)
+# the env classes are imported on first access, so that importing this package does not load pybullet
+_LAZY_ATTRIBUTES = {
+    "Kr300R2500UltraReachEnv": "raccoon_gym.envs.raccoon_env",
+    "Kr16ReachEnv": "raccoon_gym.envs.raccoon_env",
+    "Kr210ReachEnv": "raccoon_gym.envs.raccoon_env",
+    "Kr3ReachEnv": "raccoon_gym.envs.raccoon_env",
+    "Rv7fReachEnv": "raccoon_gym.envs.raccoon_env",
+    "RCCNWestRobotReachEnv": "raccoon_gym.envs.raccoon_env",
+    "ReachEnv": "raccoon_gym.envs.raccoon_env",
+    "VectorReachEnv": "raccoon_gym.envs.vector_env",
+    "ArmRobot": "raccoon_gym.envs.robots.arm",
+    "ReachTask": "raccoon_gym.envs.tasks.reach",
+    "RobotSpec": "raccoon_gym.envs.specs",
+    "ROBOT_SPECS": "raccoon_gym.envs.specs",
+}
 
-from raccoon_gym.envs.raccoon_env import (
-    Kr210ReachEnv
-)
+__all__ = list(_LAZY_ATTRIBUTES)
 
-from raccoon_gym.envs.raccoon_env import (
-    Kr3ReachEnv
-)
 
-from raccoon_gym.envs.raccoon_env import (
-    Rv7fReachEnv
-)
+def __getattr__(name: str):
+    if name not in _LAZY_ATTRIBUTES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_LAZY_ATTRIBUTES[name]), name)
+    globals()[name] = value  # next accesses skip __getattr__
+    return value
 
-from raccoon_gym.envs.raccoon_env import (
-    RCCNWestRobotReachEnv
-)
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
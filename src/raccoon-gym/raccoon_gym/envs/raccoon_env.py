@@ -1,88 +1,105 @@
-from typing import Optional
+import copy
+import functools
+import math
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple, Union
 
+import gymnasium as gym
 import numpy as np
+from gymnasium.utils import seeding
 
 from panda_gym.envs.core import RobotTaskEnv
 from panda_gym.pybullet import PyBullet
 
-# KR300 R2500 ultra
-from raccoon_gym.envs.robots.kuka_kr300r2500ultra import Kr300R2500Ultra
-from raccoon_gym.envs.tasks.kr300r2500ultra_reach import Kr300R2500UltraReach
+from raccoon_gym.curriculum import Curriculum
+from raccoon_gym.envs.robots.arm import ArmRobot
+from raccoon_gym.envs.specs import ROBOT_SPECS, RobotSpec
+from raccoon_gym.envs.tasks.reach import ReachTask
+from raccoon_gym.headless import HeadlessPyBullet
+from raccoon_gym.kinematics import KinematicChain
+from raccoon_gym.profiler import instrument
+from raccoon_gym.rendering import Camera, render_frame
+from raccoon_gym.utils import reward_from_distance, success_from_distance
 
-# KR16
-from raccoon_gym.envs.robots.kuka_kr16 import Kr16
-from raccoon_gym.envs.tasks.kr16_reach import Kr16Reach
 
-# KR210
-from raccoon_gym.envs.robots.kuka_kr210 import Kr210
-from raccoon_gym.envs.tasks.kr210_reach import Kr210Reach
+@functools.lru_cache(maxsize=None)
+def _joint_lever_arm(spec: RobotSpec) -> float:
+    # sum of the distances from the joint axes to the end-effector at the neutral pose, for "joints" control
+    chain = KinematicChain(spec.file_name, spec.ee_link, spec.joint_indices)
+    jacobian, _, _ = chain.jacobian(np.array(spec.neutral_joint_values))
+    return float(np.linalg.norm(jacobian[:3], axis=0).sum())
 
-# KR16
-from raccoon_gym.envs.robots.kuka_kr3 import Kr3
-from raccoon_gym.envs.tasks.kr3_reach import Kr3Reach
 
-# Mitsubishi RV-7F
-from raccoon_gym.envs.robots.mitsubishi_rv7f import Rv7f
-from raccoon_gym.envs.tasks.rv7f_reach import Rv7fReach
+def ee_speed_bound(spec: RobotSpec, control_type: str, displacement_scale: float = 0.15) -> float:
+    """Upper bound of the end-effector displacement per step, in m.
+
+    Args:
+        spec (RobotSpec): Description of the robot.
+        control_type (str): "ee" or "joints".
+        displacement_scale (float, optional): Scale of the actions, in m or rad. Defaults to 0.15.
+
+    Returns:
+        float: The displacement of an action of norm 1 per coordinate for "ee" control, and the one of all the
+            joints moving by `displacement_scale` at the neutral pose for "joints" control.
+    """
+    if control_type == "ee":
+        return displacement_scale
+    return displacement_scale * _joint_lever_arm(spec)
 
-# Raccoon West
-from raccoon_gym.envs.robots.rccn_west_robot import RCCNWestRobot
-from raccoon_gym.envs.tasks.rccn_west_robot_reach import RCCNWestRobotReach
 
+def make_sim(
+    spec: RobotSpec,
+    headless: bool = False,
+    render_mode: str = "rgb_array",
+    renderer: str = "Tiny",
+    physics_timestep: Optional[float] = None,
+    n_substeps: Optional[int] = None,
+    solver_iterations: Optional[int] = None,
+) -> PyBullet:
+    """Connect to PyBullet with the physics settings of a robot, overridden by the arguments.
 
-class Kr300R2500UltraReachEnv(RobotTaskEnv):
-    """Reach task wih Panda robot.
+    The settings are checked before connecting, so that an error does not leave a physics server behind.
 
     Args:
-        render_mode (str, optional): Render mode. Defaults to "rgb_array".
-        reward_type (str, optional): "sparse" or "dense". Defaults to "sparse".
-        control_type (str, optional): "ee" to control end-effector position or "joints" to control joint values.
-            Defaults to "ee".
-        renderer (str, optional): Renderer, either "Tiny" or OpenGL". Defaults to "Tiny" if render mode is "human"
-            and "OpenGL" if render mode is "rgb_array". Only "OpenGL" is available for human render mode.
-        render_width (int, optional): Image width. Defaults to 720.
-        render_height (int, optional): Image height. Defaults to 480.
-        render_target_position (np.ndarray, optional): Camera targetting this postion, as (x, y, z).
-            Defaults to [0., 0., 0.].
-        render_distance (float, optional): Distance of the camera. Defaults to 1.4.
-        render_yaw (float, optional): Yaw of the camera. Defaults to 45.
-        render_pitch (float, optional): Pitch of the camera. Defaults to -30.
-        render_roll (int, optional): Rool of the camera. Defaults to 0.
+        spec (RobotSpec): Description of the robot.
+        headless (bool, optional): Connect a `HeadlessPyBullet`, see `raccoon_gym.headless`. Defaults to False.
+        render_mode (str, optional): Render mode, ignored if `headless`. Defaults to "rgb_array".
+        renderer (str, optional): Renderer, ignored if `headless`. Defaults to "Tiny".
+        physics_timestep (float, optional): Physics timestep, in s. Defaults to the one of the spec, or 1/500 s.
+        n_substeps (int, optional): Physics steps per `sim.step`. Defaults to the one of the spec, or 20.
+        solver_iterations (int, optional): Constraint solver iterations per physics step. Defaults to the one of the
+            spec, or the PyBullet default of 50.
+
+    Returns:
+        PyBullet: The simulation.
     """
+    n_substeps = n_substeps if n_substeps is not None else spec.n_substeps or 20
+    physics_timestep = physics_timestep if physics_timestep is not None else spec.timestep
+    solver_iterations = solver_iterations if solver_iterations is not None else spec.solver_iterations
+    if n_substeps < 1:
+        raise ValueError(f"n_substeps must be at least 1, got {n_substeps}.")
+    if physics_timestep is not None and physics_timestep <= 0:
+        raise ValueError(f"physics_timestep must be positive, got {physics_timestep}.")
+    if solver_iterations is not None and solver_iterations < 1:
+        raise ValueError(f"solver_iterations must be at least 1, got {solver_iterations}.")
+    if headless:
+        sim = HeadlessPyBullet(n_substeps=n_substeps)
+    else:
+        sim = PyBullet(render_mode=render_mode, n_substeps=n_substeps, renderer=renderer)
+    if physics_timestep is not None:
+        sim.timestep = physics_timestep
+        sim.physics_client.setTimeStep(physics_timestep)
+    if solver_iterations is not None:
+        sim.physics_client.setPhysicsEngineParameter(numSolverIterations=solver_iterations)
+    return sim
 
-    def __init__(
-        self,
-        render_mode: str = "rgb_array",
-        reward_type: str = "sparse",
-        control_type: str = "ee",
-        renderer: str = "Tiny",
-        render_width: int = 720,
-        render_height: int = 480,
-        render_target_position: Optional[np.ndarray] = None,
-        render_distance: float = 2.4,
-        render_yaw: float = 45,
-        render_pitch: float = -30,
-        render_roll: float = 0,
-    ) -> None:
-        sim = PyBullet(render_mode=render_mode, renderer=renderer)
-        robot = Kr300R2500Ultra(sim, base_position=np.array([-1.5, 0.0, 0.0]), control_type=control_type)
-        task = Kr300R2500UltraReach(sim, reward_type=reward_type, get_ee_position=robot.get_ee_position)
-        super().__init__(
-            robot,
-            task,
-            render_width=render_width,
-            render_height=render_height,
-            render_target_position=render_target_position,
-            render_distance=render_distance,
-            render_yaw=render_yaw,
-            render_pitch=render_pitch,
-            render_roll=render_roll,
-        )
 
-class Kr16ReachEnv(RobotTaskEnv):
-    """Reach task wih Panda robot.
+class ReachEnv(RobotTaskEnv):
+    """Reach task with a robot arm described by a `RobotSpec`.
 
     Args:
+        robot (str or RobotSpec, optional): Name of the robot in `ROBOT_SPECS`, e.g. "Kr16", or its spec. Defaults
+            to the `robot_spec` class attribute.
         render_mode (str, optional): Render mode. Defaults to "rgb_array".
         reward_type (str, optional): "sparse" or "dense". Defaults to "sparse".
         control_type (str, optional): "ee" to control end-effector position or "joints" to control joint values.
@@ -97,10 +114,57 @@ class Kr16ReachEnv(RobotTaskEnv):
         render_yaw (float, optional): Yaw of the camera. Defaults to 45.
         render_pitch (float, optional): Pitch of the camera. Defaults to -30.
         render_roll (int, optional): Rool of the camera. Defaults to 0.
+        ik_solver (str, optional): "pybullet" or "numpy" inverse kinematics solver for "ee" control. In a single
+            env the numpy solver makes the step slightly slower, see `ArmRobot`; it is meant for the batched solve
+            of `VectorReachEnv`. Defaults to "pybullet".
+        urdf_cache (bool, optional): Whether to load the robot from the on-disk URDF cache. Defaults to True.
+        zero_alloc (bool, optional): Reuse preallocated float32 buffers for the observations returned by `step`,
+            instead of allocating new arrays. The arrays of the returned dict are then only valid until the next
+            call to `step`: copy them to keep them. Observations returned by `reset` are always new arrays.
+            Defaults to False.
+        profile (bool, optional): Record the time spent in every phase of the steps in `profiler`, see
+            `raccoon_gym.profiler`. With `zero_alloc`, the reward is computed inline and has no phase of its own.
+            Defaults to False.
+        max_saved_states (int, optional): Number of states kept by `save_state`. Beyond, the least recently used
+            state is removed. Defaults to 64.
+        headless (bool, optional): Training mode: always a DIRECT connection, collision geometry only, and no
+            camera nor renderer, see `raccoon_gym.headless`. `render_mode` and `renderer` are ignored, and `render()`
+            returns None. Defaults to False.
+        reachable_goals (bool, optional): Sample the goals where the end-effector can reach them, see
+            `raccoon_gym.workspace`. Defaults to False.
+        terminate_on_success (bool, optional): Terminate the episode when the goal is reached. Otherwise, the
+            episode goes on until it is truncated, and `info["is_success"]` still reports the success.
+            Defaults to True.
+        adaptive_horizon (bool, optional): Truncate every episode after `horizon` steps, computed at reset from the
+            distance d between the end-effector and the goal: `min_episode_steps + ceil(horizon_scale * d /
+            max_ee_speed)`. The `max_episode_steps` of the registered ids still applies. Defaults to False.
+        horizon_scale (float, optional): Number of times the shortest travel time the horizon allows.
+            Defaults to 4.
+        min_episode_steps (int, optional): Steps added to the horizon. Defaults to 10.
+        max_ee_speed (float, optional): End-effector displacement per step used by the horizon, in m. Defaults to
+            `ee_speed_bound` of the robot and the control type, times `action_repeat`.
+        action_repeat (int, optional): Number of times every action is applied, each followed by a `sim.step`,
+            before the policy is queried again. The repeats stop early when the goal is reached and
+            `terminate_on_success`. Defaults to 1.
+        reward_aggregation (str, optional): Reward of a repeated action: "last", the reward of the last repeat, as
+            recomputed by HER from the achieved goal, "sum" or "mean" of the repeats. Defaults to "last".
+        physics_timestep (float, optional): Physics timestep, in s. Defaults to the one of the spec, or 1/500 s.
+        n_substeps (int, optional): Physics steps per `sim.step`. Defaults to the one of the spec, or 20.
+        solver_iterations (int, optional): Constraint solver iterations per physics step. Defaults to the one of the
+            spec, or the PyBullet default of 50.
+        curriculum (Curriculum, optional): Goal curriculum shared with the other envs of the run, see
+            `raccoon_gym.curriculum`. The outcome of every episode is recorded at the next reset, which then draws
+            the goal at the current level. Defaults to None.
+
+    `render()` renders through `camera`, built from the `render_*` arguments, whose matrices are only computed
+    once. Assign another `raccoon_gym.rendering.Camera`, e.g. at a lower resolution, to change the frames.
     """
 
+    robot_spec: Optional[RobotSpec] = None
+
     def __init__(
         self,
+        robot: Union[str, RobotSpec, None] = None,
         render_mode: str = "rgb_array",
         reward_type: str = "sparse",
         control_type: str = "ee",
@@ -112,10 +176,86 @@ class Kr16ReachEnv(RobotTaskEnv):
         render_yaw: float = 45,
         render_pitch: float = -30,
         render_roll: float = 0,
+        ik_solver: str = "pybullet",
+        urdf_cache: bool = True,
+        zero_alloc: bool = False,
+        profile: bool = False,
+        max_saved_states: int = 64,
+        headless: bool = False,
+        reachable_goals: bool = False,
+        terminate_on_success: bool = True,
+        adaptive_horizon: bool = False,
+        horizon_scale: float = 4.0,
+        min_episode_steps: int = 10,
+        max_ee_speed: Optional[float] = None,
+        action_repeat: int = 1,
+        reward_aggregation: str = "last",
+        physics_timestep: Optional[float] = None,
+        n_substeps: Optional[int] = None,
+        solver_iterations: Optional[int] = None,
+        curriculum: Optional[Curriculum] = None,
     ) -> None:
-        sim = PyBullet(render_mode=render_mode, renderer=renderer)
-        robot = Kr16(sim, base_position=np.array([-0.75, 0.0, 0.0]), control_type=control_type)
-        task = Kr16Reach(sim, reward_type=reward_type, get_ee_position=robot.get_ee_position)
+        spec = ROBOT_SPECS[robot] if isinstance(robot, str) else robot
+        spec = spec if spec is not None else self.robot_spec
+        if spec is None:
+            raise ValueError(f"{type(self).__name__} needs a robot name or a RobotSpec.")
+        self.robot_spec = spec  # `spec` is the gymnasium EnvSpec
+        if action_repeat < 1:
+            raise ValueError(f"action_repeat must be at least 1, got {action_repeat}.")
+        if reward_aggregation not in ("last", "sum", "mean"):
+            raise ValueError(f"Unknown reward_aggregation {reward_aggregation!r}, expected 'last', 'sum' or 'mean'.")
+        if adaptive_horizon:
+            if max_ee_speed is not None and max_ee_speed <= 0:
+                raise ValueError(f"max_ee_speed must be positive, got {max_ee_speed}.")
+            if horizon_scale < 0:
+                raise ValueError(f"horizon_scale must be non-negative, got {horizon_scale}.")
+            if min_episode_steps < 1:
+                raise ValueError(f"min_episode_steps must be at least 1, got {min_episode_steps}.")
+        sim = make_sim(
+            spec,
+            headless=headless,
+            render_mode=render_mode,
+            renderer=renderer,
+            physics_timestep=physics_timestep,
+            n_substeps=n_substeps,
+            solver_iterations=solver_iterations,
+        )
+        robot = ArmRobot(
+            sim,
+            spec,
+            base_position=np.array(spec.base_position),
+            control_type=control_type,
+            ik_solver=ik_solver,
+            urdf_cache=urdf_cache,
+            zero_alloc=zero_alloc,
+        )
+        task = ReachTask(
+            sim,
+            reward_type=reward_type,
+            get_ee_position=robot.get_ee_position,
+            spec=spec,
+            zero_alloc=zero_alloc,
+            reachable_goals=reachable_goals,
+            curriculum=curriculum,
+        )
+        self.zero_alloc = zero_alloc
+        self.terminate_on_success = terminate_on_success
+        self.adaptive_horizon = adaptive_horizon
+        self.horizon_scale = horizon_scale
+        self.min_episode_steps = min_episode_steps
+        self.action_repeat = action_repeat
+        self.reward_aggregation = reward_aggregation
+        if adaptive_horizon and max_ee_speed is None:
+            max_ee_speed = action_repeat * ee_speed_bound(spec, control_type, robot.dicplacement_scale)
+        self.max_ee_speed = max_ee_speed
+        self.horizon: Optional[int] = None  # of the current episode, with adaptive_horizon
+        self.curriculum = curriculum
+        self._elapsed_steps = 0
+        self._episode_success = False  # of the last step, recorded in the curriculum at the next reset
+        self._observation: Optional[Dict[str, np.ndarray]] = None  # allocated by the first step
+        self._difference = np.zeros(3)
+        self._distance = np.zeros(())
+        self._neutral_state: Optional[int] = None  # saved once the scene is built
         super().__init__(
             robot,
             task,
@@ -127,199 +267,187 @@ class Kr16ReachEnv(RobotTaskEnv):
             render_pitch=render_pitch,
             render_roll=render_roll,
         )
+        self.camera = Camera(
+            width=render_width,
+            height=render_height,
+            target_position=self.render_target_position,
+            distance=render_distance,
+            yaw=render_yaw,
+            pitch=render_pitch,
+            roll=render_roll,
+        )
+        self.profiler = instrument(self) if profile else None
+        self.max_saved_states = max_saved_states
+        self._saved_states: "OrderedDict[int, Tuple[np.ndarray, dict, tuple]]" = OrderedDict()
+        # snapshot of the neutral pose, restored by reset instead of setting the joints one by one
+        with self.sim.no_rendering():
+            self.robot.reset()
+            self._neutral_state = self.sim.save_state()
 
-class Kr210ReachEnv(RobotTaskEnv):
-    """Reach task wih Panda robot.
+    def reset(
+        self, seed: Optional[int] = None, options: Optional[dict] = None
+    ) -> Tuple[Dict[str, np.ndarray], Dict[str, Any]]:
+        if self.curriculum is not None and self._elapsed_steps > 0:
+            self.curriculum.record(self._episode_success, self.task.curriculum_level)
+        self._elapsed_steps = 0
+        if self._neutral_state is None:
+            observation, info = super().reset(seed=seed, options=options)
+        else:
+            gym.Env.reset(self, seed=seed, options=options)
+            self.task.np_random, seed = seeding.np_random(seed)
+            with self.sim.no_rendering():
+                self.sim.restore_state(self._neutral_state)
+                self.task.reset()
+            # new arrays, even with zero_alloc: the observation of the previous step may still be in use
+            observation = RobotTaskEnv._get_obs(self)
+            info = {"is_success": self.task.is_success(observation["achieved_goal"], self.task.get_goal())}
+        if self.adaptive_horizon:
+            distance = float(np.linalg.norm(observation["achieved_goal"] - observation["desired_goal"]))
+            self.horizon = self.min_episode_steps + math.ceil(self.horizon_scale * distance / self.max_ee_speed)
+            info["horizon"] = self.horizon
+        return observation, info
 
-    Args:
-        render_mode (str, optional): Render mode. Defaults to "rgb_array".
-        reward_type (str, optional): "sparse" or "dense". Defaults to "sparse".
-        control_type (str, optional): "ee" to control end-effector position or "joints" to control joint values.
-            Defaults to "ee".
-        renderer (str, optional): Renderer, either "Tiny" or OpenGL". Defaults to "Tiny" if render mode is "human"
-            and "OpenGL" if render mode is "rgb_array". Only "OpenGL" is available for human render mode.
-        render_width (int, optional): Image width. Defaults to 720.
-        render_height (int, optional): Image height. Defaults to 480.
-        render_target_position (np.ndarray, optional): Camera targetting this postion, as (x, y, z).
-            Defaults to [0., 0., 0.].
-        render_distance (float, optional): Distance of the camera. Defaults to 1.4.
-        render_yaw (float, optional): Yaw of the camera. Defaults to 45.
-        render_pitch (float, optional): Pitch of the camera. Defaults to -30.
-        render_roll (int, optional): Rool of the camera. Defaults to 0.
-    """
+    def render(self) -> Optional[np.ndarray]:
+        """Render through `camera`.
 
-    def __init__(
-        self,
-        render_mode: str = "rgb_array",
-        reward_type: str = "sparse",
-        control_type: str = "ee",
-        renderer: str = "Tiny",
-        render_width: int = 720,
-        render_height: int = 480,
-        render_target_position: Optional[np.ndarray] = None,
-        render_distance: float = 2.4,
-        render_yaw: float = 45,
-        render_pitch: float = -30,
-        render_roll: float = 0,
-    ) -> None:
-        sim = PyBullet(render_mode=render_mode, renderer=renderer)
-        robot = Kr210(sim, base_position=np.array([-0.75, 0.0, 0.0]), control_type=control_type)
-        task = Kr210Reach(sim, reward_type=reward_type, get_ee_position=robot.get_ee_position)
-        super().__init__(
-            robot,
-            task,
-            render_width=render_width,
-            render_height=render_height,
-            render_target_position=render_target_position,
-            render_distance=render_distance,
-            render_yaw=render_yaw,
-            render_pitch=render_pitch,
-            render_roll=render_roll,
-        )
+        Returns:
+            np.ndarray or None: An RGB array if render mode is "rgb_array", else None.
+        """
+        if self.render_mode != "rgb_array":
+            return None
+        return render_frame(self.sim, self.camera)
 
-class Kr3ReachEnv(RobotTaskEnv):
-    """Reach task wih Panda robot.
+    def save_state(self) -> int:
+        """Save the current state of the simulation, the goal, the state of the goal sampler, and the step count,
+        horizon and success of the episode.
 
-    Args:
-        render_mode (str, optional): Render mode. Defaults to "rgb_array".
-        reward_type (str, optional): "sparse" or "dense". Defaults to "sparse".
-        control_type (str, optional): "ee" to control end-effector position or "joints" to control joint values.
-            Defaults to "ee".
-        renderer (str, optional): Renderer, either "Tiny" or OpenGL". Defaults to "Tiny" if render mode is "human"
-            and "OpenGL" if render mode is "rgb_array". Only "OpenGL" is available for human render mode.
-        render_width (int, optional): Image width. Defaults to 720.
-        render_height (int, optional): Image height. Defaults to 480.
-        render_target_position (np.ndarray, optional): Camera targetting this postion, as (x, y, z).
-            Defaults to [0., 0., 0.].
-        render_distance (float, optional): Distance of the camera. Defaults to 1.4.
-        render_yaw (float, optional): Yaw of the camera. Defaults to 45.
-        render_pitch (float, optional): Pitch of the camera. Defaults to -30.
-        render_roll (int, optional): Rool of the camera. Defaults to 0.
-    """
+        The states are kept in memory by PyBullet. Only the last `max_saved_states` used ones are kept. The step
+        counters of the wrappers (e.g. `TimeLimit`) are not part of the state.
 
-    def __init__(
-        self,
-        render_mode: str = "rgb_array",
-        reward_type: str = "sparse",
-        control_type: str = "ee",
-        renderer: str = "Tiny",
-        render_width: int = 720,
-        render_height: int = 480,
-        render_target_position: Optional[np.ndarray] = None,
-        render_distance: float = 2.4,
-        render_yaw: float = 45,
-        render_pitch: float = -30,
-        render_roll: float = 0,
-    ) -> None:
-        sim = PyBullet(render_mode=render_mode, renderer=renderer)
-        robot = Kr3(sim, base_position=np.array([-0.25, 0.0, 0.0]), control_type=control_type)
-        task = Kr3Reach(sim, reward_type=reward_type, get_ee_position=robot.get_ee_position)
-        super().__init__(
-            robot,
-            task,
-            render_width=render_width,
-            render_height=render_height,
-            render_target_position=render_target_position,
-            render_distance=render_distance,
-            render_yaw=render_yaw,
-            render_pitch=render_pitch,
-            render_roll=render_roll,
+        Returns:
+            int: State unique identifier, to pass to `restore_state`.
+        """
+        state_id = self.sim.save_state()
+        episode = (self._elapsed_steps, self.horizon, self._episode_success)
+        self._saved_states[state_id] = (
+            self.task.goal.copy(),
+            copy.deepcopy(self.task.np_random.bit_generator.state),
+            episode,
         )
- 
-class Rv7fReachEnv(RobotTaskEnv):
-    """Reach task wih Panda robot.
+        while len(self._saved_states) > self.max_saved_states:
+            self.remove_state(next(iter(self._saved_states)))
+        return state_id
 
-    Args:
-        render_mode (str, optional): Render mode. Defaults to "rgb_array".
-        reward_type (str, optional): "sparse" or "dense". Defaults to "sparse".
-        control_type (str, optional): "ee" to control end-effector position or "joints" to control joint values.
-            Defaults to "ee".
-        renderer (str, optional): Renderer, either "Tiny" or OpenGL". Defaults to "Tiny" if render mode is "human"
-            and "OpenGL" if render mode is "rgb_array". Only "OpenGL" is available for human render mode.
-        render_width (int, optional): Image width. Defaults to 720.
-        render_height (int, optional): Image height. Defaults to 480.
-        render_target_position (np.ndarray, optional): Camera targetting this postion, as (x, y, z).
-            Defaults to [0., 0., 0.].
-        render_distance (float, optional): Distance of the camera. Defaults to 1.4.
-        render_yaw (float, optional): Yaw of the camera. Defaults to 45.
-        render_pitch (float, optional): Pitch of the camera. Defaults to -30.
-        render_roll (int, optional): Rool of the camera. Defaults to 0.
-    """
+    def restore_state(self, state_id: int) -> Dict[str, np.ndarray]:
+        """Restore a state saved by `save_state`.
 
-    def __init__(
-        self,
-        render_mode: str = "rgb_array",
-        reward_type: str = "sparse",
-        control_type: str = "ee",
-        renderer: str = "Tiny",
-        render_width: int = 720,
-        render_height: int = 480,
-        render_target_position: Optional[np.ndarray] = None,
-        render_distance: float = 2.4,
-        render_yaw: float = 45,
-        render_pitch: float = -30,
-        render_roll: float = 0,
-    ) -> None:
-        sim = PyBullet(render_mode=render_mode, renderer=renderer)
-        robot = Rv7f(sim, base_position=np.array([-0.25, 0.0, 0.0]), control_type=control_type)
-        task = Rv7fReach(sim, reward_type=reward_type, get_ee_position=robot.get_ee_position)
-        super().__init__(
-            robot,
-            task,
-            render_width=render_width,
-            render_height=render_height,
-            render_target_position=render_target_position,
-            render_distance=render_distance,
-            render_yaw=render_yaw,
-            render_pitch=render_pitch,
-            render_roll=render_roll,
-        )
+        The same actions from the same state give the same transitions, in "ee" and in "joints" control.
 
-class RCCNWestRobotReachEnv(RobotTaskEnv):
-    """Reach task wih Panda robot.
+        Args:
+            state_id (int): State unique identifier.
 
-    Args:
-        render_mode (str, optional): Render mode. Defaults to "rgb_array".
-        reward_type (str, optional): "sparse" or "dense". Defaults to "sparse".
-        control_type (str, optional): "ee" to control end-effector position or "joints" to control joint values.
-            Defaults to "ee".
-        renderer (str, optional): Renderer, either "Tiny" or OpenGL". Defaults to "Tiny" if render mode is "human"
-            and "OpenGL" if render mode is "rgb_array". Only "OpenGL" is available for human render mode.
-        render_width (int, optional): Image width. Defaults to 720.
-        render_height (int, optional): Image height. Defaults to 480.
-        render_target_position (np.ndarray, optional): Camera targetting this postion, as (x, y, z).
-            Defaults to [0., 0., 0.].
-        render_distance (float, optional): Distance of the camera. Defaults to 1.4.
-        render_yaw (float, optional): Yaw of the camera. Defaults to 45.
-        render_pitch (float, optional): Pitch of the camera. Defaults to -30.
-        render_roll (int, optional): Rool of the camera. Defaults to 0.
-    """
+        Returns:
+            Dict[str, np.ndarray]: Observation of the restored state, as new arrays, even with `zero_alloc`.
+        """
+        if state_id not in self._saved_states:
+            raise KeyError(f"Unknown state {state_id}: never saved, removed, or evicted from the last saved states.")
+        self._saved_states.move_to_end(state_id)
+        goal, random_state, episode = self._saved_states[state_id]
+        self.sim.restore_state(state_id)
+        self.task.goal = goal.copy()
+        self.task.np_random.bit_generator.state = copy.deepcopy(random_state)
+        self._elapsed_steps, self.horizon, self._episode_success = episode
+        return RobotTaskEnv._get_obs(self)
 
-    def __init__(
-        self,
-        render_mode: str = "rgb_array",
-        reward_type: str = "sparse",
-        control_type: str = "ee",
-        renderer: str = "Tiny",
-        render_width: int = 720,
-        render_height: int = 480,
-        render_target_position: Optional[np.ndarray] = None,
-        render_distance: float = 2.4,
-        render_yaw: float = 45,
-        render_pitch: float = -30,
-        render_roll: float = 0,
-    ) -> None:
-        sim = PyBullet(render_mode=render_mode, renderer=renderer)
-        robot = RCCNWestRobot(sim, control_type=control_type)
-        task = RCCNWestRobotReach(sim, reward_type=reward_type, get_ee_position=robot.get_ee_position)
-        super().__init__(
-            robot,
-            task,
-            render_width=render_width,
-            render_height=render_height,
-            render_target_position=render_target_position,
-            render_distance=render_distance,
-            render_yaw=render_yaw,
-            render_pitch=render_pitch,
-            render_roll=render_roll,
-        )
\ No newline at end of file
+    def remove_state(self, state_id: int) -> None:
+        """Remove a saved state, and free its memory.
+
+        Args:
+            state_id (int): State unique identifier.
+        """
+        self._saved_states.pop(state_id)
+        self.sim.remove_state(state_id)
+
+    def _get_obs(self) -> Dict[str, np.ndarray]:
+        if not self.zero_alloc or self._observation is None:
+            return super()._get_obs()
+        observation = self._observation
+        robot_obs = self.robot.get_obs()
+        observation["observation"][: robot_obs.shape[0]] = robot_obs  # the reach task has no observation
+        observation["achieved_goal"][:] = self.task.get_achieved_goal()
+        observation["desired_goal"][:] = self.task.goal
+        return observation
+
+    def step(self, action: np.ndarray) -> Tuple[Dict[str, np.ndarray], float, bool, bool, Dict[str, Any]]:
+        if self.action_repeat == 1:
+            observation, reward, terminated, truncated, info = self._step(action)
+        else:
+            rewards = []
+            for _ in range(self.action_repeat):
+                observation, reward, terminated, truncated, info = self._step(action)
+                rewards.append(reward)
+                if terminated and self.terminate_on_success:
+                    break
+            if self.reward_aggregation == "sum":
+                reward = float(sum(rewards))
+            elif self.reward_aggregation == "mean":
+                reward = float(sum(rewards) / len(rewards))
+        self._elapsed_steps += 1
+        self._episode_success = bool(info["is_success"])
+        if not self.terminate_on_success:
+            terminated = False
+        if self.horizon is not None and self._elapsed_steps >= self.horizon:
+            truncated = True
+        return observation, reward, terminated, truncated, info
+
+    def _step(self, action: np.ndarray) -> Tuple[Dict[str, np.ndarray], float, bool, bool, Dict[str, Any]]:
+        if not self.zero_alloc:
+            return super().step(action)
+        if self._observation is None:
+            self._observation = {key: value.copy() for key, value in super()._get_obs().items()}
+        self.robot.set_action(action)
+        self.sim.step()
+        observation = self._get_obs()
+        # same distance as reach_success and reach_reward with the float64 goal, without the intermediate arrays
+        difference = np.subtract(observation["achieved_goal"], self.task.goal, out=self._difference)
+        distance = np.sqrt(np.einsum("i,i->", difference, difference, out=self._distance), out=self._distance)
+        terminated = bool(success_from_distance(distance, self.task.distance_threshold))
+        reward = float(reward_from_distance(distance, self.task.distance_threshold, self.task.reward_type))
+        return observation, reward, terminated, False, {"is_success": terminated}
+
+
+# legacy names, one per robot of the table
+class Kr300R2500UltraReachEnv(ReachEnv):
+    """Reach task with the KUKA KR300 R2500 ultra robot. See `ReachEnv` for the arguments."""
+
+    robot_spec = ROBOT_SPECS["Kr300R2500Ultra"]
+
+
+class Kr16ReachEnv(ReachEnv):
+    """Reach task with the KUKA KR16 robot. See `ReachEnv` for the arguments."""
+
+    robot_spec = ROBOT_SPECS["Kr16"]
+
+
+class Kr210ReachEnv(ReachEnv):
+    """Reach task with the KUKA KR210 robot. See `ReachEnv` for the arguments."""
+
+    robot_spec = ROBOT_SPECS["Kr210"]
+
+
+class Kr3ReachEnv(ReachEnv):
+    """Reach task with the KUKA KR3 robot. See `ReachEnv` for the arguments."""
+
+    robot_spec = ROBOT_SPECS["Kr3"]
+
+
+class Rv7fReachEnv(ReachEnv):
+    """Reach task with the Mitsubishi RV-7F robot. See `ReachEnv` for the arguments."""
+
+    robot_spec = ROBOT_SPECS["Rv7f"]
+
+
+class RCCNWestRobotReachEnv(ReachEnv):
+    """Reach task with the Raccoon West robot. See `ReachEnv` for the arguments."""
+
+    robot_spec = ROBOT_SPECS["RCCNWestRobot"]
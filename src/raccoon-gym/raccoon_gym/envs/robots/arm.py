@@ -0,0 +1,235 @@
+from typing import Optional, Tuple
+
+import numpy as np
+from gymnasium import spaces
+
+from panda_gym.envs.core import PyBulletRobot
+from panda_gym.pybullet import PyBullet
+
+from raccoon_gym.envs.specs import ROBOT_SPECS, RobotSpec
+from raccoon_gym.kinematics import KinematicChain
+from raccoon_gym.urdf_cache import load_urdf
+
+
+class ArmRobot(PyBulletRobot):
+    """Robot arm in PyBullet, described by a `RobotSpec`.
+
+    Subclasses can set the `spec` class attribute instead of passing it, e.g. `Kr16`.
+
+    Args:
+        sim (PyBullet): Simulation instance.
+        spec (RobotSpec, optional): Description of the robot. Defaults to the `spec` class attribute.
+        base_position (np.ndarray, optionnal): Position of the base base of the robot, as (x, y, z). Defaults to (0, 0, 0).
+        control_type (str, optional): "ee" to control end-effector displacement or "joints" to control joint angles.
+            Defaults to "ee".
+        displacement_scale (float, optional): Scale of the action, in m for "ee" and in rad for "joints".
+            Defaults to 0.15.
+        body_name (str, optional): Name of the body in the simulation. Must be unique when several robots share
+            one simulation. Defaults to the body name of the spec.
+        ik_solver (str, optional): "pybullet" to use the PyBullet IK solver, or "numpy" to use the damped least
+            squares solver of `raccoon_gym.kinematics`, warm-started from the current joints. Only used by "ee"
+            control. For one robot the numpy solve is slower than the PyBullet one, about 0.25 ms against 0.13 ms
+            for the Kr16: it only pays off through the batched solve of `VectorReachEnv`. Defaults to "pybullet".
+        urdf_cache (bool, optional): Whether to load the preprocessed copy of the URDF from the on-disk cache of
+            `raccoon_gym.urdf_cache`. Defaults to True.
+        zero_alloc (bool, optional): Write the actions, observations and end-effector position into buffers
+            reused across steps. The arrays returned by `get_obs` and `get_ee_position` are then only valid until
+            the next call. Defaults to False.
+    """
+
+    spec: Optional[RobotSpec] = None
+
+    def __init__(
+        self,
+        sim: PyBullet,
+        spec: Optional[RobotSpec] = None,
+        base_position: Optional[np.ndarray] = None,
+        control_type: str = "ee",
+        displacement_scale: float = 0.15,
+        body_name: Optional[str] = None,
+        ik_solver: str = "pybullet",
+        urdf_cache: bool = True,
+        zero_alloc: bool = False,
+    ) -> None:
+        spec = spec if spec is not None else self.spec
+        if spec is None:
+            raise ValueError(f"{type(self).__name__} needs a RobotSpec.")
+        self.spec = spec
+        base_position = base_position if base_position is not None else np.zeros(3)
+        self.control_type = control_type
+        self.urdf_cache = urdf_cache  # read by _load_robot, called by super().__init__
+        self.n_joints = spec.n_joints
+        # control (x, y z) if "ee", else, control the joints
+        n_action = 3 if self.control_type == "ee" else self.n_joints
+        action_space = spaces.Box(-1.0, 1.0, shape=(n_action,), dtype=np.float32)
+        self.dicplacement_scale = displacement_scale
+        self.zero_alloc = zero_alloc
+        super().__init__(
+            sim,
+            body_name=body_name if body_name is not None else spec.body_name,
+            file_name=spec.file_name,
+            base_position=base_position,
+            action_space=action_space,
+            joint_indices=spec.joint_indices,
+            joint_forces=spec.joint_forces,
+        )
+        self.neutral_joint_values = spec.neutral_joint_values
+        # joint states are read in bulk into these buffers, see get_joint_states
+        self._body_id = self.sim._bodies_idx[self.body_name]
+        self._joint_index_list = [int(index) for index in self.joint_indices]
+        self._joint_positions = np.zeros(self.n_joints)
+        self._joint_velocities = np.zeros(self.n_joints)
+        # buffers of the zero_alloc mode
+        self._action = np.zeros(action_space.shape, dtype=np.float32)
+        self._target_arm_angles = np.zeros(self.n_joints)
+        self._ee_state = np.zeros(6)
+        self._ee_position = np.zeros(3)
+        self.ee_link = spec.ee_link
+        self.ee_orientation = spec.ee_orientation  # target orientation of the IK, as (x, y, z, w)
+        # the URDF joint chain is parsed once, and cached for the next robots
+        self.kinematics = (
+            KinematicChain(spec.file_name, self.ee_link, self.joint_indices, base_position)
+            if ik_solver == "numpy"
+            else None
+        )
+
+    def _load_robot(self, file_name: str, base_position: np.ndarray) -> None:
+        """Load the robot, through the URDF cache.
+
+        Args:
+            file_name (str): The URDF file name of the robot.
+            base_position (np.ndarray): The position of the robot, as (x, y, z).
+        """
+        load_urdf(
+            self.sim,
+            body_name=self.body_name,
+            file_name=file_name,
+            use_cache=self.urdf_cache,
+            basePosition=base_position,
+            useFixedBase=True,
+        )
+
+    def set_action(self, action: np.ndarray) -> None:
+        if self.zero_alloc:
+            action = np.clip(action, self.action_space.low, self.action_space.high, out=self._action)
+        else:
+            action = action.copy()  # ensure action don't change
+            action = np.clip(action, self.action_space.low, self.action_space.high)
+        if self.control_type == "ee":
+            ee_displacement = action[:3]
+            target_arm_angles = self.ee_displacement_to_target_arm_angles(ee_displacement)
+        else:
+            arm_joint_ctrl = action[: self.n_joints]
+            target_arm_angles = self.arm_joint_ctrl_to_target_arm_angles(arm_joint_ctrl)
+
+        target_angles = target_arm_angles
+        self.control_joints(target_angles=target_angles)
+
+    def ee_displacement_to_target_arm_angles(self, ee_displacement: np.ndarray) -> np.ndarray:
+        """Compute the target arm angles from the end-effector displacement.
+
+        Args:
+            ee_displacement (np.ndarray): End-effector displacement, as (dx, dy, dy).
+
+        Returns:
+            np.ndarray: Target arm angles, as the angles of the arm joints.
+        """
+        ee_displacement = ee_displacement[:3] * self.dicplacement_scale  # limit maximum change in position
+        # get the current position and the target position
+        ee_position = self.get_ee_position()
+        target_ee_position = ee_position + ee_displacement
+        # Clip the height target. For some reason, it has a great impact on learning
+        target_ee_position[2] = np.max((0, target_ee_position[2]))
+        # compute the new joint angles
+        if self.kinematics is not None:
+            current_arm_joint_angles, _ = self.get_joint_states()
+            # warm started from the current angles, a few iterations are enough for one displacement
+            target_arm_angles = self.kinematics.inverse_kinematics(
+                target_ee_position, current_arm_joint_angles, orientation=self.ee_orientation, max_iterations=3
+            )
+        else:
+            target_arm_angles = self.inverse_kinematics(
+                link=self.ee_link, position=target_ee_position, orientation=self.ee_orientation
+            )
+            target_arm_angles = target_arm_angles[: self.n_joints]  # remove fingers angles
+        return target_arm_angles
+
+    def arm_joint_ctrl_to_target_arm_angles(self, arm_joint_ctrl: np.ndarray) -> np.ndarray:
+        """Compute the target arm angles from the arm joint control.
+
+        Args:
+            arm_joint_ctrl (np.ndarray): Control of the arm joints.
+
+        Returns:
+            np.ndarray: Target arm angles, as the angles of the arm joints.
+        """
+        current_arm_joint_angles, _ = self.get_joint_states()
+        if self.zero_alloc:
+            target_arm_angles = np.multiply(arm_joint_ctrl, self.dicplacement_scale, out=self._target_arm_angles)
+            return np.add(target_arm_angles, current_arm_joint_angles, out=target_arm_angles)
+        arm_joint_ctrl = arm_joint_ctrl * self.dicplacement_scale  # limit maximum change in position
+        # get the current position and the target position
+        target_arm_angles = current_arm_joint_angles + arm_joint_ctrl
+        return target_arm_angles
+
+    def get_joint_states(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Read the angles and velocities of the controlled joints, with a single `getJointStates` call.
+
+        The returned arrays are buffers of the robot, overwritten by the next call.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Angles and velocities of the controlled joints.
+        """
+        states = self.sim.physics_client.getJointStates(self._body_id, self._joint_index_list)
+        for i, state in enumerate(states):
+            self._joint_positions[i] = state[0]
+            self._joint_velocities[i] = state[1]
+        return self._joint_positions, self._joint_velocities
+
+    def _get_ee_link_state(self, compute_velocity: bool = False) -> tuple:
+        # with forward kinematics: after a step, the cached link state lags the joints by one physics step, while
+        # after restoreState it does not, so that a restored state would otherwise not continue like the original
+        return self.sim.physics_client.getLinkState(
+            self._body_id, self.ee_link, computeLinkVelocity=compute_velocity, computeForwardKinematics=True
+        )
+
+    def get_obs(self) -> np.ndarray:
+        # end-effector position and velocity, read with a single getLinkState call
+        link_state = self._get_ee_link_state(compute_velocity=True)
+        if self.zero_alloc:
+            self._ee_state[:3] = link_state[0]
+            self._ee_state[3:] = link_state[6]
+            return self._ee_state
+        observation = np.array(link_state[0] + link_state[6])
+        return observation
+
+    def reset(self) -> None:
+        self.set_joint_neutral()
+
+    def set_joint_neutral(self) -> None:
+        """Set the robot to its neutral pose."""
+        self.set_joint_angles(self.neutral_joint_values)
+
+    def get_ee_position(self) -> np.ndarray:
+        """Returns the position of the end-effector as (x, y, z)"""
+        if self.zero_alloc:
+            self._ee_position[:] = self._get_ee_link_state()[0]
+            return self._ee_position
+        return np.array(self._get_ee_link_state()[0])
+
+    def get_ee_velocity(self) -> np.ndarray:
+        """Returns the velocity of the end-effector as (vx, vy, vz)"""
+        return np.array(self._get_ee_link_state(compute_velocity=True)[6])
+
+
+if __name__ == "__main__":
+    import time
+
+    sim = PyBullet(render_mode="human")
+    robot = ArmRobot(sim, ROBOT_SPECS["Kr16"], control_type="joints")
+
+    for _ in range(100):
+        robot.set_action(np.array(robot.neutral_joint_values))
+        print(robot.get_ee_position())
+        sim.step()
+        time.sleep(0.1)
@@ -0,0 +1,383 @@
+import multiprocessing as mp
+import pickle
+import threading
+import time
+import traceback
+from multiprocessing import shared_memory
+from multiprocessing.connection import Connection
+from multiprocessing.synchronize import Barrier
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Type
+
+import gymnasium as gym
+import numpy as np
+from gymnasium import spaces
+
+from stable_baselines3.common.env_util import is_wrapped
+from stable_baselines3.common.monitor import Monitor
+from stable_baselines3.common.vec_env.base_vec_env import CloudpickleWrapper, VecEnv, VecEnvIndices
+
+GOAL_KEYS = ("observation", "achieved_goal", "desired_goal")
+
+# commands written in the shared "command" slot before releasing the workers
+_STEP = 0
+_REMOTE = 1
+_CLOSE = 2
+
+# seconds close waits for the workers to be released, before terminating them
+_CLOSE_TIMEOUT = 10.0
+
+
+def _buffer_specs(observation_space: spaces.Dict, action_space: spaces.Box, n_envs: int) -> Dict[str, Tuple]:
+    """Shape and dtype of every shared array."""
+    specs = {}
+    for key in GOAL_KEYS:
+        shape = (n_envs,) + observation_space[key].shape
+        specs[key] = (shape, np.float32)
+        specs["terminal_" + key] = (shape, np.float32)
+    specs["action"] = ((n_envs,) + action_space.shape, np.float32)
+    specs["reward"] = ((n_envs,), np.float32)
+    specs["done"] = ((n_envs,), bool)
+    specs["truncated"] = ((n_envs,), bool)
+    specs["is_success"] = ((n_envs,), bool)
+    specs["targets"] = ((n_envs,), bool)
+    specs["error"] = ((n_envs,), bool)
+    specs["command"] = ((1,), np.int32)
+    return specs
+
+
+def _attach(names: Dict[str, str], specs: Dict[str, Tuple]) -> Tuple[List[shared_memory.SharedMemory], Dict]:
+    blocks, arrays = [], {}
+    for key, (shape, dtype) in specs.items():
+        block = shared_memory.SharedMemory(name=names[key])
+        blocks.append(block)
+        arrays[key] = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+    return blocks, arrays
+
+
+class _RemoteTraceback(Exception):
+    """Traceback of an exception raised in a worker, set as the cause of the exception raised again in the parent."""
+
+    def __init__(self, tb: str) -> None:
+        self.tb = tb
+
+    def __str__(self) -> str:
+        return self.tb
+
+
+class _WorkerError:
+    """Exception of a worker, sent over its pipe instead of the result of the command."""
+
+    def __init__(self, index: int, exception: BaseException, tb: str) -> None:
+        self.index = index
+        self.exception = exception
+        self.tb = tb
+
+    def __reduce__(self) -> Tuple:
+        try:
+            # exceptions with extra constructor arguments may not survive the round trip
+            exception = pickle.loads(pickle.dumps(self.exception))
+        except Exception:
+            exception = RuntimeError(f"{type(self.exception).__name__}: {self.exception}")
+        return _WorkerError, (self.index, exception, self.tb)
+
+    def reraise(self) -> None:
+        raise self.exception from _RemoteTraceback(f"\nWorker {self.index}:\n{self.tb}")
+
+
+def _worker(
+    remote: Connection,
+    parent_remote: Connection,
+    env_fn_wrapper: CloudpickleWrapper,
+    index: int,
+    start_barrier: Barrier,
+    done_barrier: Barrier,
+) -> None:
+    parent_remote.close()
+    env = env_fn_wrapper.var()
+    remote.send((env.observation_space, env.action_space))
+    names, specs = remote.recv()
+    blocks, arrays = _attach(names, specs)
+
+    def write_obs(prefix: str, obs: Dict[str, np.ndarray]) -> None:
+        for key in GOAL_KEYS:
+            arrays[prefix + key][index] = obs[key]
+
+    try:
+        while True:
+            start_barrier.wait()
+            command = arrays["command"][0]
+            if command == _CLOSE:
+                break
+            # the exceptions of the env are sent to the parent, which raises them, and the worker goes on
+            try:
+                if command == _STEP:
+                    obs, reward, terminated, truncated, info = env.step(arrays["action"][index])
+                    done = terminated or truncated
+                    arrays["reward"][index] = reward
+                    arrays["done"][index] = done
+                    arrays["truncated"][index] = truncated and not terminated
+                    arrays["is_success"][index] = info.get("is_success", False)
+                    if done:
+                        write_obs("terminal_", obs)
+                        obs, _ = env.reset()
+                    write_obs("", obs)
+                    if done:
+                        # only the end of episode info (e.g. Monitor statistics) goes through the pipe
+                        remote.send(info)
+                elif command == _REMOTE and arrays["targets"][index]:
+                    cmd, data = remote.recv()
+                    if cmd == "reset":
+                        seed, options = data
+                        obs, reset_info = env.reset(seed=seed, options=options)
+                        write_obs("", obs)
+                        remote.send(reset_info)
+                    elif cmd == "render":
+                        remote.send(env.render())
+                    elif cmd == "env_method":
+                        method = getattr(env, data[0])
+                        remote.send(method(*data[1], **data[2]))
+                    elif cmd == "get_attr":
+                        remote.send(getattr(env, data))
+                    elif cmd == "set_attr":
+                        remote.send(setattr(env, data[0], data[1]))
+                    elif cmd == "is_wrapped":
+                        remote.send(is_wrapped(env, data))
+            except Exception as error:
+                arrays["done"][index] = False
+                arrays["error"][index] = True
+                remote.send(_WorkerError(index, error, traceback.format_exc()))
+            done_barrier.wait()
+    except BaseException:
+        # the parent can not be told over the pipe, release it from the barriers instead
+        start_barrier.abort()
+        done_barrier.abort()
+        raise
+    finally:
+        env.close()
+        del arrays
+        for block in blocks:
+            block.close()
+        remote.close()
+
+
+class SharedMemoryReachVecEnv(VecEnv):
+    """Subprocess vectorized environment exchanging the goal-env dict through shared memory.
+
+    Actions, observations, achieved and desired goals, rewards and done flags live in preallocated
+    `multiprocessing.shared_memory` blocks. A step is two barrier waits: the workers are released once the actions
+    are written, and the main process resumes when every worker has written its results. Nothing is pickled on a
+    regular step; the pipes are only used at the end of an episode (to forward the `Monitor` info) and for the
+    rare remote calls (`reset`, `get_attr`, `env_method`, ...).
+
+    An exception of an env is sent back over the pipe of its worker and raised again by the call, `step_wait` or the
+    remote call, and the worker goes on. When a worker dies, a watchdog thread breaks the barriers, so that the calls
+    raise a `RuntimeError` instead of waiting forever, and `close` terminates the other workers.
+
+    Works with any registered raccoon reach id, e.g. "RaccoonKr16Reach-v1".
+
+    Args:
+        env_id (str): Registered environment id.
+        n_envs (int, optional): Number of worker processes. Defaults to 1.
+        env_kwargs (dict, optional): Keyword arguments passed to `gym.make`. Defaults to None.
+        monitor (bool, optional): Wrap every environment with SB3 `Monitor`. Defaults to True.
+        start_method (str, optional): Multiprocessing start method. Defaults to "forkserver" when available,
+            "spawn" otherwise.
+    """
+
+    def __init__(
+        self,
+        env_id: str,
+        n_envs: int = 1,
+        env_kwargs: Optional[Dict[str, Any]] = None,
+        monitor: bool = True,
+        start_method: Optional[str] = None,
+    ) -> None:
+        env_kwargs = env_kwargs if env_kwargs is not None else {}
+        if start_method is None:
+            start_method = "forkserver" if "forkserver" in mp.get_all_start_methods() else "spawn"
+        ctx = mp.get_context(start_method)
+
+        self.closed = False
+        self._closing = False  # the workers exit on purpose
+        self.start_barrier = ctx.Barrier(n_envs + 1)
+        self.done_barrier = ctx.Barrier(n_envs + 1)
+        self.remotes, self.work_remotes = zip(*[ctx.Pipe() for _ in range(n_envs)])
+        self.processes = []
+        for index, (work_remote, remote) in enumerate(zip(self.work_remotes, self.remotes)):
+            env_fn = _make_env_fn(env_id, env_kwargs, monitor)
+            args = (work_remote, remote, CloudpickleWrapper(env_fn), index, self.start_barrier, self.done_barrier)
+            process = ctx.Process(target=_worker, args=args, daemon=True)
+            process.start()
+            self.processes.append(process)
+            work_remote.close()
+
+        observation_space, action_space = self.remotes[0].recv()
+        for remote in self.remotes[1:]:
+            remote.recv()
+        if not isinstance(observation_space, spaces.Dict) or set(observation_space.spaces) != set(GOAL_KEYS):
+            self.close()
+            raise ValueError(f"{env_id} is not a goal-conditioned environment with {GOAL_KEYS} observations.")
+
+        specs = _buffer_specs(observation_space, action_space, n_envs)
+        self._blocks = []
+        for shape, dtype in specs.values():
+            size = max(int(np.prod(shape)) * np.dtype(dtype).itemsize, 1)
+            self._blocks.append(shared_memory.SharedMemory(create=True, size=size))
+        names = {key: block.name for key, block in zip(specs, self._blocks)}
+        self._arrays = {
+            key: np.ndarray(shape, dtype=dtype, buffer=block.buf)
+            for (key, (shape, dtype)), block in zip(specs.items(), self._blocks)
+        }
+        for remote in self.remotes:
+            remote.send((names, specs))
+        self._watchdog = threading.Thread(target=self._watch, daemon=True)
+        self._watchdog.start()
+
+        super().__init__(n_envs, observation_space, action_space)
+
+    def _watch(self) -> None:
+        # a worker killed or crashed in native code never reaches the barriers again
+        while not self._closing:
+            if any(process.exitcode is not None for process in self.processes):
+                self.start_barrier.abort()
+                self.done_barrier.abort()
+                return
+            time.sleep(0.1)
+
+    def _wait(self, barrier: Barrier) -> None:
+        try:
+            barrier.wait()
+        except threading.BrokenBarrierError:
+            exit_codes = {i: p.exitcode for i, p in enumerate(self.processes) if p.exitcode is not None}
+            raise RuntimeError(f"SharedMemoryReachVecEnv workers died, exit codes: {exit_codes}.") from None
+
+    def _recv(self, indices: Sequence[int]) -> List[Any]:
+        results = []
+        for i in indices:
+            try:
+                results.append(self.remotes[i].recv())
+            except EOFError:
+                raise RuntimeError(f"SharedMemoryReachVecEnv worker {i} died.") from None
+        return results
+
+    @staticmethod
+    def _raise_errors(results: Sequence[Any]) -> None:
+        for result in results:
+            if isinstance(result, _WorkerError):
+                result.reraise()
+
+    def _obs(self, prefix: str = "", index: Optional[int] = None) -> Dict[str, np.ndarray]:
+        # copies: the shared buffers are overwritten by the next step
+        if index is None:
+            return {key: self._arrays[prefix + key].copy() for key in GOAL_KEYS}
+        return {key: self._arrays[prefix + key][index].copy() for key in GOAL_KEYS}
+
+    def _remote_call(self, indices: VecEnvIndices, cmd: str, data: Any = None) -> List[Any]:
+        target_indices = self._get_indices(indices)
+        self._arrays["targets"][:] = False
+        self._arrays["targets"][target_indices] = True
+        self._arrays["command"][0] = _REMOTE
+        self._wait(self.start_barrier)
+        for i in target_indices:
+            self.remotes[i].send((cmd, data))
+        results = self._recv(target_indices)
+        self._wait(self.done_barrier)
+        self._arrays["error"][:] = False
+        self._raise_errors(results)
+        return results
+
+    def reset(self) -> Dict[str, np.ndarray]:
+        target_indices = list(range(self.num_envs))
+        self._arrays["targets"][:] = True
+        self._arrays["command"][0] = _REMOTE
+        self._wait(self.start_barrier)
+        for i in target_indices:
+            self.remotes[i].send(("reset", (self._seeds[i], self._options[i])))
+        reset_infos = self._recv(target_indices)
+        self._wait(self.done_barrier)
+        self._arrays["error"][:] = False
+        self._raise_errors(reset_infos)
+        self.reset_infos = reset_infos
+        self._reset_seeds()
+        self._reset_options()
+        return self._obs()
+
+    def step_async(self, actions: np.ndarray) -> None:
+        self._arrays["action"][:] = actions.reshape(self._arrays["action"].shape)
+        self._arrays["command"][0] = _STEP
+        self._wait(self.start_barrier)
+
+    def step_wait(self) -> Tuple[Dict[str, np.ndarray], np.ndarray, np.ndarray, List[Dict]]:
+        self._wait(self.done_barrier)
+        errors = np.flatnonzero(self._arrays["error"])
+        if len(errors):
+            # the done envs also sent their info, which is dropped with the step
+            results = self._recv(errors)
+            for i in np.flatnonzero(self._arrays["done"]):
+                self.remotes[i].recv()
+            self._arrays["error"][:] = False
+            self._raise_errors(results)
+        rewards = self._arrays["reward"].copy()
+        dones = self._arrays["done"].copy()
+        infos = [{"is_success": bool(success)} for success in self._arrays["is_success"]]
+        for i in np.flatnonzero(dones):
+            infos[i].update(self.remotes[i].recv())
+            infos[i]["TimeLimit.truncated"] = bool(self._arrays["truncated"][i])
+            infos[i]["terminal_observation"] = self._obs("terminal_", i)
+        return self._obs(), rewards, dones, infos
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self._closing = True
+        if hasattr(self, "_arrays"):
+            self._arrays["command"][0] = _CLOSE
+            released = False
+            if all(process.exitcode is None for process in self.processes):
+                try:
+                    self.start_barrier.wait(timeout=_CLOSE_TIMEOUT)
+                    released = True
+                except threading.BrokenBarrierError:
+                    pass
+            if not released:
+                # a worker died, or is stuck: the others can not be released together
+                for process in self.processes:
+                    process.terminate()
+            self._watchdog.join()
+        else:
+            # the workers never received the shared memory blocks
+            for process in self.processes:
+                process.terminate()
+        for process in self.processes:
+            process.join()
+        if hasattr(self, "_arrays"):
+            del self._arrays
+            for block in self._blocks:
+                block.close()
+                block.unlink()
+        self.closed = True
+
+    def get_images(self) -> Sequence[Optional[np.ndarray]]:
+        return self._remote_call(None, "render")
+
+    def get_attr(self, attr_name: str, indices: VecEnvIndices = None) -> List[Any]:
+        return self._remote_call(indices, "get_attr", attr_name)
+
+    def set_attr(self, attr_name: str, value: Any, indices: VecEnvIndices = None) -> None:
+        self._remote_call(indices, "set_attr", (attr_name, value))
+
+    def env_method(self, method_name: str, *method_args, indices: VecEnvIndices = None, **method_kwargs) -> List[Any]:
+        return self._remote_call(indices, "env_method", (method_name, method_args, method_kwargs))
+
+    def env_is_wrapped(self, wrapper_class: Type[gym.Wrapper], indices: VecEnvIndices = None) -> List[bool]:
+        return self._remote_call(indices, "is_wrapped", wrapper_class)
+
+
+def _make_env_fn(env_id: str, env_kwargs: Dict[str, Any], monitor: bool) -> Callable[[], gym.Env]:
+    def _init() -> gym.Env:
+        import raccoon_gym  # noqa: F401 register the ids in the worker
+
+        env = gym.make(env_id, **env_kwargs)
+        return Monitor(env) if monitor else env
+
+    return _init
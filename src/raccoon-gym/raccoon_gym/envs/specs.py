@@ -0,0 +1,160 @@
+"""Declarative description of the robots, used by the generic `ArmRobot`, `ReachTask` and `ReachEnv`.
+
+A new robot cell needs no new class: describe it with a `RobotSpec` and pass it to `raccoon_gym.register_robot`.
+This module only depends on numpy, so that reading the table does not load pybullet.
+"""
+import functools
+import math
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+def _read_only(values: Sequence[float], dtype: type) -> np.ndarray:
+    array = np.array(values, dtype=dtype)
+    array.setflags(write=False)  # the arrays are shared by all the instances of the robot
+    return array
+
+
+@dataclass(frozen=True, eq=False)
+class RobotSpec:
+    """Description of a robot arm and of its reach task.
+
+    Args:
+        name (str): Short name of the robot, e.g. "Kr16". The legacy classes are named after it.
+        env_name (str): Prefix of the registered ids, e.g. "RaccoonKr16" for "RaccoonKr16Reach-v1".
+        body_name (str): Default name of the body in the simulation.
+        file_name (str): Path of the URDF file.
+        joint_indices (Sequence[int]): Indices of the controlled joints, as defined in the URDF.
+        neutral_joint_values (Sequence[float]): Neutral pose, as the angles of the controlled joints.
+        ee_link (int): Index of the end-effector link.
+        joint_forces (Sequence[float], optional): Force applied when the robot is controled (Nm). Defaults to 2000
+            for every joint.
+        base_position (Sequence[float], optional): Position of the base in the single environment, as (x, y, z).
+            Defaults to (0, 0, 0).
+        ee_orientation (Sequence[float], optional): Target orientation of the IK, as (x, y, z, w). Defaults to the
+            end-effector pointing down.
+        goal_range (float, optional): Side of the goal sampling box, in m. Defaults to 1.5.
+        target_radius (float, optional): Radius of the target sphere, in m. Defaults to 0.15.
+        create_plane (bool, optional): Whether the task creates the ground plane. Defaults to True.
+        timestep (float, optional): Physics timestep, in s. Defaults to None, 1/500 s.
+        n_substeps (int, optional): Physics steps per `sim.step`. Defaults to None, 20.
+        solver_iterations (int, optional): Iterations of the constraint solver per physics step. Defaults to None,
+            the PyBullet default of 50.
+    """
+
+    name: str
+    env_name: str
+    body_name: str
+    file_name: str
+    joint_indices: np.ndarray
+    neutral_joint_values: np.ndarray
+    ee_link: int
+    joint_forces: Optional[np.ndarray] = None
+    base_position: np.ndarray = field(default_factory=lambda: np.zeros(3))
+    ee_orientation: np.ndarray = field(default_factory=lambda: np.array([0.0, 0.7071068, 0.0, 0.7071068]))
+    goal_range: float = 1.5
+    target_radius: float = 0.15
+    create_plane: bool = True
+    timestep: Optional[float] = None
+    n_substeps: Optional[int] = None
+    solver_iterations: Optional[int] = None
+
+    def __post_init__(self) -> None:
+        # frozen dataclass: the arrays are normalized with object.__setattr__
+        joint_forces = self.joint_forces if self.joint_forces is not None else [2000.0] * len(self.joint_indices)
+        object.__setattr__(self, "joint_indices", _read_only(self.joint_indices, np.int64))
+        object.__setattr__(self, "neutral_joint_values", _read_only(self.neutral_joint_values, np.float64))
+        object.__setattr__(self, "joint_forces", _read_only(joint_forces, np.float64))
+        object.__setattr__(self, "base_position", _read_only(self.base_position, np.float64))
+        object.__setattr__(self, "ee_orientation", _read_only(self.ee_orientation, np.float64))
+        if not len(self.joint_indices) == len(self.neutral_joint_values) == len(self.joint_forces):
+            raise ValueError(f"{self.name}: joint_indices, neutral_joint_values and joint_forces differ in length.")
+
+    @property
+    def n_joints(self) -> int:
+        """Number of controlled joints."""
+        return len(self.joint_indices)
+
+    @functools.cached_property
+    def joint_limits(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Lower and upper limits of the controlled joints, read from the URDF on first access."""
+        from raccoon_gym.kinematics import parse_urdf
+
+        _, joints, _ = parse_urdf(self.file_name)
+        lower = _read_only([joints[i].lower for i in self.joint_indices], np.float64)
+        upper = _read_only([joints[i].upper for i in self.joint_indices], np.float64)
+        return lower, upper
+
+
+ROBOT_SPECS: Dict[str, RobotSpec] = {
+    spec.name: spec
+    for spec in [
+        RobotSpec(
+            name="Kr300R2500Ultra",
+            env_name="RaccoonKr300R2500Ultra",
+            body_name="KUKA KR300 R2500 ultra",
+            file_name="submodules/kuka_kr300_support/urdf/kr300r2500ultra.urdf",
+            joint_indices=[0, 1, 2, 3, 4, 5],
+            neutral_joint_values=[0, math.radians(-90), math.radians(90), 0, 0, 0],
+            ee_link=6,
+            base_position=[-1.5, 0.0, 0.0],
+        ),
+        RobotSpec(
+            name="Kr16",
+            env_name="RaccoonKr16",
+            body_name="KUKA KR16",
+            file_name="robots/kuka_kr16_support/urdf/kr16_2.urdf",
+            joint_indices=[0, 1, 2, 3, 4, 5],
+            neutral_joint_values=[0, math.radians(-90), math.radians(90), 0, 0, 0],
+            ee_link=6,
+            base_position=[-0.75, 0.0, 0.0],
+        ),
+        RobotSpec(
+            name="Kr210",
+            env_name="RaccoonKr210",
+            body_name="KUKA KR210",
+            file_name="robots/kuka_kr210_support/urdf/kr210l150.urdf",
+            joint_indices=[0, 1, 2, 3, 4, 5],
+            neutral_joint_values=[0, math.radians(-90), math.radians(90), 0, 0, 0],
+            ee_link=6,
+            base_position=[-0.75, 0.0, 0.0],
+        ),
+        RobotSpec(
+            name="Kr3",
+            env_name="RaccoonKr3",
+            body_name="KUKA KR3",
+            file_name="robots/kuka_kr3_support/urdf/kr3r540.urdf",
+            joint_indices=[0, 1, 2, 3, 4, 5],
+            neutral_joint_values=[0, math.radians(-90), math.radians(90), 0, 0, 0],
+            ee_link=6,
+            base_position=[-0.25, 0.0, 0.0],
+            goal_range=0.5,
+            target_radius=0.075,
+        ),
+        RobotSpec(
+            name="Rv7f",
+            env_name="RaccoonRv7f",
+            body_name="Mitsubishi Rv7f",
+            file_name="robots/mitsubishi_rv7f_description/robots/rv7f/urdf/rv7f.urdf",
+            joint_indices=[0, 1, 2, 3, 4, 5],
+            neutral_joint_values=[0, math.radians(-90), math.radians(90), 0, 0, 0],
+            ee_link=6,
+            base_position=[-0.25, 0.0, 0.0],
+            goal_range=0.5,
+            target_radius=0.075,
+        ),
+        RobotSpec(
+            name="RCCNWestRobot",
+            env_name="RCCNWestRobot",
+            body_name="Raccoon West Robot",
+            file_name="submodules/rccn_robot_cell/robot_description/rccn_kuka_robot_cell/urdf/rccn_west_robot.urdf",
+            joint_indices=[1, 3, 4, 5, 6, 7, 8],
+            neutral_joint_values=[2, 1.57, -1.57, 1.57, 0, 0, 0],
+            ee_link=10,
+            ee_orientation=[0.0, 0.7071078, 0.0, 0.7071078],
+            create_plane=False,
+        ),
+    ]
+}
@@ -1,67 +1,8 @@
-from typing import Any, Dict
+from raccoon_gym.envs.specs import ROBOT_SPECS
+from raccoon_gym.envs.tasks.reach import ReachTask
 
-import numpy as np
 
-from panda_gym.envs.core import Task
-from panda_gym.utils import distance
+class Kr300R2500UltraReach(ReachTask):
+    """Reach task of the Kr300R2500Ultra robot. See `ReachTask` for the arguments."""
 
-
-class Kr300R2500UltraReach(Task):
-    def __init__(
-        self,
-        sim,
-        get_ee_position,
-        reward_type="sparse",
-        distance_threshold=0.05,
-        goal_range=1.5,
-    ) -> None:
-        super().__init__(sim)
-        self.reward_type = reward_type
-        self.distance_threshold = distance_threshold
-        self.get_ee_position = get_ee_position
-        self.goal_range_low = np.array([-goal_range / 2, -goal_range / 2, 0])
-        self.goal_range_high = np.array([goal_range / 2, goal_range / 2, goal_range])
-        with self.sim.no_rendering():
-            self._create_scene()
-
-    def _create_scene(self) -> None:
-        self.sim.create_plane(z_offset=-0.6)
-        # self.sim.create_table(
-        #     length=1.1,
-        #     width=1.2,
-        #     height=0.4, x_offset=-0.3)
-        self.sim.create_sphere(
-            body_name="target",
-            radius=0.15,
-            mass=0.0,
-            ghost=True,
-            position=np.zeros(3),
-            rgba_color=np.array([0.1, 0.9, 0.1, 0.3]),
-        )
-
-    def get_obs(self) -> np.ndarray:
-        return np.array([])  # no task-specific observation
-
-    def get_achieved_goal(self) -> np.ndarray:
-        ee_position = np.array(self.get_ee_position())
-        return ee_position
-
-    def reset(self) -> None:
-        self.goal = self._sample_goal()
-        self.sim.set_base_pose("target", self.goal, np.array([0.0, 0.0, 0.0, 1.0]))
-
-    def _sample_goal(self) -> np.ndarray:
-        """Randomize goal."""
-        goal = self.np_random.uniform(self.goal_range_low, self.goal_range_high)
-        return goal
-
-    def is_success(self, achieved_goal: np.ndarray, desired_goal: np.ndarray) -> np.ndarray:
-        d = distance(achieved_goal, desired_goal)
-        return np.array(d < self.distance_threshold, dtype=bool)
-
-    def compute_reward(self, achieved_goal, desired_goal, info: Dict[str, Any]) -> np.ndarray:
-        d = distance(achieved_goal, desired_goal)
-        if self.reward_type == "sparse":
-            return -np.array(d > self.distance_threshold, dtype=np.float32)
-        else:
-            return -d.astype(np.float32)
+    spec = ROBOT_SPECS["Kr300R2500Ultra"]
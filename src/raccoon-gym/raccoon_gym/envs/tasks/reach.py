@@ -0,0 +1,150 @@
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from panda_gym.envs.core import Task
+
+from raccoon_gym.envs.specs import RobotSpec
+from raccoon_gym.utils import reach_reward, reach_success
+
+
+class ReachTask(Task):
+    """Reach a target sphere with the end-effector, sized after a `RobotSpec`.
+
+    Subclasses can set the `spec` class attribute instead of passing it, e.g. `Kr16Reach`.
+
+    Args:
+        sim (PyBullet): Simulation instance.
+        get_ee_position (Callable): Returns the end-effector position, as (x, y, z).
+        reward_type (str, optional): "sparse" or "dense". Defaults to "sparse".
+        distance_threshold (float, optional): Success radius, in m. Defaults to 0.05.
+        goal_range (float, optional): Side of the goal sampling box, in m. Defaults to the goal range of the spec.
+        origin (np.ndarray, optional): Origin of the goals, so that several tasks can share one simulation.
+            Defaults to (0, 0, 0).
+        target_name (str, optional): Name of the target body. Defaults to "target".
+        create_plane (bool, optional): Whether to create the ground plane. Defaults to the value of the spec.
+        spec (RobotSpec, optional): Description of the robot. Defaults to the `spec` class attribute.
+        zero_alloc (bool, optional): Write the achieved goal into a buffer reused across steps, only valid until
+            the next call. Defaults to False.
+        reachable_goals (bool, optional): Sample the goals in the part of the goal box the end-effector can reach,
+            see `raccoon_gym.workspace`, instead of in the whole box. Defaults to False.
+        base_position (np.ndarray, optional): Position of the robot base relative to the origin, used to place the
+            reachable workspace. Defaults to the base position of the spec.
+        curriculum (Curriculum, optional): Scales the goal range and sets the distance threshold at every reset,
+            after the current level of the curriculum, see `raccoon_gym.curriculum`. Defaults to None.
+    """
+
+    spec: Optional[RobotSpec] = None
+
+    def __init__(
+        self,
+        sim,
+        get_ee_position,
+        reward_type="sparse",
+        distance_threshold=0.05,
+        goal_range=None,
+        origin=None,
+        target_name="target",
+        create_plane=None,
+        spec=None,
+        zero_alloc=False,
+        reachable_goals=False,
+        base_position=None,
+        curriculum=None,
+    ) -> None:
+        super().__init__(sim)
+        spec = spec if spec is not None else self.spec
+        if spec is None:
+            raise ValueError(f"{type(self).__name__} needs a RobotSpec.")
+        self.spec = spec
+        goal_range = goal_range if goal_range is not None else spec.goal_range
+        self.reward_type = reward_type
+        self.distance_threshold = distance_threshold
+        self.get_ee_position = get_ee_position
+        # goals are expressed relative to the origin, so that several tasks can share one simulation
+        self.origin = origin if origin is not None else np.zeros(3)
+        self.target_name = target_name
+        self.create_plane = create_plane if create_plane is not None else spec.create_plane
+        self.zero_alloc = zero_alloc
+        self._achieved_goal = np.zeros(3)
+        self.workspace = None
+        self._full_workspace = None
+        if reachable_goals:
+            from raccoon_gym.workspace import reachable_workspace
+
+            # the workspace is computed in the frame of the base, and restricted to the goal box
+            self._base_position = np.array(base_position if base_position is not None else spec.base_position)
+            self._full_workspace = reachable_workspace(spec)
+        self._goal_range = goal_range
+        self._workspaces: Dict[float, Any] = {}  # restricted workspaces, per goal range
+        if self._full_workspace is not None and curriculum is not None:
+            # every level is checked here, rather than at the reset that reaches it
+            for level in range(curriculum.n_levels):
+                self._set_goal_range(curriculum.params(level)[0] * goal_range)
+        self._set_goal_range(goal_range)
+        self.curriculum = curriculum
+        self.curriculum_level: Optional[int] = None  # level of the current goal box and threshold
+        with self.sim.no_rendering():
+            self._create_scene()
+
+    def _create_scene(self) -> None:
+        if self.create_plane:
+            self.sim.create_plane(z_offset=-0.6)
+        self.sim.create_sphere(
+            body_name=self.target_name,
+            radius=self.spec.target_radius,
+            mass=0.0,
+            ghost=True,
+            position=self.origin,
+            rgba_color=np.array([0.1, 0.9, 0.1, 0.3]),
+        )
+
+    def get_obs(self) -> np.ndarray:
+        return np.array([])  # no task-specific observation
+
+    def get_achieved_goal(self) -> np.ndarray:
+        if self.zero_alloc:
+            return np.subtract(self.get_ee_position(), self.origin, out=self._achieved_goal)
+        ee_position = np.array(self.get_ee_position()) - self.origin
+        return ee_position
+
+    def _set_goal_range(self, goal_range: float) -> None:
+        self.goal_range_low = np.array([-goal_range / 2, -goal_range / 2, 0])
+        self.goal_range_high = np.array([goal_range / 2, goal_range / 2, goal_range])
+        if self._full_workspace is not None:
+            workspace = self._workspaces.get(goal_range)
+            if workspace is None:
+                try:
+                    workspace = self._full_workspace.restrict(
+                        self.goal_range_low - self._base_position, self.goal_range_high - self._base_position
+                    )
+                except ValueError:
+                    raise ValueError(
+                        f"{self.spec.name} can not reach any goal of the goal box of side {goal_range:.3f} m."
+                    ) from None
+                self._workspaces[goal_range] = workspace
+            self.workspace = workspace
+
+    def reset(self) -> None:
+        if self.curriculum is not None and self.curriculum.level != self.curriculum_level:
+            self.curriculum_level = self.curriculum.level
+            goal_range_scale, self.distance_threshold = self.curriculum.params(self.curriculum_level)
+            self._set_goal_range(goal_range_scale * self._goal_range)
+        self.goal = self._sample_goal()
+        self.sim.set_base_pose(self.target_name, self.origin + self.goal, np.array([0.0, 0.0, 0.0, 1.0]))
+
+    def _sample_goal(self) -> np.ndarray:
+        """Randomize goal."""
+        if self.workspace is not None:
+            return self._base_position + self.workspace.sample(self.np_random)
+        goal = self.np_random.uniform(self.goal_range_low, self.goal_range_high)
+        return goal
+
+    def is_success(
+        self, achieved_goal: np.ndarray, desired_goal: np.ndarray, info: Optional[Dict[str, Any]] = None
+    ) -> np.ndarray:
+        # batched over the leading dimensions, so that HER can relabel a whole batch in one call
+        return reach_success(achieved_goal, desired_goal, self.distance_threshold)
+
+    def compute_reward(self, achieved_goal, desired_goal, info: Optional[Dict[str, Any]] = None) -> np.ndarray:
+        return reach_reward(achieved_goal, desired_goal, self.distance_threshold, self.reward_type)
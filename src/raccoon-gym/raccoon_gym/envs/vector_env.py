@@ -0,0 +1,315 @@
+import math
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+from gymnasium import spaces
+from gymnasium.utils import seeding
+from gymnasium.vector import VectorEnv
+
+from raccoon_gym.curriculum import Curriculum
+from raccoon_gym.envs.raccoon_env import make_sim
+from raccoon_gym.envs.robots.arm import ArmRobot
+from raccoon_gym.envs.specs import ROBOT_SPECS, RobotSpec
+from raccoon_gym.envs.tasks.reach import ReachTask
+from raccoon_gym.rendering import Camera, render_frame
+
+
+class VectorReachEnv(VectorEnv):
+    """N copies of a reach environment simulated in a single PyBullet client.
+
+    The robots are laid out on a square grid, `spacing` meters apart, each with its own target sphere. All the
+    robots are stepped together by one `sim.step()` per policy step. Observations and goals are expressed in the
+    frame of each copy, and the robot sits at the base position of its spec, so with the same arguments they match
+    the ones of `ReachEnv`.
+
+    Episodes are truncated after `max_episode_steps` and terminated on success, like the registered ids. Done
+    copies are reset automatically; the last observation of the finished episode is returned in
+    `info["final_observation"]`.
+
+    Args:
+        robot (str or RobotSpec): Name of the robot in `ROBOT_SPECS`, e.g. "Kr16", or its spec.
+        num_envs (int): Number of copies.
+        base_position (np.ndarray, optional): Base position of the robot within one copy. Defaults to the base
+            position of the spec.
+        spacing (float, optional): Distance between two neighbouring copies, in m. Defaults to 4.0.
+        render_mode (str, optional): Render mode. Defaults to "rgb_array".
+        reward_type (str, optional): "sparse" or "dense". Defaults to "sparse".
+        control_type (str, optional): "ee" to control end-effector position or "joints" to control joint values.
+            Defaults to "ee".
+        renderer (str, optional): Renderer, either "Tiny" or OpenGL". Defaults to "Tiny".
+        max_episode_steps (int, optional): Maximum number of steps per episode. Defaults to 100.
+        ik_solver (str, optional): "pybullet" or "numpy". With "numpy" and "ee" control, the inverse kinematics
+            of all the copies is solved in one batched call. Defaults to "pybullet".
+        urdf_cache (bool, optional): Whether to load the robots from the on-disk URDF cache. Defaults to True.
+        headless (bool, optional): Training mode, see `ReachEnv`. `render` and `get_images` then return None.
+            Defaults to False.
+        reachable_goals (bool, optional): Sample the goals where the end-effector can reach them, see
+            `raccoon_gym.workspace`. Defaults to False.
+        terminate_on_success (bool, optional): Terminate the episode of a copy when its goal is reached. Otherwise,
+            the episode goes on until it is truncated, and `info["is_success"]` still reports the success.
+            Defaults to True.
+        action_repeat (int, optional): Number of times every action is applied, see `ReachEnv`. The copies whose
+            goal is reached stop repeating, and keep the observation of that repeat. Defaults to 1.
+        reward_aggregation (str, optional): Reward of a repeated action, "last", "sum" or "mean", see `ReachEnv`.
+            Defaults to "last".
+        physics_timestep (float, optional): Physics timestep, in s. Defaults to the one of the spec, or 1/500 s.
+        n_substeps (int, optional): Physics steps per `sim.step`. Defaults to the one of the spec, or 20.
+        solver_iterations (int, optional): Constraint solver iterations per physics step. Defaults to the one of the
+            spec, or the PyBullet default of 50.
+        curriculum (Curriculum, optional): Goal curriculum, see `raccoon_gym.curriculum`. The outcome of every
+            episode is recorded when the copy is reset. Defaults to None.
+    """
+
+    metadata = {"render_modes": ["human", "rgb_array"]}
+
+    def __init__(
+        self,
+        robot: Union[str, RobotSpec],
+        num_envs: int,
+        base_position: Optional[np.ndarray] = None,
+        spacing: float = 4.0,
+        render_mode: str = "rgb_array",
+        reward_type: str = "sparse",
+        control_type: str = "ee",
+        renderer: str = "Tiny",
+        max_episode_steps: int = 100,
+        ik_solver: str = "pybullet",
+        urdf_cache: bool = True,
+        headless: bool = False,
+        reachable_goals: bool = False,
+        terminate_on_success: bool = True,
+        action_repeat: int = 1,
+        reward_aggregation: str = "last",
+        physics_timestep: Optional[float] = None,
+        n_substeps: Optional[int] = None,
+        solver_iterations: Optional[int] = None,
+        curriculum: Optional[Curriculum] = None,
+    ) -> None:
+        spec = ROBOT_SPECS[robot] if isinstance(robot, str) else robot
+        if action_repeat < 1:
+            raise ValueError(f"action_repeat must be at least 1, got {action_repeat}.")
+        if reward_aggregation not in ("last", "sum", "mean"):
+            raise ValueError(f"Unknown reward_aggregation {reward_aggregation!r}, expected 'last', 'sum' or 'mean'.")
+        self.robot_spec = spec
+        base_position = np.array(base_position if base_position is not None else spec.base_position)
+        # same simulation settings as the single environment
+        self.sim = make_sim(
+            spec,
+            headless=headless,
+            render_mode=render_mode,
+            renderer=renderer,
+            physics_timestep=physics_timestep,
+            n_substeps=n_substeps,
+            solver_iterations=solver_iterations,
+        )
+        self.render_mode = self.sim.render_mode
+        self.headless = headless
+        self.max_episode_steps = max_episode_steps
+        self.terminate_on_success = terminate_on_success
+        self.action_repeat = action_repeat
+        self.reward_aggregation = reward_aggregation
+        self.batched_ik = ik_solver == "numpy" and control_type == "ee"
+
+        side = math.ceil(math.sqrt(num_envs))
+        self.origins = np.array([[spacing * (i % side), spacing * (i // side), 0.0] for i in range(num_envs)])
+        self.robots: List[ArmRobot] = []
+        self.tasks: List[ReachTask] = []
+        for i, origin in enumerate(self.origins):
+            robot = ArmRobot(
+                self.sim,
+                spec,
+                base_position=base_position + origin,
+                control_type=control_type,
+                body_name=f"{spec.name}_{i}",
+                ik_solver=ik_solver,
+                urdf_cache=urdf_cache,
+            )
+            # the ground plane is only created once, with the first copy
+            task = ReachTask(
+                self.sim,
+                reward_type=reward_type,
+                get_ee_position=robot.get_ee_position,
+                spec=spec,
+                origin=origin,
+                target_name=f"target_{i}",
+                create_plane=None if i == 0 else False,
+                reachable_goals=reachable_goals,
+                base_position=base_position,
+                curriculum=curriculum,
+            )
+            self.robots.append(robot)
+            self.tasks.append(task)
+
+        self.curriculum = curriculum
+        self._np_randoms = [seeding.np_random()[0] for _ in range(num_envs)]
+        self._elapsed_steps = np.zeros(num_envs, dtype=np.int64)
+        self._actions = None
+        self._camera: Optional[Camera] = None  # camera of the last get_images, and its copies shifted to the origins
+        self._cameras: List[Camera] = []
+
+        # preallocated stacked observations, filled row by row
+        for task, np_random in zip(self.tasks, self._np_randoms):
+            task.np_random = np_random
+            task.reset()
+        obs_dim = self.robots[0].get_obs().shape[0] + self.tasks[0].get_obs().shape[0]
+        goal_dim = self.tasks[0].get_goal().shape[0]
+        self._observation = np.zeros((num_envs, obs_dim), dtype=np.float32)
+        self._achieved_goal = np.zeros((num_envs, goal_dim), dtype=np.float32)
+        self._desired_goal = np.zeros((num_envs, goal_dim), dtype=np.float32)
+
+        single_observation_space = spaces.Dict(
+            dict(
+                observation=spaces.Box(-10.0, 10.0, shape=(obs_dim,), dtype=np.float32),
+                desired_goal=spaces.Box(-10.0, 10.0, shape=(goal_dim,), dtype=np.float32),
+                achieved_goal=spaces.Box(-10.0, 10.0, shape=(goal_dim,), dtype=np.float32),
+            )
+        )
+        super().__init__(num_envs, single_observation_space, self.robots[0].action_space)
+        self.compute_reward = self.tasks[0].compute_reward
+
+    def _update_obs(self, i: int) -> None:
+        robot, task = self.robots[i], self.tasks[i]
+        robot_obs = robot.get_obs()
+        robot_obs[:3] -= self.origins[i]  # ee position in the frame of the copy
+        task_obs = task.get_obs()
+        self._observation[i, : robot_obs.shape[0]] = robot_obs
+        self._observation[i, robot_obs.shape[0] :] = task_obs
+        self._achieved_goal[i] = task.get_achieved_goal()
+        self._desired_goal[i] = task.get_goal()
+
+    def _get_obs(self) -> Dict[str, np.ndarray]:
+        return {
+            "observation": self._observation.copy(),
+            "achieved_goal": self._achieved_goal.copy(),
+            "desired_goal": self._desired_goal.copy(),
+        }
+
+    def _reset_env(self, i: int) -> None:
+        self.tasks[i].np_random = self._np_randoms[i]
+        with self.sim.no_rendering():
+            self.robots[i].reset()
+            self.tasks[i].reset()
+        self._elapsed_steps[i] = 0
+
+    def reset_wait(
+        self, seed: Optional[Union[int, List[int]]] = None, options: Optional[dict] = None
+    ) -> tuple:
+        if seed is not None:
+            seeds = seed if isinstance(seed, list) else [seed + i for i in range(self.num_envs)]
+            self._np_randoms = [seeding.np_random(s)[0] for s in seeds]
+        for i in range(self.num_envs):
+            self._reset_env(i)
+            self._update_obs(i)
+        observation = self._get_obs()
+        success = self.tasks[0].is_success(observation["achieved_goal"], observation["desired_goal"])
+        info = {"is_success": success, "_is_success": np.ones(self.num_envs, dtype=bool)}
+        return observation, info
+
+    def step_async(self, actions: np.ndarray) -> None:
+        self._actions = np.asarray(actions)
+
+    def _set_ee_actions(self, actions: np.ndarray, indices: np.ndarray) -> None:
+        """Batched version of the "ee" control of the robots, for the copies of `indices`."""
+        robot = self.robots[0]
+        robots = [self.robots[i] for i in indices]
+        actions = np.clip(actions[indices], robot.action_space.low, robot.action_space.high)
+        ee_position = np.array([robot.get_ee_position() for robot in robots]) - self.origins[indices]
+        target_ee_position = ee_position + actions[:, :3] * robot.dicplacement_scale
+        target_ee_position[:, 2] = np.maximum(target_ee_position[:, 2], 0)
+        current_arm_joint_angles = np.array([robot.get_joint_states()[0] for robot in robots])
+        # the first copy sits at the world origin, so its chain is expressed in the frame of every copy
+        target_arm_angles = robot.kinematics.inverse_kinematics(
+            target_ee_position, current_arm_joint_angles, orientation=robot.ee_orientation, max_iterations=3
+        )
+        for robot, target_angles in zip(robots, target_arm_angles):
+            robot.control_joints(target_angles=target_angles)
+
+    def step_wait(self) -> tuple:
+        # copies still repeating their action, the others keep the observation of their last repeat
+        repeating = np.ones(self.num_envs, dtype=bool)
+        last_reward = np.zeros(self.num_envs, dtype=np.float32)
+        reward_sum = np.zeros(self.num_envs, dtype=np.float32)
+        n_repeats = np.zeros(self.num_envs, dtype=np.int64)
+        for _ in range(self.action_repeat):
+            indices = np.flatnonzero(repeating)
+            if self.batched_ik:
+                self._set_ee_actions(self._actions, indices)
+            else:
+                for i in indices:
+                    self.robots[i].set_action(self._actions[i])
+            self.sim.step()  # a single physics step for all the copies
+            for i in indices:
+                self._update_obs(i)
+            # reward and success are computed in one batched call for all the copies
+            success = self.tasks[0].is_success(self._achieved_goal, self._desired_goal)
+            reward = self.compute_reward(self._achieved_goal, self._desired_goal, {})
+            last_reward[indices] = reward[indices]
+            reward_sum[indices] += reward[indices]
+            n_repeats[indices] += 1
+            if self.terminate_on_success:
+                repeating &= ~success
+                if not np.any(repeating):
+                    break
+        if self.reward_aggregation == "sum":
+            reward = reward_sum
+        elif self.reward_aggregation == "mean":
+            reward = reward_sum / n_repeats
+        else:
+            reward = last_reward
+        terminated = success if self.terminate_on_success else np.zeros(self.num_envs, dtype=bool)
+        self._elapsed_steps += 1
+        truncated = self._elapsed_steps >= self.max_episode_steps
+        observation = self._get_obs()
+        info: Dict[str, Any] = {"is_success": success.copy(), "_is_success": np.ones(self.num_envs, dtype=bool)}
+
+        done = terminated | truncated
+        if np.any(done):
+            final_observation = np.full(self.num_envs, None, dtype=object)
+            final_info = np.full(self.num_envs, None, dtype=object)
+            for i in np.flatnonzero(done):
+                final_observation[i] = {key: value[i].copy() for key, value in observation.items()}
+                final_info[i] = {"is_success": bool(success[i])}
+                if self.curriculum is not None:
+                    self.curriculum.record(success[i], self.tasks[i].curriculum_level)
+                self._reset_env(i)
+                self._update_obs(i)
+            # observation rows of the done copies hold the first observation of the new episode
+            observation = self._get_obs()
+            info["final_observation"] = final_observation
+            info["_final_observation"] = done
+            info["final_info"] = final_info
+            info["_final_info"] = done
+        return observation, reward, terminated, truncated, info
+
+    def render(self, width: int = 720, height: int = 480) -> Optional[np.ndarray]:
+        """Render the whole grid of copies, from above its center."""
+        if self.render_mode != "rgb_array":
+            return None
+        center = self.origins.mean(axis=0)
+        distance = 2.4 + float(np.ptp(self.origins[:, 0]))
+        camera = Camera(width=width, height=height, target_position=center, distance=distance)
+        return render_frame(self.sim, camera)
+
+    def get_images(self, camera: Optional[Camera] = None) -> Optional[np.ndarray]:
+        """Render every copy through the same camera, shifted to its origin.
+
+        Args:
+            camera (Camera, optional): Camera of the first copy. Defaults to `Camera()`, at 720x480.
+
+        Returns:
+            np.ndarray or None: The RGB frames, of shape (num_envs, height, width, 3), or None if `headless`.
+        """
+        if self.headless:
+            return None
+        camera = camera if camera is not None else Camera()
+        if camera != self._camera:
+            # the shifted cameras keep their matrices until the camera changes
+            self._camera = camera
+            self._cameras = [camera.shifted(origin) for origin in self.origins]
+        frames = np.empty((self.num_envs, camera.height, camera.width, 3), dtype=np.uint8)
+        for i, shifted in enumerate(self._cameras):
+            render_frame(self.sim, shifted, out=frames[i])
+        return frames
+
+    def close_extras(self, **kwargs) -> None:
+        self.sim.close()
@@ -0,0 +1,249 @@
+"""Evaluate the checkpoints of a training run, in parallel.
+
+Every checkpoint is evaluated in its own process, on the same episodes: episode i is reset with seed `seed + i`, so
+that the checkpoints, and the runs, are compared on the same goals. In each process, `n_envs` headless envs are
+stepped together, with one batched forward pass of the actor per step, see `raccoon_gym.inference`.
+
+Usage:
+    python -m raccoon_gym.evaluate logs/models/20240627102311 --env-id RaccoonKr16Reach-v1 --control-type joints
+    python -m raccoon_gym.evaluate logs/models/*/tqc_kuka_reach_90000_steps.zip --env-id RaccoonKr16ReachJoints-v1
+"""
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import pickle
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+import gymnasium as gym
+import numpy as np
+
+from raccoon_gym.inference import BACKENDS, BatchedPolicy
+
+ALGOS = ("tqc", "sac", "td3", "ddpg", "ppo")
+
+
+def algo_class(algo: str):
+    """SB3 class of an algorithm of `ALGOS`, e.g. `TQC` for "tqc"."""
+    if algo == "tqc":
+        from sb3_contrib import TQC
+
+        return TQC
+    import stable_baselines3
+
+    return getattr(stable_baselines3, algo.upper())
+
+
+def find_checkpoints(paths: List[str]) -> List[str]:
+    """List the checkpoints, sorted by training step.
+
+    Args:
+        paths (List[str]): Checkpoint files, or directories of `CheckpointCallback` zips.
+
+    Returns:
+        List[str]: The zip files, sorted by the number of steps in their name, then by name.
+    """
+    files = []
+    for path in paths:
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"No checkpoint or directory {path}.")
+        files += sorted(glob.glob(os.path.join(path, "*.zip"))) if os.path.isdir(path) else [path]
+
+    def steps(file_name: str) -> int:
+        match = re.search(r"_(\d+)_steps\.zip$", file_name)
+        return int(match.group(1)) if match else sys.maxsize  # e.g. the final model, last
+
+    return sorted(files, key=lambda file_name: (steps(file_name), file_name))
+
+
+def vecnormalize_path(checkpoint: str) -> str:
+    """Path of the `VecNormalize` statistics saved with a checkpoint, by `CheckpointCallback` or `raccoon_gym.train`.
+
+    Args:
+        checkpoint (str): Zip file, e.g. "tqc_reach_20000_steps.zip" or "final_model.zip".
+
+    Returns:
+        str: E.g. "tqc_reach_vecnormalize_20000_steps.pkl", or "vecnormalize.pkl" in the directory of the checkpoint.
+    """
+    match = re.search(r"^(.*)_(\d+)_steps\.zip$", checkpoint)
+    if match:
+        return f"{match.group(1)}_vecnormalize_{match.group(2)}_steps.pkl"
+    return os.path.join(os.path.dirname(checkpoint), "vecnormalize.pkl")
+
+
+def evaluate_checkpoint(
+    checkpoint: str,
+    env_id: str,
+    algo: str = "tqc",
+    n_episodes: int = 100,
+    n_envs: int = 8,
+    seed: int = 0,
+    env_kwargs: Optional[Dict] = None,
+    backend: str = "torchscript",
+) -> Dict:
+    """Evaluate the deterministic policy of a checkpoint.
+
+    Args:
+        checkpoint (str): Zip file saved by SB3.
+        env_id (str): Registered id of the environment.
+        algo (str, optional): Algorithm of the checkpoint, one of `ALGOS`. Defaults to "tqc".
+        n_episodes (int, optional): Number of episodes. Defaults to 100.
+        n_envs (int, optional): Number of envs stepped together. Defaults to 8.
+        seed (int, optional): Seed of the first episode. Defaults to 0.
+        env_kwargs (dict, optional): Forwarded to `gym.make`, e.g. `{"control_type": "joints"}`. Defaults to {}.
+        backend (str, optional): Backend of the `BatchedPolicy`. Defaults to "torchscript".
+
+    The observations are normalized with the statistics saved beside the checkpoint, if any, see
+    `vecnormalize_path`.
+
+    Returns:
+        dict: Success rate, mean final distance to the goal, mean episode length and the per episode results.
+    """
+    import torch as th
+
+    import raccoon_gym  # noqa: F401, registers the envs in the worker processes
+
+    th.set_num_threads(1)  # one process per checkpoint already
+    start = time.perf_counter()
+    # no replay buffer: HER would need the env, and the checkpoints do not contain the buffer anyway
+    no_buffer = {"buffer_size": 1, "replay_buffer_class": None, "replay_buffer_kwargs": {}}
+    model = algo_class(algo).load(checkpoint, device="cpu", custom_objects=no_buffer)
+    env_kwargs = env_kwargs or {}
+    envs = [gym.make(env_id, headless=True, **env_kwargs) for _ in range(min(n_envs, n_episodes))]
+    if envs[0].observation_space != model.observation_space or envs[0].action_space != model.action_space:
+        raise ValueError(f"{checkpoint} was not trained on {env_id} with {env_kwargs}, check --control-type.")
+    policy = BatchedPolicy(model, backend=backend)
+    vec_normalize = None
+    if os.path.exists(vecnormalize_path(checkpoint)):
+        with open(vecnormalize_path(checkpoint), "rb") as file:
+            vec_normalize = pickle.load(file)
+
+    # episodes are handed out in order, each env runs one at a time
+    episodes = [None] * len(envs)
+    observations = [None] * len(envs)
+    lengths = [0] * len(envs)
+    next_episode = 0
+    for i, env in enumerate(envs):
+        observations[i], _ = env.reset(seed=seed + next_episode)
+        episodes[i] = next_episode
+        next_episode += 1
+    successes = np.zeros(n_episodes, dtype=bool)
+    final_distances = np.zeros(n_episodes)
+    episode_lengths = np.zeros(n_episodes, dtype=np.int64)
+    n_done = 0
+    while n_done < n_episodes:
+        active = [i for i, episode in enumerate(episodes) if episode is not None]
+        batch = {key: np.stack([observations[i][key] for i in active]) for key in observations[active[0]]}
+        actions = policy(vec_normalize.normalize_obs(batch) if vec_normalize is not None else batch)
+        for i, action in zip(active, actions):
+            observation, _, terminated, truncated, info = envs[i].step(action)
+            observations[i] = observation
+            lengths[i] += 1
+            if not (terminated or truncated):
+                continue
+            episode = episodes[i]
+            successes[episode] = info["is_success"]
+            final_distances[episode] = np.linalg.norm(observation["achieved_goal"] - observation["desired_goal"])
+            episode_lengths[episode] = lengths[i]
+            n_done += 1
+            lengths[i] = 0
+            if next_episode < n_episodes:
+                observations[i], _ = envs[i].reset(seed=seed + next_episode)
+                episodes[i] = next_episode
+                next_episode += 1
+            else:
+                episodes[i] = None
+    for env in envs:
+        env.close()
+    return {
+        "checkpoint": checkpoint,
+        "success_rate": float(successes.mean()),
+        "mean_final_distance": float(final_distances.mean()),
+        "mean_episode_length": float(episode_lengths.mean()),
+        "n_episodes": n_episodes,
+        "time_s": time.perf_counter() - start,
+        "episodes": {
+            "success": successes.tolist(),
+            "final_distance": final_distances.tolist(),
+            "length": episode_lengths.tolist(),
+        },
+    }
+
+
+def evaluate(
+    checkpoints: List[str],
+    env_id: str,
+    algo: str = "tqc",
+    n_episodes: int = 100,
+    n_envs: int = 8,
+    seed: int = 0,
+    env_kwargs: Optional[Dict] = None,
+    backend: str = "torchscript",
+    max_workers: Optional[int] = None,
+) -> List[Dict]:
+    """Evaluate checkpoints in parallel, one process per checkpoint. See `evaluate_checkpoint`.
+
+    Args:
+        max_workers (int, optional): Number of processes. Defaults to the number of CPUs.
+
+    Returns:
+        List[dict]: The results, in the order of `checkpoints`.
+    """
+    # spawn: neither pybullet nor torch are safe to fork
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=context) as executor:
+        futures = [
+            executor.submit(
+                evaluate_checkpoint, checkpoint, env_id, algo, n_episodes, n_envs, seed, env_kwargs, backend
+            )
+            for checkpoint in checkpoints
+        ]
+        return [future.result() for future in futures]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("checkpoints", nargs="+", help="Checkpoint zips, or directories of checkpoint zips.")
+    parser.add_argument("--env-id", required=True)
+    parser.add_argument("--control-type", choices=("ee", "joints"), default=None, help="Defaults to the one of the id.")
+    parser.add_argument("--algo", choices=ALGOS, default="tqc")
+    parser.add_argument("--n-episodes", type=int, default=100)
+    parser.add_argument("--n-envs", type=int, default=8, help="Envs stepped together in each process.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--backend", choices=BACKENDS, default="torchscript", help="Inference backend of the actor.")
+    parser.add_argument("--max-workers", type=int, default=None, help="Defaults to the number of CPUs.")
+    parser.add_argument("--output", default=None, help="JSON file with the per episode results.")
+    args = parser.parse_args()
+
+    checkpoints = find_checkpoints(args.checkpoints)
+    if not checkpoints:
+        parser.error(f"No checkpoint found in {args.checkpoints}.")
+    env_kwargs = {"control_type": args.control_type} if args.control_type is not None else {}
+    results = evaluate(
+        checkpoints,
+        args.env_id,
+        algo=args.algo,
+        n_episodes=args.n_episodes,
+        n_envs=args.n_envs,
+        seed=args.seed,
+        env_kwargs=env_kwargs,
+        backend=args.backend,
+        max_workers=args.max_workers,
+    )
+    for result in results:
+        print(
+            f"{result['checkpoint']}: success {result['success_rate']:.1%}, "
+            f"final distance {result['mean_final_distance']:.3f} m, length {result['mean_episode_length']:.1f}"
+        )
+    if args.output is not None:
+        with open(args.output, "w") as file:
+            json.dump({"env_id": args.env_id, "env_kwargs": env_kwargs, "seed": args.seed, "results": results}, file)
+
+
+if __name__ == "__main__":
+    main()
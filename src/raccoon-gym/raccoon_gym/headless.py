@@ -0,0 +1,86 @@
+"""PyBullet simulation for training, with no rendering at all.
+
+`HeadlessPyBullet` always connects in DIRECT mode, loads the collision geometry only, and never calls the debug
+visualizer nor the camera: `render()` returns None and `no_rendering()` does nothing.
+"""
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+import numpy as np
+import pybullet as p
+import pybullet_data
+import pybullet_utils.bullet_client as bc
+
+from panda_gym.pybullet import PyBullet
+
+
+class HeadlessPyBullet(PyBullet):
+    """`PyBullet` without visual shapes, camera nor renderer.
+
+    Args:
+        n_substeps (int, optional): Number of sim substep when step() is called. Defaults to 20.
+    """
+
+    visual_shapes = False  # read by `raccoon_gym.urdf_cache.load_urdf`
+
+    def __init__(self, n_substeps: int = 20) -> None:
+        # same setup as PyBullet.__init__, without the GUI and visualizer options
+        self.render_mode = None
+        self.background_color = np.zeros(3, dtype=np.float32)
+        self.connection_mode = p.DIRECT
+        self.physics_client = bc.BulletClient(connection_mode=self.connection_mode)
+        self.n_substeps = n_substeps
+        self.timestep = 1.0 / 500
+        self.physics_client.setTimeStep(self.timestep)
+        self.physics_client.resetSimulation()
+        self.physics_client.setAdditionalSearchPath(pybullet_data.getDataPath())
+        self.physics_client.setGravity(0, 0, -9.81)
+        self._bodies_idx = {}
+
+    def render(self, *args: Any, **kwargs: Any) -> None:
+        """Do nothing: there is no renderer."""
+        return None
+
+    @contextmanager
+    def no_rendering(self) -> Iterator[None]:
+        """Do nothing: rendering is never enabled."""
+        yield
+
+    def place_visualizer(self, *args: Any, **kwargs: Any) -> None:
+        """Do nothing: there is no camera."""
+
+    def loadURDF(self, body_name: str, **kwargs: Any) -> None:
+        """Load URDF file, without its visual shapes.
+
+        Args:
+            body_name (str): The name of the body. Must be unique in the sim.
+        """
+        kwargs["flags"] = kwargs.get("flags", 0) | p.URDF_IGNORE_VISUAL_SHAPES
+        self._bodies_idx[body_name] = self.physics_client.loadURDF(**kwargs)
+
+    def _create_geometry(
+        self,
+        body_name: str,
+        geom_type: int,
+        mass: float = 0.0,
+        position: Optional[np.ndarray] = None,
+        ghost: bool = False,
+        lateral_friction: Optional[float] = None,
+        spinning_friction: Optional[float] = None,
+        visual_kwargs: Dict[str, Any] = {},
+        collision_kwargs: Dict[str, Any] = {},
+    ) -> None:
+        """Create a geometry, without its visual shape. See `PyBullet._create_geometry`."""
+        position = position if position is not None else np.zeros(3)
+        # a ghost body has no shape at all, only its pose
+        baseCollisionShapeIndex = -1 if ghost else self.physics_client.createCollisionShape(geom_type, **collision_kwargs)
+        self._bodies_idx[body_name] = self.physics_client.createMultiBody(
+            baseCollisionShapeIndex=baseCollisionShapeIndex,
+            baseMass=mass,
+            basePosition=position,
+        )
+
+        if lateral_friction is not None:
+            self.set_lateral_friction(body=body_name, link=-1, lateral_friction=lateral_friction)
+        if spinning_friction is not None:
+            self.set_spinning_friction(body=body_name, link=-1, spinning_friction=spinning_friction)
@@ -0,0 +1,94 @@
+"""Batched inference of the deterministic policy of a SB3 model.
+
+`model.predict` checks, converts and reshapes its input on every call, which costs more than the forward pass of
+the actor when the batch is small. `BatchedPolicy` keeps only the forward pass: the observations of M envs go
+through the actor in a single call, optionally traced to TorchScript or exported to ONNX for CPU inference.
+"""
+import io
+from typing import Dict, List
+
+import numpy as np
+import torch as th
+
+BACKENDS = ("torch", "torchscript", "onnx")
+
+
+class _Actor(th.nn.Module):
+    """Deterministic action of a SB3 policy, with the observation as positional tensors, in the order of `keys`."""
+
+    def __init__(self, policy, keys: List[str]) -> None:
+        super().__init__()
+        self.policy = policy
+        self.keys = keys
+
+    def forward(self, *observations: th.Tensor) -> th.Tensor:
+        return self.policy._predict(dict(zip(self.keys, observations)), deterministic=True)
+
+
+class BatchedPolicy:
+    """Deterministic actions of a SB3 model with a `Dict` observation space, for a batch of observations.
+
+    The actions are the ones of `model.predict(observations, deterministic=True)`, up to the float rounding of the
+    backend. The policy of the model is moved to the CPU.
+
+    Args:
+        model (BaseAlgorithm): SB3 model, e.g. loaded with `TQC.load`.
+        backend (str, optional): "torch" to call the policy, "torchscript" to trace and freeze it, or "onnx" to run
+            it with onnxruntime (`pip install onnx onnxruntime`). Defaults to "torch".
+    """
+
+    def __init__(self, model, backend: str = "torch") -> None:
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend {backend!r}, expected one of {BACKENDS}.")
+        policy = model.policy.to("cpu")
+        policy.set_training_mode(False)
+        self.backend = backend
+        self.keys = list(model.observation_space.spaces)
+        self.action_space = model.action_space
+        # off-policy actors squash their output to [-1, 1], the others are clipped to the action space
+        self.squash_output = policy.squash_output
+        actor = _Actor(policy, self.keys).eval()
+        example = tuple(th.zeros((1,) + model.observation_space[key].shape) for key in self.keys)
+        if backend == "torchscript":
+            with th.no_grad():
+                self._actor = th.jit.freeze(th.jit.trace(actor, example, check_trace=False))
+        elif backend == "onnx":
+            try:
+                import onnx  # noqa: F401, used by the exporter
+                import onnxruntime
+            except ImportError as error:
+                raise ImportError("The onnx backend needs: pip install onnx onnxruntime") from error
+            buffer = io.BytesIO()
+            th.onnx.export(
+                actor,
+                example,
+                buffer,
+                input_names=self.keys,
+                output_names=["action"],
+                dynamic_axes={name: {0: "batch"} for name in self.keys + ["action"]},
+                dynamo=False,
+            )
+            self._session = onnxruntime.InferenceSession(buffer.getvalue(), providers=["CPUExecutionProvider"])
+        else:
+            self._actor = actor
+
+    def __call__(self, observations: Dict[str, np.ndarray]) -> np.ndarray:
+        """Actions of a batch of observations.
+
+        Args:
+            observations (Dict[str, np.ndarray]): Batched observation, with arrays of shape (n, ...).
+
+        Returns:
+            np.ndarray: The actions, of shape (n,) + action shape.
+        """
+        if self.backend == "onnx":
+            inputs = {key: np.asarray(observations[key], dtype=np.float32) for key in self.keys}
+            actions = self._session.run(None, inputs)[0]
+        else:
+            with th.no_grad():
+                inputs = [th.as_tensor(np.asarray(observations[key], dtype=np.float32)) for key in self.keys]
+                actions = self._actor(*inputs).numpy()
+        low, high = self.action_space.low, self.action_space.high
+        if self.squash_output:
+            return low + 0.5 * (actions + 1.0) * (high - low)
+        return np.clip(actions, low, high)
@@ -0,0 +1,446 @@
+"""NumPy forward and inverse kinematics of the serial chains described in the robot URDFs.
+
+All the functions are batched: joint configurations are given as (..., n_joints) arrays, and positions as
+(..., 3) arrays, so that many configurations can be solved in one call. A single configuration, e.g. the
+inverse kinematics of one robot, goes through an unbatched path on Python floats with preallocated jacobians, since
+the numpy call overhead dominates the arithmetic on a few 3 vectors.
+"""
+import functools
+import math
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+@dataclass(frozen=True)
+class URDFJoint:
+    """A joint of the URDF, with the link index PyBullet gives to its child link."""
+
+    index: int
+    name: str
+    type: str
+    parent: str
+    child: str
+    origin: np.ndarray  # (4, 4) transform from the parent link frame to the joint frame
+    axis: np.ndarray  # (3,) unit axis, in the joint frame
+    lower: float
+    upper: float
+
+
+def _rpy_to_matrix(rpy: Sequence[float]) -> np.ndarray:
+    roll, pitch, yaw = rpy
+    cr, sr = np.cos(roll), np.sin(roll)
+    cp, sp = np.cos(pitch), np.sin(pitch)
+    cy, sy = np.cos(yaw), np.sin(yaw)
+    return np.array(
+        [
+            [cy * cp, cy * sp * sr - sy * cr, cy * sp * cr + sy * sr],
+            [sy * cp, sy * sp * sr + cy * cr, sy * sp * cr - cy * sr],
+            [-sp, cp * sr, cp * cr],
+        ]
+    )
+
+
+def _parse_origin(element: Optional[ET.Element]) -> np.ndarray:
+    transform = np.eye(4)
+    if element is not None:
+        transform[:3, :3] = _rpy_to_matrix([float(v) for v in element.get("rpy", "0 0 0").split()])
+        transform[:3, 3] = [float(v) for v in element.get("xyz", "0 0 0").split()]
+    return transform
+
+
+@functools.lru_cache(maxsize=None)
+def parse_urdf(file_name: str) -> Tuple[str, Tuple[URDFJoint, ...], dict]:
+    """Parse the joint tree of a URDF file. The result is cached per file.
+
+    Joints are numbered like PyBullet numbers links: depth first from the root link, children in the order of
+    declaration.
+
+    Args:
+        file_name (str): Path of the URDF file.
+
+    Returns:
+        Tuple[str, Tuple[URDFJoint, ...], dict]: The root link name, the joints ordered by PyBullet index and the
+            inertial origin (4, 4) of every link.
+    """
+    robot = ET.parse(file_name).getroot()
+    inertial_origins = {}
+    for link in robot.findall("link"):
+        inertial = link.find("inertial")
+        inertial_origins[link.get("name")] = _parse_origin(inertial.find("origin") if inertial is not None else None)
+
+    children = {}
+    child_links = set()
+    for element in robot.findall("joint"):
+        parent = element.find("parent").get("link")
+        child = element.find("child").get("link")
+        children.setdefault(parent, []).append(element)
+        child_links.add(child)
+    root = next(name for name in inertial_origins if name not in child_links)
+
+    joints: List[URDFJoint] = []
+
+    def visit(link: str) -> None:
+        for element in children.get(link, []):
+            axis_element = element.find("axis")
+            axis = np.array([1.0, 0.0, 0.0])  # URDF default
+            if axis_element is not None:
+                axis = np.array([float(v) for v in axis_element.get("xyz").split()])
+            limit = element.find("limit")
+            joint_type = element.get("type")
+            if joint_type == "continuous" or limit is None:
+                lower, upper = -np.inf, np.inf
+            else:
+                lower, upper = float(limit.get("lower", "-inf")), float(limit.get("upper", "inf"))
+            child = element.find("child").get("link")
+            joints.append(
+                URDFJoint(
+                    index=len(joints),
+                    name=element.get("name"),
+                    type=joint_type,
+                    parent=link,
+                    child=child,
+                    origin=_parse_origin(element.find("origin")),
+                    axis=axis / np.linalg.norm(axis),
+                    lower=lower,
+                    upper=upper,
+                )
+            )
+            visit(child)
+
+    visit(root)
+    return root, tuple(joints), inertial_origins
+
+
+def _skew(v: np.ndarray) -> np.ndarray:
+    return np.array([[0.0, -v[2], v[1]], [v[2], 0.0, -v[0]], [-v[1], v[0], 0.0]])
+
+
+def _cross(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Cross product along the last axis; much cheaper than `np.cross` on small arrays."""
+    return np.stack(
+        [
+            a[..., 1] * b[..., 2] - a[..., 2] * b[..., 1],
+            a[..., 2] * b[..., 0] - a[..., 0] * b[..., 2],
+            a[..., 0] * b[..., 1] - a[..., 1] * b[..., 0],
+        ],
+        axis=-1,
+    )
+
+
+def _matmul(a: Sequence[float], b: Sequence[float]) -> Tuple[float, ...]:
+    """Product of two 3x3 matrices given as row-major 9-tuples."""
+    return (
+        a[0] * b[0] + a[1] * b[3] + a[2] * b[6], a[0] * b[1] + a[1] * b[4] + a[2] * b[7],
+        a[0] * b[2] + a[1] * b[5] + a[2] * b[8],
+        a[3] * b[0] + a[4] * b[3] + a[5] * b[6], a[3] * b[1] + a[4] * b[4] + a[5] * b[7],
+        a[3] * b[2] + a[4] * b[5] + a[5] * b[8],
+        a[6] * b[0] + a[7] * b[3] + a[8] * b[6], a[6] * b[1] + a[7] * b[4] + a[8] * b[7],
+        a[6] * b[2] + a[7] * b[5] + a[8] * b[8],
+    )  # fmt: skip
+
+
+def quaternion_to_matrix(quaternion: np.ndarray) -> np.ndarray:
+    """Rotation matrix of a quaternion given as (x, y, z, w), like in PyBullet."""
+    x, y, z, w = np.moveaxis(np.asarray(quaternion, dtype=float), -1, 0)
+    return np.stack(
+        [
+            np.stack([1 - 2 * (y * y + z * z), 2 * (x * y - z * w), 2 * (x * z + y * w)], axis=-1),
+            np.stack([2 * (x * y + z * w), 1 - 2 * (x * x + z * z), 2 * (y * z - x * w)], axis=-1),
+            np.stack([2 * (x * z - y * w), 2 * (y * z + x * w), 1 - 2 * (x * x + y * y)], axis=-1),
+        ],
+        axis=-2,
+    )
+
+
+class KinematicChain:
+    """Kinematic chain from the base of a robot to one of its links, parsed once from the URDF.
+
+    Joints of the chain that are not in `joint_indices` are kept at 0.
+
+    Args:
+        file_name (str): Path of the URDF file.
+        ee_link (int): PyBullet index of the end-effector link.
+        joint_indices (Sequence[int]): PyBullet indices of the controlled joints, in the order of the
+            configuration vectors.
+        base_position (np.ndarray, optional): Position of the base of the robot, as (x, y, z). Defaults to (0, 0, 0).
+    """
+
+    def __init__(
+        self,
+        file_name: str,
+        ee_link: int,
+        joint_indices: Sequence[int],
+        base_position: Optional[np.ndarray] = None,
+    ) -> None:
+        _, joints, inertial_origins = parse_urdf(file_name)
+        self.base_position = np.asarray(base_position if base_position is not None else np.zeros(3), dtype=float)
+        self.joint_indices = np.asarray(joint_indices)
+        self.n_joints = len(self.joint_indices)
+        self.lower = np.array([joints[i].lower for i in self.joint_indices])
+        self.upper = np.array([joints[i].upper for i in self.joint_indices])
+
+        # walk up from the end-effector to the root to get the chain
+        by_child = {joint.child: joint for joint in joints}
+        chain = []
+        link = joints[ee_link].child
+        while link in by_child:
+            chain.append(by_child[link])
+            link = by_child[link].parent
+        self.chain: List[URDFJoint] = chain[::-1]
+        # PyBullet reports the position of the link center of mass
+        self.ee_offset = inertial_origins[joints[ee_link].child]
+
+        column = {int(index): i for i, index in enumerate(self.joint_indices)}
+        self._columns = [column.get(joint.index) if joint.type != "fixed" else None for joint in self.chain]
+        self._skews = [_skew(joint.axis) for joint in self.chain]
+        self._skews2 = [skew @ skew for skew in self._skews]
+        self._eye = np.eye(3)
+        # most URDF joint origins have no rotation, skip the product for them
+        self._origin_rotations = [
+            None if np.allclose(joint.origin[:3, :3], np.eye(3)) else joint.origin[:3, :3] for joint in self.chain
+        ]
+        # the chain as Python floats, for the single configuration path
+        self._float_chain = [
+            (
+                col,
+                joint.type == "prismatic",
+                tuple(joint.origin[:3, 3].tolist()),
+                None if origin_rotation is None else tuple(origin_rotation.ravel().tolist()),
+                tuple(joint.axis.tolist()),
+            )
+            for joint, col, origin_rotation in zip(self.chain, self._columns, self._origin_rotations)
+        ]
+        self._float_ee_offset = (
+            tuple(self.ee_offset[:3, 3].tolist()),
+            tuple(self.ee_offset[:3, :3].ravel().tolist()),
+        )
+        self._frame_columns = [col for col in self._columns if col is not None]
+        self._jac = np.zeros((6, self.n_joints))
+        self._weighted_jac = np.zeros((6, self.n_joints))
+        self._target_rotations: Dict[bytes, np.ndarray] = {}  # per target orientation, usually only one
+
+    def _frames(self, q: np.ndarray) -> Tuple[np.ndarray, np.ndarray, List[Tuple[int, str, np.ndarray, np.ndarray]]]:
+        """End-effector position (..., 3) and rotation (..., 3, 3), and world axis and origin of the controlled joints."""
+        batch_shape = q.shape[:-1]
+        position = np.broadcast_to(self.base_position, batch_shape + (3,))
+        rotation = np.broadcast_to(np.eye(3), batch_shape + (3, 3))
+        joint_frames = []
+        for joint, col, origin_rotation, skew, skew2 in zip(
+            self.chain, self._columns, self._origin_rotations, self._skews, self._skews2
+        ):
+            position = position + rotation @ joint.origin[:3, 3]
+            if origin_rotation is not None:
+                rotation = rotation @ origin_rotation
+            if col is None:
+                continue  # fixed joints, and uncontrolled joints that stay at 0
+            axis = rotation @ joint.axis
+            joint_frames.append((col, joint.type, axis, position))
+            value = q[..., col]
+            if joint.type == "prismatic":
+                position = position + value[..., None] * axis
+            else:
+                sin, cos = np.sin(value)[..., None, None], np.cos(value)[..., None, None]
+                rotation = rotation @ (self._eye + sin * skew + (1.0 - cos) * skew2)
+        position = position + rotation @ self.ee_offset[:3, 3]
+        return position, rotation @ self.ee_offset[:3, :3], joint_frames
+
+    def _jacobian_single(self, q: np.ndarray) -> Tuple[np.ndarray, np.ndarray, Tuple[float, ...]]:
+        """`jacobian` of a single configuration (n_joints,), on Python floats.
+
+        Returns the `_jac` buffer, overwritten at every call, the end-effector position (3,) and its rotation as a
+        row-major 9-tuple.
+        """
+        px, py, pz = self.base_position.tolist()
+        r = (1.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 1.0)
+        frames = []
+        q = q.tolist()
+        for col, prismatic, (tx, ty, tz), origin_rotation, (ax, ay, az) in self._float_chain:
+            px += r[0] * tx + r[1] * ty + r[2] * tz
+            py += r[3] * tx + r[4] * ty + r[5] * tz
+            pz += r[6] * tx + r[7] * ty + r[8] * tz
+            if origin_rotation is not None:
+                r = _matmul(r, origin_rotation)
+            if col is None:
+                continue
+            wx = r[0] * ax + r[1] * ay + r[2] * az
+            wy = r[3] * ax + r[4] * ay + r[5] * az
+            wz = r[6] * ax + r[7] * ay + r[8] * az
+            frames.append((prismatic, wx, wy, wz, px, py, pz))
+            value = q[col]
+            if prismatic:
+                px, py, pz = px + value * wx, py + value * wy, pz + value * wz
+            else:
+                # Rodrigues' rotation of the joint about its local axis
+                s, c = math.sin(value), math.cos(value)
+                t = 1.0 - c
+                r = _matmul(
+                    r,
+                    (
+                        c + t * ax * ax, t * ax * ay - s * az, t * ax * az + s * ay,
+                        t * ax * ay + s * az, c + t * ay * ay, t * ay * az - s * ax,
+                        t * ax * az - s * ay, t * ay * az + s * ax, c + t * az * az,
+                    ),
+                )  # fmt: skip
+        (tx, ty, tz), ee_rotation = self._float_ee_offset
+        px += r[0] * tx + r[1] * ty + r[2] * tz
+        py += r[3] * tx + r[4] * ty + r[5] * tz
+        pz += r[6] * tx + r[7] * ty + r[8] * tz
+        columns = []
+        for prismatic, wx, wy, wz, ox, oy, oz in frames:
+            if prismatic:
+                columns.append((wx, wy, wz, 0.0, 0.0, 0.0))
+            else:
+                dx, dy, dz = px - ox, py - oy, pz - oz
+                columns.append((wy * dz - wz * dy, wz * dx - wx * dz, wx * dy - wy * dx, wx, wy, wz))
+        self._jac[:, self._frame_columns] = np.array(columns).T
+        return self._jac, np.array((px, py, pz)), _matmul(r, ee_rotation)
+
+    def _target_rotation(self, orientation: Optional[np.ndarray]) -> Optional[np.ndarray]:
+        if orientation is None:
+            return None
+        orientation = np.asarray(orientation, dtype=float)
+        if orientation.ndim > 1:
+            return quaternion_to_matrix(orientation)
+        key = orientation.tobytes()
+        rotation = self._target_rotations.get(key)
+        if rotation is None:
+            rotation = self._target_rotations[key] = quaternion_to_matrix(orientation)
+        return rotation
+
+    def forward_kinematics(self, q: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Compute the end-effector pose.
+
+        Args:
+            q (np.ndarray): Joint configuration(s), as (..., n_joints).
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: The positions (..., 3) and the rotation matrices (..., 3, 3).
+        """
+        position, rotation, _ = self._frames(np.asarray(q, dtype=float))
+        return position, rotation
+
+    def jacobian(self, q: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Compute the geometric jacobian of the end-effector.
+
+        Args:
+            q (np.ndarray): Joint configuration(s), as (..., n_joints).
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray, np.ndarray]: The jacobians (..., 6, n_joints), linear rows first, and the
+                end-effector positions (..., 3) and rotations (..., 3, 3).
+        """
+        q = np.asarray(q, dtype=float)
+        position, rotation, joint_frames = self._frames(q)
+        columns = [col for col, _, _, _ in joint_frames]
+        revolute = np.array([joint_type != "prismatic" for _, joint_type, _, _ in joint_frames])
+        axes = np.stack([axis for _, _, axis, _ in joint_frames], axis=-2)  # (..., n, 3)
+        origins = np.stack([origin for _, _, _, origin in joint_frames], axis=-2)
+        linear = np.where(revolute[:, None], _cross(axes, position[..., None, :] - origins), axes)
+        jac = np.zeros(q.shape[:-1] + (6, self.n_joints))
+        jac[..., :3, columns] = np.swapaxes(linear, -1, -2)
+        jac[..., 3:, columns] = np.swapaxes(axes * revolute[:, None], -1, -2)
+        return jac, position, rotation
+
+    def inverse_kinematics(
+        self,
+        position: np.ndarray,
+        q0: np.ndarray,
+        orientation: Optional[np.ndarray] = None,
+        orientation_weight: float = 0.1,
+        damping: float = 0.05,
+        max_iterations: int = 20,
+        tolerance: float = 1e-4,
+    ) -> np.ndarray:
+        """Damped least squares inverse kinematics.
+
+        Args:
+            position (np.ndarray): Target position(s) of the end-effector, as (..., 3).
+            q0 (np.ndarray): Initial configuration(s), usually the current one, as (..., n_joints).
+            orientation (np.ndarray, optional): Target orientation(s), as quaternion (x, y, z, w). If None, only the
+                position is solved for. Defaults to None.
+            orientation_weight (float, optional): Weight of the orientation error against the position error.
+                Defaults to 0.1.
+            damping (float, optional): Damping factor. Defaults to 0.05.
+            max_iterations (int, optional): Maximum number of iterations. Defaults to 20.
+            tolerance (float, optional): Stop when every error norm, or every joint update, is below this value.
+                Defaults to 1e-4.
+
+        Returns:
+            np.ndarray: The joint configuration(s), within the joint limits, as (..., n_joints).
+        """
+        q = np.array(q0, dtype=float)
+        position = np.asarray(position, dtype=float)
+        target_rotation = self._target_rotation(orientation)
+        if q.ndim == 1 and position.ndim == 1 and (target_rotation is None or target_rotation.ndim == 2):
+            return self._inverse_kinematics_single(
+                position, q, target_rotation, orientation_weight, damping, max_iterations, tolerance
+            )
+        n_rows = 3 if target_rotation is None else 6
+        eye = np.eye(n_rows) * damping**2
+        for _ in range(max_iterations):
+            jac, ee_position, rotation = self.jacobian(q)
+            error = position - ee_position
+            if target_rotation is not None:
+                # orientation error as half the sum of the cross products of the frame axes
+                rotation_error = 0.5 * _cross(
+                    np.swapaxes(rotation, -1, -2), np.swapaxes(target_rotation, -1, -2)
+                ).sum(axis=-2)
+                error = np.concatenate([error, orientation_weight * rotation_error], axis=-1)
+                jac = np.concatenate([jac[..., :3, :], orientation_weight * jac[..., 3:, :]], axis=-2)
+            else:
+                jac = jac[..., :3, :]
+            if np.all(np.linalg.norm(error, axis=-1) < tolerance):
+                break
+            jac_t = np.swapaxes(jac, -1, -2)
+            step = (jac_t @ np.linalg.solve(jac @ jac_t + eye, error[..., None]))[..., 0]
+            q = np.clip(q + step, self.lower, self.upper)
+            # the pose may not be reachable exactly; stop as well once the solution does not move anymore
+            if np.all(np.abs(step) < tolerance):
+                break
+        return q
+
+    def _inverse_kinematics_single(
+        self,
+        position: np.ndarray,
+        q: np.ndarray,
+        target_rotation: Optional[np.ndarray],
+        orientation_weight: float,
+        damping: float,
+        max_iterations: int,
+        tolerance: float,
+    ) -> np.ndarray:
+        """`inverse_kinematics` of a single configuration, on the preallocated jacobian buffers."""
+        n_rows = 3 if target_rotation is None else 6
+        eye = np.eye(n_rows) * damping**2
+        weighted_jac = self._weighted_jac[:n_rows]
+        tx, ty, tz = position.tolist()
+        if target_rotation is not None:
+            t = target_rotation.ravel().tolist()
+        for _ in range(max_iterations):
+            jac, ee_position, r = self._jacobian_single(q)
+            ex, ey, ez = tx - ee_position[0], ty - ee_position[1], tz - ee_position[2]
+            weighted_jac[:3] = jac[:3]
+            if target_rotation is None:
+                error = (ex, ey, ez)
+            else:
+                # orientation error as half the sum of the cross products of the columns of the rotations
+                scale = 0.5 * orientation_weight
+                error = (
+                    ex, ey, ez,
+                    scale * (r[3] * t[6] - r[6] * t[3] + r[4] * t[7] - r[7] * t[4] + r[5] * t[8] - r[8] * t[5]),
+                    scale * (r[6] * t[0] - r[0] * t[6] + r[7] * t[1] - r[1] * t[7] + r[8] * t[2] - r[2] * t[8]),
+                    scale * (r[0] * t[3] - r[3] * t[0] + r[1] * t[4] - r[4] * t[1] + r[2] * t[5] - r[5] * t[2]),
+                )  # fmt: skip
+                np.multiply(jac[3:], orientation_weight, out=weighted_jac[3:])
+            if math.sqrt(math.fsum(e * e for e in error)) < tolerance:
+                break
+            jac_t = weighted_jac.T
+            step = jac_t @ np.linalg.solve(weighted_jac @ jac_t + eye, error)
+            q = np.clip(q + step, self.lower, self.upper)
+            # the pose may not be reachable exactly; stop as well once the solution does not move anymore
+            if np.all(np.abs(step) < tolerance):
+                break
+        return q
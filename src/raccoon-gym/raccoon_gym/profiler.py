@@ -0,0 +1,109 @@
+"""Per-phase timing of the environment steps.
+
+`instrument(env)` replaces, on the instances only, the methods called by a step with timed versions. An env built
+without profiling runs the original methods, so the profiler costs nothing when it is disabled.
+
+The phases are nested: "ik" is part of "set_action", and every phase is part of "step".
+"""
+import time
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+
+PHASES = ("step", "set_action", "ik", "sim_step", "get_obs", "get_achieved_goal", "compute_reward")
+
+# log-scale histogram with 4 bins per octave of ns, up to about 1 s
+N_BINS = 31 * 4
+_bits = np.arange(N_BINS) >> 2
+_quarters = np.arange(N_BINS) & 3
+# edges of the bins, in ns: bin i covers [BIN_LOWER_NS[i], BIN_UPPER_NS[i])
+BIN_LOWER_NS = np.where(_bits >= 3, (4 + _quarters) * 2.0 ** (_bits - 3.0), 0)
+BIN_UPPER_NS = np.where(_bits >= 3, (5 + _quarters) * 2.0 ** (_bits - 3.0), 4)
+
+
+class StepProfiler:
+    """Cumulative time, call count and log-scale histogram of the durations of every phase."""
+
+    def __init__(self) -> None:
+        self.reset()
+
+    def reset(self) -> None:
+        """Clear all the records."""
+        self.total_ns: Dict[str, int] = {phase: 0 for phase in PHASES}
+        self.counts: Dict[str, int] = {phase: 0 for phase in PHASES}
+        self.histograms: Dict[str, List[int]] = {phase: [0] * N_BINS for phase in PHASES}
+
+    def record(self, phase: str, elapsed_ns: int) -> None:
+        """Record one duration of a phase.
+
+        Args:
+            phase (str): Name of the phase.
+            elapsed_ns (int): Duration, in ns.
+        """
+        self.total_ns[phase] += elapsed_ns
+        self.counts[phase] += 1
+        bits = elapsed_ns.bit_length()
+        # the octave, then the two bits after the leading one
+        index = (bits << 2) | ((elapsed_ns >> (bits - 3)) & 3) if bits >= 3 else 0
+        self.histograms[phase][min(index, N_BINS - 1)] += 1
+
+    def wrap(self, phase: str, function: Callable) -> Callable:
+        """Return `function`, timed as `phase`."""
+        record = self.record
+        perf_counter_ns = time.perf_counter_ns
+
+        def timed(*args, **kwargs) -> Any:
+            start = perf_counter_ns()
+            result = function(*args, **kwargs)
+            record(phase, perf_counter_ns() - start)
+            return result
+
+        return timed
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Statistics of every recorded phase.
+
+        Returns:
+            dict: For each phase, the number of calls, the total and mean time, the 50th and 99th percentiles (upper
+                edge of the histogram bin) and the share of the step time.
+        """
+        step_ns = self.total_ns["step"]
+        summary = {}
+        for phase in PHASES:
+            count = self.counts[phase]
+            if count == 0:
+                continue
+            cumulative = np.cumsum(self.histograms[phase])
+            p50, p99 = BIN_UPPER_NS[np.searchsorted(cumulative, [0.5 * count, 0.99 * count])] * 1e-6
+            summary[phase] = {
+                "count": count,
+                "total_s": self.total_ns[phase] * 1e-9,
+                "mean_ms": self.total_ns[phase] / count * 1e-6,
+                "p50_ms": float(p50),
+                "p99_ms": float(p99),
+                "share": self.total_ns[phase] / step_ns if step_ns else float("nan"),
+            }
+        return summary
+
+
+def instrument(env) -> StepProfiler:
+    """Time the phases of the steps of a robot task env.
+
+    Args:
+        env (RobotTaskEnv): Unwrapped environment, with `robot`, `task` and `sim` attributes.
+
+    Returns:
+        StepProfiler: The profiler recording the phases.
+    """
+    profiler = StepProfiler()
+    robot, task, sim = env.robot, env.task, env.sim
+    # instance attributes shadow the methods, the classes are untouched
+    env.step = profiler.wrap("step", env.step)
+    robot.set_action = profiler.wrap("set_action", robot.set_action)
+    if hasattr(robot, "ee_displacement_to_target_arm_angles"):
+        robot.ee_displacement_to_target_arm_angles = profiler.wrap("ik", robot.ee_displacement_to_target_arm_angles)
+    sim.step = profiler.wrap("sim_step", sim.step)
+    robot.get_obs = profiler.wrap("get_obs", robot.get_obs)
+    task.get_achieved_goal = profiler.wrap("get_achieved_goal", task.get_achieved_goal)
+    task.compute_reward = profiler.wrap("compute_reward", task.compute_reward)
+    return profiler
@@ -0,0 +1,200 @@
+"""Off-screen rendering for evaluation videos.
+
+A `Camera` computes its view and projection matrices once, and `render_frame` renders a simulation through it, at
+its resolution, without recomputing them. `VideoRecorder` encodes the frames in a background thread, so that the
+evaluation loop only pays for the rendering.
+
+Typical use, with any vectorized env whose `get_images` returns rgb frames (SB3 `VecEnv`, `VectorReachEnv`):
+
+    with VideoRecorder("eval.mp4", fps=25) as recorder:
+        for _ in range(n_steps):
+            ...
+            recorder.add_frame(tile_frames(envs.get_images()))
+"""
+import functools
+import queue
+import threading
+from dataclasses import dataclass, replace
+from typing import Any, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+@dataclass(frozen=True)
+class Camera:
+    """Pose, field of view and resolution of an off-screen camera.
+
+    Use `dataclasses.replace` to derive a camera, e.g. `replace(camera, width=240, height=160)`.
+
+    Args:
+        width (int, optional): Image width. Defaults to 720.
+        height (int, optional): Image height. Defaults to 480.
+        target_position (Tuple[float, float, float], optional): Camera targetting this postion, as (x, y, z).
+            Defaults to (0, 0, 0).
+        distance (float, optional): Distance of the camera. Defaults to 2.4.
+        yaw (float, optional): Yaw of the camera. Defaults to 45.
+        pitch (float, optional): Pitch of the camera. Defaults to -30.
+        roll (float, optional): Roll of the camera. Defaults to 0.
+        fov (float, optional): Vertical field of view, in degrees. Defaults to 60.
+        shadow (bool, optional): Whether to render the shadows. Defaults to True.
+    """
+
+    width: int = 720
+    height: int = 480
+    target_position: Tuple[float, float, float] = (0.0, 0.0, 0.0)
+    distance: float = 2.4
+    yaw: float = 45
+    pitch: float = -30
+    roll: float = 0
+    fov: float = 60
+    shadow: bool = True
+
+    def __post_init__(self) -> None:
+        # hashable, so that cameras can be compared and cached
+        object.__setattr__(self, "target_position", tuple(float(x) for x in self.target_position))
+
+    @functools.cached_property
+    def view_matrix(self) -> Tuple[float, ...]:
+        """View matrix, computed on first use."""
+        import pybullet as p
+
+        return p.computeViewMatrixFromYawPitchRoll(
+            cameraTargetPosition=self.target_position,
+            distance=self.distance,
+            yaw=self.yaw,
+            pitch=self.pitch,
+            roll=self.roll,
+            upAxisIndex=2,
+        )
+
+    @functools.cached_property
+    def projection_matrix(self) -> Tuple[float, ...]:
+        """Projection matrix, computed on first use."""
+        import pybullet as p
+
+        return p.computeProjectionMatrixFOV(fov=self.fov, aspect=self.width / self.height, nearVal=0.1, farVal=100.0)
+
+    def shifted(self, offset: Sequence[float]) -> "Camera":
+        """The same camera, targetting `target_position + offset`."""
+        return replace(self, target_position=tuple(np.add(self.target_position, offset)))
+
+
+def render_frame(sim, camera: Camera, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """Render a simulation through a camera.
+
+    Args:
+        sim (PyBullet): Simulation instance.
+        camera (Camera): The camera.
+        out (np.ndarray, optional): Buffer of shape (height, width, 3) and dtype uint8 to write the frame into.
+            Defaults to a new array.
+
+    Returns:
+        np.ndarray: The RGB frame, of shape (height, width, 3).
+    """
+    import pybullet as p
+
+    # the OpenGL renderer needs a GUI connection, DIRECT connections use the CPU renderer
+    renderer = p.ER_BULLET_HARDWARE_OPENGL if sim.connection_mode == p.GUI else p.ER_TINY_RENDERER
+    _, _, rgba, _, _ = sim.physics_client.getCameraImage(
+        width=camera.width,
+        height=camera.height,
+        viewMatrix=camera.view_matrix,
+        projectionMatrix=camera.projection_matrix,
+        shadow=camera.shadow,
+        renderer=renderer,
+    )
+    # a flat tuple when pybullet is built without numpy
+    rgba = np.asarray(rgba, dtype=np.uint8).reshape(camera.height, camera.width, 4)
+    if out is None:
+        return rgba[..., :3].copy()
+    out[...] = rgba[..., :3]
+    return out
+
+
+def tile_frames(frames: Sequence[np.ndarray], n_cols: Optional[int] = None) -> np.ndarray:
+    """Tile frames of the same shape into a grid, row by row, completed with black frames.
+
+    Args:
+        frames (Sequence[np.ndarray]): Frames, of shape (height, width, 3).
+        n_cols (int, optional): Number of columns. Defaults to the smallest square grid.
+
+    Returns:
+        np.ndarray: The grid, of shape (n_rows * height, n_cols * width, 3).
+    """
+    frames = np.asarray(frames)
+    n_frames, height, width, channels = frames.shape
+    n_cols = n_cols if n_cols is not None else int(np.ceil(np.sqrt(n_frames)))
+    n_rows = -(-n_frames // n_cols)
+    grid = np.zeros((n_rows * n_cols, height, width, channels), dtype=frames.dtype)
+    grid[:n_frames] = frames
+    return grid.reshape(n_rows, n_cols, height, width, channels).swapaxes(1, 2).reshape(n_rows * height, -1, channels)
+
+
+class VideoRecorder:
+    """Encode frames into a video file in a background thread.
+
+    `add_frame` only queues the frame: when the encoder falls behind by `max_queue` frames, it blocks until a frame
+    is encoded, so that the memory stays bounded. An error of the encoder is raised by the next call.
+
+    Args:
+        path (str): Video file, e.g. "eval.mp4".
+        fps (float, optional): Frames per second. Defaults to 25.
+        max_queue (int, optional): Maximum number of frames waiting to be encoded. Defaults to 64.
+        writer (Any, optional): Encoder, with `append_data(frame)` and `close()` methods. Defaults to an `imageio`
+            writer, which needs `pip install imageio[ffmpeg]`.
+    """
+
+    def __init__(self, path: str, fps: float = 25, max_queue: int = 64, writer: Any = None) -> None:
+        if writer is None:
+            try:
+                import imageio
+            except ImportError as error:
+                raise ImportError("VideoRecorder needs imageio: pip install imageio[ffmpeg]") from error
+            writer = imageio.get_writer(path, fps=fps, macro_block_size=1)
+        self.path = path
+        self.writer = writer
+        self.n_frames = 0
+        self._queue: "queue.Queue[Optional[np.ndarray]]" = queue.Queue(maxsize=max_queue)
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._encode, name="VideoRecorder", daemon=True)
+        self._thread.start()
+
+    def _encode(self) -> None:
+        while True:
+            frame = self._queue.get()
+            if frame is None:
+                break
+            if self._error is None:  # keep draining, so that add_frame never blocks forever
+                try:
+                    self.writer.append_data(frame)
+                except BaseException as error:
+                    self._error = error
+
+    def _raise(self) -> None:
+        if self._error is not None:
+            raise RuntimeError(f"Could not encode {self.path}") from self._error
+
+    def add_frame(self, frame: np.ndarray) -> None:
+        """Queue a frame for encoding.
+
+        Args:
+            frame (np.ndarray): RGB frame, of shape (height, width, 3). It must not be modified afterwards, copy a
+                reused buffer before adding it.
+        """
+        self._raise()
+        self._queue.put(frame)
+        self.n_frames += 1
+
+    def close(self) -> None:
+        """Encode the remaining frames, and close the file."""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+            self.writer.close()
+        self._raise()
+
+    def __enter__(self) -> "VideoRecorder":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
@@ -0,0 +1,319 @@
+"""Train from the hyperparameters of `hyperparams/<algo>.yml`, for one or several robots and seeds.
+
+The YAML follows the rl-baselines3-zoo format: one entry per env id, with the keyword arguments of the algorithm and
+the special keys `n_timesteps`, `n_envs`, `normalize` (True, or the string of a dict of `VecNormalize` arguments),
+`curriculum` (True, or the string of a dict of `raccoon_gym.curriculum.Curriculum` arguments) and `env_kwargs`. The
+`*_kwargs` values may be strings, e.g. "dict(net_arch=[64, 64])".
+
+The training envs are headless. With `n_envs` > 1, they run in a `SharedMemoryReachVecEnv`, which exchanges the
+observation dicts through shared memory, or in an SB3 `SubprocVecEnv` with `--vec-env subproc`. Checkpoints, and the
+`VecNormalize` statistics and the curriculum state, are written to `<log-dir>/models/<run>/`, where
+`python -m raccoon_gym.evaluate` reads them.
+
+Several env ids or seeds run as concurrent processes, at most `--n-jobs` at a time, each pinned to its own CPUs.
+
+With `--n-actors N`, the off-policy algorithms step the envs in N actor processes while the main process trains, see
+`raccoon_gym.actor_learner`.
+
+Usage:
+    python -m raccoon_gym.train --env-id RaccoonKr16Reach-v1
+    python -m raccoon_gym.train --env-id RaccoonKr16Reach-v1 RaccoonKr3Reach-v1 --seeds 0 1 2 --n-jobs 3
+    python -m raccoon_gym.train --env-id RaccoonKr16Reach-v1 --n-actors 4
+"""
+import argparse
+import itertools
+import logging
+import os
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import yaml
+
+from raccoon_gym.evaluate import ALGOS, algo_class
+
+logger = logging.getLogger(__name__)
+
+# backends of the envs, when n_envs > 1
+VEC_ENVS = ("shared_memory", "subproc")
+
+# names allowed in the string values of the YAML
+_NAMESPACE = {"dict": dict, "list": list, "tuple": tuple, "float": float, "int": int}
+
+
+def _parse(value: Any) -> Any:
+    if not isinstance(value, str):
+        return value
+    import torch as th
+
+    return eval(value, {"__builtins__": {}}, dict(_NAMESPACE, nn=th.nn))
+
+
+def load_hyperparams(file_name: str, env_id: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Read the hyperparameters of an env id.
+
+    Args:
+        file_name (str): YAML file, e.g. "hyperparams/tqc.yml".
+        env_id (str): Key of the entry.
+
+    Returns:
+        Tuple[dict, dict]: The keyword arguments of the algorithm, and the settings of the run: "n_timesteps",
+            "n_envs", "normalize" (False or the `VecNormalize` arguments), "curriculum" (False or the `Curriculum`
+            arguments) and "env_kwargs".
+    """
+    with open(file_name) as file:
+        entries = yaml.safe_load(file)
+    if env_id not in entries:
+        raise KeyError(f"No hyperparameters for {env_id} in {file_name}, available: {', '.join(entries)}.")
+    kwargs = dict(entries[env_id])
+    normalize = _parse(kwargs.pop("normalize", False))
+    curriculum = _parse(kwargs.pop("curriculum", False))
+    settings = {
+        "n_timesteps": int(kwargs.pop("n_timesteps")),
+        "n_envs": int(kwargs.pop("n_envs", 1)),
+        "normalize": ({} if normalize is True else normalize) if normalize else False,
+        "curriculum": ({} if curriculum is True else curriculum) if curriculum else False,
+        "env_kwargs": _parse(kwargs.pop("env_kwargs", {})),
+    }
+    for key in list(kwargs):
+        if key.endswith("_kwargs"):
+            kwargs[key] = _parse(kwargs[key])
+    if kwargs.get("replay_buffer_class") == "HerReplayBuffer":
+        from stable_baselines3 import HerReplayBuffer
+
+        kwargs["replay_buffer_class"] = HerReplayBuffer
+    elif kwargs.get("replay_buffer_class") == "CompactHerReplayBuffer":
+        from raccoon_gym.buffers import CompactHerReplayBuffer
+
+        kwargs["replay_buffer_class"] = CompactHerReplayBuffer
+    return kwargs, settings
+
+
+def run_name(env_id: str, algo: str, seed: int) -> str:
+    """Name of the directory of a run, e.g. "RaccoonKr16Reach-v1_tqc_seed0"."""
+    return f"{env_id}_{algo}_seed{seed}"
+
+
+def train(
+    env_id: str,
+    algo: str = "tqc",
+    hyperparams: Optional[str] = None,
+    seed: int = 0,
+    log_dir: str = "logs",
+    n_timesteps: Optional[int] = None,
+    checkpoint_freq: int = 10_000,
+    cpus: Optional[Sequence[int]] = None,
+    vec_env: str = "shared_memory",
+    verbose: int = 1,
+) -> str:
+    """Train one run.
+
+    Args:
+        env_id (str): Registered id, and key of the hyperparameters.
+        algo (str, optional): Algorithm, one of `ALGOS`. Defaults to "tqc".
+        hyperparams (str, optional): YAML file. Defaults to "hyperparams/<algo>.yml".
+        seed (int, optional): Seed of the model and of the envs. Defaults to 0.
+        log_dir (str, optional): Root of the checkpoints and TensorBoard logs. Defaults to "logs".
+        n_timesteps (int, optional): Overrides the number of steps of the YAML. Defaults to None.
+        checkpoint_freq (int, optional): Steps between two checkpoints, counted over all the envs. Defaults to 10000.
+        cpus (Sequence[int], optional): CPUs to pin the process, and its env subprocesses, to. Also sets the number
+            of torch threads. Defaults to all the CPUs.
+        vec_env (str, optional): Backend of the envs when `n_envs` > 1, one of `VEC_ENVS`: "shared_memory" for
+            `SharedMemoryReachVecEnv`, or "subproc" for SB3 `SubprocVecEnv`. Defaults to "shared_memory".
+        verbose (int, optional): Verbosity of the algorithm. Defaults to 1.
+
+    Returns:
+        str: Path of the final model.
+    """
+    if vec_env not in VEC_ENVS:
+        raise ValueError(f"Unknown vec_env {vec_env!r}, expected one of {VEC_ENVS}.")
+    import torch as th
+    from stable_baselines3.common.callbacks import CheckpointCallback
+    from stable_baselines3.common.env_util import make_vec_env
+    from stable_baselines3.common.vec_env import DummyVecEnv, SubprocVecEnv, VecNormalize
+
+    import raccoon_gym  # noqa: F401, registers the envs
+    from raccoon_gym.callbacks import CurriculumCallback
+    from raccoon_gym.curriculum import Curriculum
+    from raccoon_gym.envs.shared_memory_vec_env import SharedMemoryReachVecEnv
+
+    if cpus is not None:
+        os.sched_setaffinity(0, cpus)  # inherited by the env subprocesses
+        th.set_num_threads(len(cpus))
+    kwargs, settings = load_hyperparams(hyperparams or os.path.join("hyperparams", f"{algo}.yml"), env_id)
+    n_envs = settings["n_envs"]
+    env_kwargs = dict(settings["env_kwargs"], headless=True)
+    # one curriculum shared by all the envs, the subprocesses attach to its shared memory
+    curriculum = Curriculum(**settings["curriculum"]) if settings["curriculum"] is not False else None
+    if curriculum is not None:
+        env_kwargs["curriculum"] = curriculum
+    if n_envs > 1 and vec_env == "shared_memory":
+        envs = SharedMemoryReachVecEnv(env_id, n_envs=n_envs, env_kwargs=env_kwargs)
+        envs.seed(seed)  # env i is reset with seed + i, as by make_vec_env
+    else:
+        envs = make_vec_env(
+            env_id,
+            n_envs=n_envs,
+            seed=seed,
+            env_kwargs=env_kwargs,
+            vec_env_cls=SubprocVecEnv if n_envs > 1 else DummyVecEnv,
+        )
+    if settings["normalize"] is not False:
+        envs = VecNormalize(envs, gamma=kwargs.get("gamma", 0.99), **settings["normalize"])
+
+    name = run_name(env_id, algo, seed)
+    model_dir = os.path.join(log_dir, "models", name)
+    model = algo_class(algo)(
+        env=envs, seed=seed, tensorboard_log=os.path.join(log_dir, "tensorboard"), verbose=verbose, **kwargs
+    )
+    checkpoint_callback = CheckpointCallback(
+        save_freq=max(checkpoint_freq // n_envs, 1),
+        save_path=model_dir,
+        name_prefix=f"{algo}_reach",
+        save_vecnormalize=True,
+    )
+    callbacks = [checkpoint_callback]
+    if curriculum is not None:
+        callbacks.append(
+            CurriculumCallback(
+                curriculum,
+                save_freq=max(checkpoint_freq // n_envs, 1),
+                save_path=model_dir,
+                name_prefix=f"{algo}_reach",
+            )
+        )
+    model.learn(total_timesteps=n_timesteps or settings["n_timesteps"], callback=callbacks, tb_log_name=name)
+    model_path = os.path.join(model_dir, "final_model")
+    model.save(model_path)
+    if isinstance(envs, VecNormalize):
+        envs.save(os.path.join(model_dir, "vecnormalize.pkl"))
+    envs.close()
+    if curriculum is not None:
+        curriculum.save(os.path.join(model_dir, "curriculum.json"))
+        curriculum.close()
+    return model_path + ".zip"
+
+
+def cpu_slots(n_jobs: int, cpus_per_job: Optional[int] = None) -> List[List[int]]:
+    """Split the CPUs available to the process into disjoint sets, one per concurrent job.
+
+    When there are not enough CPUs, the sets wrap around and some CPUs are shared.
+
+    Args:
+        n_jobs (int): Number of concurrent jobs.
+        cpus_per_job (int, optional): CPUs per job. Defaults to an even split, at least one.
+
+    Returns:
+        List[List[int]]: The CPUs of every slot.
+    """
+    available = sorted(os.sched_getaffinity(0))
+    cpus_per_job = cpus_per_job or max(len(available) // n_jobs, 1)
+    if n_jobs * cpus_per_job > len(available):
+        logger.warning("%d jobs of %d CPUs share %d CPUs.", n_jobs, cpus_per_job, len(available))
+    return [
+        sorted({available[(i * cpus_per_job + j) % len(available)] for j in range(cpus_per_job)})
+        for i in range(n_jobs)
+    ]
+
+
+def sweep(
+    env_ids: List[str],
+    seeds: List[int],
+    n_jobs: int,
+    cpus_per_job: Optional[int] = None,
+    log_dir: str = "logs",
+    algo: str = "tqc",
+    args: Sequence[str] = (),
+) -> Dict[str, int]:
+    """Train every (env id, seed) pair, in subprocesses pinned to disjoint CPUs.
+
+    The output of every run is written to `<log_dir>/<run>.log`.
+
+    Args:
+        env_ids (List[str]): Env ids.
+        seeds (List[int]): Seeds.
+        n_jobs (int): Number of concurrent runs.
+        cpus_per_job (int, optional): CPUs per run. Defaults to an even split.
+        log_dir (str, optional): Root of the logs. Defaults to "logs".
+        algo (str, optional): Algorithm, one of `ALGOS`. Defaults to "tqc".
+        args (Sequence[str], optional): Other arguments of the command line, passed to every run.
+
+    Returns:
+        Dict[str, int]: Return code of every run.
+    """
+    jobs = list(itertools.product(env_ids, seeds))
+    free_slots = cpu_slots(min(n_jobs, len(jobs)), cpus_per_job)
+    os.makedirs(log_dir, exist_ok=True)
+    running: Dict[str, Tuple[subprocess.Popen, List[int], Any]] = {}
+    return_codes = {}
+    while jobs or running:
+        while jobs and free_slots:
+            (env_id, seed), cpus = jobs.pop(0), free_slots.pop(0)
+            name = run_name(env_id, algo, seed)
+            log_file = open(os.path.join(log_dir, f"{name}.log"), "w")
+            command = [sys.executable, "-m", "raccoon_gym.train", "--env-id", env_id, "--seeds", str(seed)]
+            command += ["--algo", algo, "--cpus", ",".join(map(str, cpus)), "--log-dir", log_dir, *args]
+            running[name] = (subprocess.Popen(command, stdout=log_file, stderr=subprocess.STDOUT), cpus, log_file)
+            print(f"{name}: started on CPUs {cpus}")
+        time.sleep(1.0)
+        for name, (process, cpus, log_file) in list(running.items()):
+            if process.poll() is not None:
+                log_file.close()
+                free_slots.append(cpus)
+                return_codes[name] = process.returncode
+                del running[name]
+                print(f"{name}: {'done' if process.returncode == 0 else f'failed ({process.returncode})'}")
+    return return_codes
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--env-id", nargs="+", required=True)
+    parser.add_argument("--algo", choices=ALGOS, default="tqc")
+    parser.add_argument("--hyperparams", default=None, help="Defaults to hyperparams/<algo>.yml.")
+    parser.add_argument("--seeds", type=int, nargs="+", default=[0])
+    parser.add_argument("--log-dir", default="logs")
+    parser.add_argument("--n-timesteps", type=int, default=None, help="Overrides the YAML.")
+    parser.add_argument("--checkpoint-freq", type=int, default=10_000)
+    parser.add_argument("--n-jobs", type=int, default=1, help="Concurrent runs, when there are several.")
+    parser.add_argument("--cpus-per-job", type=int, default=None, help="Defaults to an even split of the CPUs.")
+    parser.add_argument("--cpus", default=None, help="Comma separated CPUs to pin a single run to.")
+    parser.add_argument("--n-actors", type=int, default=0, help="Asynchronous actor processes, 0 to step in the loop.")
+    parser.add_argument("--vec-env", choices=VEC_ENVS, default="shared_memory", help="Backend of the envs.")
+    args = parser.parse_args()
+
+    if len(args.env_id) * len(args.seeds) == 1:
+        run_kwargs = dict(
+            algo=args.algo,
+            hyperparams=args.hyperparams,
+            seed=args.seeds[0],
+            log_dir=args.log_dir,
+            n_timesteps=args.n_timesteps,
+            checkpoint_freq=args.checkpoint_freq,
+            cpus=[int(cpu) for cpu in args.cpus.split(",")] if args.cpus else None,
+        )
+        if args.n_actors > 0:
+            from raccoon_gym.actor_learner import train_async
+
+            model_path = train_async(args.env_id[0], n_actors=args.n_actors, **run_kwargs)
+        else:
+            model_path = train(args.env_id[0], vec_env=args.vec_env, **run_kwargs)
+        print(f"Model saved to {model_path}")
+        return
+
+    forwarded = ["--checkpoint-freq", str(args.checkpoint_freq), "--n-actors", str(args.n_actors)]
+    forwarded += ["--vec-env", args.vec_env]
+    if args.hyperparams is not None:
+        forwarded += ["--hyperparams", args.hyperparams]
+    if args.n_timesteps is not None:
+        forwarded += ["--n-timesteps", str(args.n_timesteps)]
+    return_codes = sweep(
+        args.env_id, args.seeds, args.n_jobs, args.cpus_per_job, log_dir=args.log_dir, algo=args.algo, args=forwarded
+    )
+    if any(return_codes.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+"""On-disk cache of preprocessed URDF models.
+
+Loading a URDF in PyBullet is dominated by the parsing of the COLLADA (.dae) visual meshes. The first time a URDF
+is loaded, every mesh it references is converted once:
+
+- visual COLLADA meshes are flattened to one Wavefront (.obj) file per material, with the node transforms applied
+  and the diffuse color moved to the URDF `<material>`;
+- collision meshes are replaced by their convex hull, which is what PyBullet uses for them anyway.
+
+The converted model is stored under `RACCOON_GYM_CACHE_DIR` (default `~/.cache/raccoon_gym/urdf`), keyed by the
+path of the URDF and the hashes of the URDF and of every mesh file. Changing any of them creates a new entry.
+
+The collision-only variant, used by headless simulations, has no `<visual>` element at all, so that neither the
+conversion nor the loading of the visual meshes is ever done. It is stored in its own entry.
+"""
+import hashlib
+import logging
+import os
+import re
+import shutil
+import tempfile
+import time
+import xml.etree.ElementTree as ET
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = os.environ.get(
+    "RACCOON_GYM_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "raccoon_gym", "urdf")
+)
+
+_COLLADA_NS = "{http://www.collada.org/2005/11/COLLADASchema}"
+
+
+def resolve_mesh_path(urdf_file_name: str, filename: str) -> str:
+    """Resolve a mesh filename of a URDF, either "package://<package>/<path>" or relative to the URDF.
+
+    The package directory is searched in the parents of the URDF directory.
+    """
+    urdf_dir = os.path.dirname(os.path.abspath(urdf_file_name))
+    if not filename.startswith("package://"):
+        return os.path.normpath(os.path.join(urdf_dir, filename))
+    package, _, relative_path = filename[len("package://") :].partition("/")
+    directory = urdf_dir
+    while True:
+        if os.path.basename(directory) == package:
+            return os.path.join(directory, relative_path)
+        candidate = os.path.join(directory, package)
+        if os.path.isdir(candidate):
+            return os.path.join(candidate, relative_path)
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            return os.path.join(urdf_dir, package, relative_path)
+        directory = parent
+
+
+def _file_hash(file_name: str) -> str:
+    with open(file_name, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def _cache_key(file_name: str, mesh_files: List[str]) -> str:
+    digest = hashlib.sha1(os.path.abspath(file_name).encode())
+    digest.update(_file_hash(file_name).encode())
+    for mesh_file in sorted(set(mesh_files)):
+        digest.update(mesh_file.encode())
+        digest.update(_file_hash(mesh_file).encode() if os.path.exists(mesh_file) else b"missing")
+    return digest.hexdigest()[:16]
+
+
+def _write_obj(file_name: str, vertices: np.ndarray, faces: np.ndarray) -> None:
+    with open(file_name, "w") as f:
+        f.write("".join("v %.6f %.6f %.6f\n" % tuple(vertex) for vertex in vertices))
+        f.write("".join("f %d %d %d\n" % tuple(face) for face in faces + 1))
+
+
+def _read_stl(file_name: str) -> np.ndarray:
+    """Vertices of a binary or ascii STL file, as (n, 3)."""
+    with open(file_name, "rb") as f:
+        data = f.read()
+    n_triangles = int(np.frombuffer(data[80:84], dtype="<u4")[0]) if len(data) >= 84 else 0
+    if len(data) == 84 + 50 * n_triangles:
+        dtype = np.dtype([("normal", "<f4", 3), ("vertices", "<f4", (3, 3)), ("attribute", "<u2")])
+        return np.frombuffer(data, dtype=dtype, offset=84)["vertices"].reshape(-1, 3).astype(float)
+    return np.array(re.findall(rb"vertex\s+(\S+)\s+(\S+)\s+(\S+)", data), dtype=float)
+
+
+def _convex_hull(file_name: str, out_file_name: str) -> None:
+    from scipy.spatial import ConvexHull
+
+    vertices = _read_stl(file_name)
+    hull = ConvexHull(vertices)
+    index = np.full(len(vertices), -1)
+    index[hull.vertices] = np.arange(len(hull.vertices))
+    _write_obj(out_file_name, vertices[hull.vertices], index[hull.simplices])
+
+
+def _node_transform(node: ET.Element) -> np.ndarray:
+    transform = np.eye(4)
+    for element in node:
+        tag = element.tag.replace(_COLLADA_NS, "")
+        values = [float(v) for v in element.text.split()] if element.text else []
+        if tag == "matrix":
+            transform = transform @ np.array(values).reshape(4, 4)
+        elif tag == "translate":
+            step = np.eye(4)
+            step[:3, 3] = values
+            transform = transform @ step
+        elif tag == "scale":
+            transform = transform @ np.diag(values + [1.0])
+        elif tag == "rotate":
+            axis, angle = np.array(values[:3]), np.radians(values[3])
+            axis = axis / np.linalg.norm(axis)
+            skew = np.array([[0, -axis[2], axis[1]], [axis[2], 0, -axis[0]], [-axis[1], axis[0], 0]])
+            step = np.eye(4)
+            step[:3, :3] += np.sin(angle) * skew + (1 - np.cos(angle)) * skew @ skew
+            transform = transform @ step
+    return transform
+
+
+def _read_collada(file_name: str) -> Dict[Tuple[float, ...], Tuple[np.ndarray, np.ndarray]]:
+    """Triangles of a COLLADA file grouped by diffuse color, with the scene transforms applied.
+
+    Returns:
+        Dict[Tuple[float, ...], Tuple[np.ndarray, np.ndarray]]: For every rgba color, the vertices (n, 3) and the
+            faces (m, 3).
+    """
+    root = ET.parse(file_name).getroot()
+    ns = _COLLADA_NS
+    by_id = {element.get("id"): element for element in root.iter() if element.get("id") is not None}
+    unit = root.find(f"{ns}asset/{ns}unit")
+    scale = float(unit.get("meter", 1.0)) if unit is not None else 1.0
+
+    def color_of(material_id: Optional[str]) -> Tuple[float, ...]:
+        material = by_id.get((material_id or "").lstrip("#"))
+        effect_ref = material.find(f"{ns}instance_effect") if material is not None else None
+        effect = by_id.get(effect_ref.get("url").lstrip("#")) if effect_ref is not None else None
+        color = effect.find(f".//{ns}diffuse/{ns}color") if effect is not None else None
+        if color is None:
+            return (0.8, 0.8, 0.8, 1.0)
+        return tuple(float(v) for v in color.text.split())
+
+    groups: Dict[Tuple[float, ...], List[np.ndarray]] = {}
+
+    def add_geometry(geometry: ET.Element, transform: np.ndarray, materials: Dict[str, str]) -> None:
+        mesh = geometry.find(f"{ns}mesh")
+        if mesh is None:
+            return
+        for primitive in mesh:
+            tag = primitive.tag.replace(ns, "")
+            if tag not in ("triangles", "polylist"):
+                continue
+            inputs = primitive.findall(f"{ns}input")
+            stride = max(int(i.get("offset", 0)) for i in inputs) + 1
+            vertex_input = next(i for i in inputs if i.get("semantic") == "VERTEX")
+            vertices_element = by_id[vertex_input.get("source").lstrip("#")]
+            position_input = next(i for i in vertices_element.findall(f"{ns}input") if i.get("semantic") == "POSITION")
+            source = by_id[position_input.get("source").lstrip("#")]
+            positions = np.array(source.find(f"{ns}float_array").text.split(), dtype=float).reshape(-1, 3)
+            indices = np.array(primitive.find(f"{ns}p").text.split(), dtype=int)
+            indices = indices.reshape(-1, stride)[:, int(vertex_input.get("offset", 0))]
+            if tag == "polylist":
+                vcount = np.array(primitive.find(f"{ns}vcount").text.split(), dtype=int)
+                starts = np.concatenate([[0], np.cumsum(vcount)[:-1]])
+                triangles = [
+                    (indices[start], indices[start + k], indices[start + k + 1])
+                    for start, count in zip(starts, vcount)
+                    for k in range(1, count - 1)
+                ]
+                indices = np.array(triangles, dtype=int).reshape(-1)
+            points = positions[indices] @ transform[:3, :3].T + transform[:3, 3]
+            color = color_of(materials.get(primitive.get("material"), primitive.get("material")))
+            groups.setdefault(color, []).append(points * scale)
+
+    def visit(node: ET.Element, transform: np.ndarray) -> None:
+        transform = transform @ _node_transform(node)
+        for instance in node.findall(f"{ns}instance_geometry"):
+            materials = {m.get("symbol"): m.get("target") for m in instance.iter(f"{ns}instance_material")}
+            add_geometry(by_id[instance.get("url").lstrip("#")], transform, materials)
+        for instance in node.findall(f"{ns}instance_node"):
+            visit(by_id[instance.get("url").lstrip("#")], transform)
+        for child in node.findall(f"{ns}node"):
+            visit(child, transform)
+
+    scene_ref = root.find(f"{ns}scene/{ns}instance_visual_scene")
+    scene = by_id[scene_ref.get("url").lstrip("#")]
+    for node in scene.findall(f"{ns}node"):
+        visit(node, np.eye(4))
+
+    result = {}
+    for color, chunks in groups.items():
+        points = np.concatenate(chunks)
+        vertices, faces = np.unique(points.round(7), axis=0, return_inverse=True)
+        result[color] = (vertices, faces.reshape(-1, 3))
+    return result
+
+
+def _build(file_name: str, directory: str, visual_shapes: bool = True) -> str:
+    """Write the preprocessed copy of the URDF and its meshes in `directory`."""
+    tree = ET.parse(file_name)
+    n_meshes = 0
+    for link in tree.getroot().findall("link"):
+        if not visual_shapes:
+            for element in link.findall("visual"):
+                link.remove(element)
+        for kind in ("visual", "collision"):
+            for element in link.findall(kind):
+                mesh = element.find("geometry/mesh")
+                if mesh is None:
+                    continue
+                path = resolve_mesh_path(file_name, mesh.get("filename"))
+                if not os.path.exists(path):
+                    if kind == "visual":
+                        logger.warning("Visual mesh %s of %s not found, skipped.", path, file_name)
+                        link.remove(element)
+                    continue
+                mesh.set("filename", path)
+                extension = os.path.splitext(path)[1].lower()
+                out_name = os.path.join(directory, f"mesh_{n_meshes}")
+                n_meshes += 1
+                try:
+                    if kind == "collision" and extension == ".stl":
+                        _convex_hull(path, out_name + ".obj")
+                        mesh.set("filename", out_name + ".obj")
+                    elif kind == "visual" and extension == ".dae":
+                        groups = _read_collada(path)
+                        position = list(link).index(element)
+                        link.remove(element)
+                        for i, (color, (vertices, faces)) in enumerate(groups.items()):
+                            _write_obj(f"{out_name}_{i}.obj", vertices, faces)
+                            visual = ET.fromstring(ET.tostring(element))
+                            visual.find("geometry/mesh").set("filename", f"{out_name}_{i}.obj")
+                            for material in visual.findall("material"):
+                                visual.remove(material)
+                            ET.SubElement(visual, "material", name=f"mesh_{n_meshes}_{i}").append(
+                                ET.Element("color", rgba=" ".join(str(c) for c in color))
+                            )
+                            link.insert(position + i, visual)
+                except Exception:  # keep the original mesh, PyBullet can load it
+                    logger.warning("Could not preprocess %s, the original mesh is used.", path, exc_info=True)
+    out_file_name = os.path.join(directory, "model.urdf")
+    tree.write(out_file_name)
+    return out_file_name
+
+
+def cached_urdf(file_name: str, cache_dir: Optional[str] = None, visual_shapes: bool = True) -> Tuple[str, bool]:
+    """Return the path of the preprocessed copy of a URDF, building it if needed.
+
+    Args:
+        file_name (str): Path of the URDF file.
+        cache_dir (str, optional): Cache directory. Defaults to `CACHE_DIR`.
+        visual_shapes (bool, optional): Whether to keep the visual shapes. If False, return the collision-only
+            variant. Defaults to True.
+
+    Returns:
+        Tuple[str, bool]: The path of the cached URDF, and whether it was already in the cache.
+    """
+    cache_dir = cache_dir if cache_dir is not None else CACHE_DIR
+    meshes = [element.get("filename") for element in ET.parse(file_name).getroot().iter("mesh")]
+    mesh_files = [resolve_mesh_path(file_name, mesh) for mesh in meshes]
+    directory = os.path.join(cache_dir, _cache_key(file_name, mesh_files) + ("" if visual_shapes else "-collision"))
+    out_file_name = os.path.join(directory, "model.urdf")
+    if os.path.exists(out_file_name):
+        return out_file_name, True
+
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_directory = tempfile.mkdtemp(dir=cache_dir)
+    try:
+        _build(file_name, tmp_directory, visual_shapes=visual_shapes)
+        # mesh paths point into the final directory
+        with open(os.path.join(tmp_directory, "model.urdf")) as f:
+            content = f.read().replace(tmp_directory, directory)
+        with open(os.path.join(tmp_directory, "model.urdf"), "w") as f:
+            f.write(content)
+        os.rename(tmp_directory, directory)
+    except OSError:
+        # another process built the same entry concurrently
+        shutil.rmtree(tmp_directory, ignore_errors=True)
+        if not os.path.exists(out_file_name):
+            raise
+    return out_file_name, False
+
+
+def load_urdf(
+    sim, body_name: str, file_name: str, use_cache: bool = True, visual_shapes: Optional[bool] = None, **kwargs
+) -> None:
+    """Load a URDF in the simulation, through the cache, and log the load time.
+
+    Args:
+        sim (PyBullet): Simulation instance.
+        body_name (str): Name of the body in the simulation.
+        file_name (str): Path of the URDF file.
+        use_cache (bool, optional): Whether to load the preprocessed copy. Defaults to True.
+        visual_shapes (bool, optional): Whether to load the visual shapes. Defaults to the `visual_shapes`
+            attribute of the simulation, False for `HeadlessPyBullet`, and True otherwise.
+        **kwargs: Forwarded to `loadURDF`.
+    """
+    start = time.perf_counter()
+    visual_shapes = visual_shapes if visual_shapes is not None else getattr(sim, "visual_shapes", True)
+    status = "uncached"
+    if use_cache:
+        file_name, warm = cached_urdf(file_name, visual_shapes=visual_shapes)
+        status = "warm" if warm else "cold"
+    if not visual_shapes:
+        import pybullet as p
+
+        kwargs["flags"] = kwargs.get("flags", 0) | p.URDF_IGNORE_VISUAL_SHAPES
+    sim.loadURDF(body_name=body_name, fileName=file_name, **kwargs)
+    logger.info("Loaded %s (%s cache) in %.3f s", body_name, status, time.perf_counter() - start)
@@ -0,0 +1,83 @@
+from typing import Union
+
+import numpy as np
+
+
+def distance(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Compute the distance between a and b.
+
+    Works on single points as well as on batches of shape (N, 3). Unlike `panda_gym.utils.distance`, the
+    computation keeps the dtype of the inputs, so float32 goals sampled from a replay buffer are never upcast.
+
+    Args:
+        a (np.ndarray): First point(s), as (..., 3).
+        b (np.ndarray): Second point(s), as (..., 3).
+
+    Returns:
+        np.ndarray: The distance(s) between the points, as (...,).
+    """
+    diff = np.subtract(a, b)
+    return np.sqrt(np.einsum("...i,...i->...", diff, diff))
+
+
+def reach_success(
+    achieved_goal: np.ndarray, desired_goal: np.ndarray, distance_threshold: float
+) -> Union[np.ndarray, bool]:
+    """Whether the achieved goal(s) lie within `distance_threshold` of the desired goal(s).
+
+    Args:
+        achieved_goal (np.ndarray): Achieved goal(s), as (..., 3).
+        desired_goal (np.ndarray): Desired goal(s), as (..., 3).
+        distance_threshold (float): Success radius.
+
+    Returns:
+        np.ndarray: Boolean success flag(s), as (...,).
+    """
+    return success_from_distance(distance(achieved_goal, desired_goal), distance_threshold)
+
+
+def reach_reward(
+    achieved_goal: np.ndarray, desired_goal: np.ndarray, distance_threshold: float, reward_type: str = "sparse"
+) -> np.ndarray:
+    """Reward of the reach tasks, batched over the leading dimensions.
+
+    Args:
+        achieved_goal (np.ndarray): Achieved goal(s), as (..., 3).
+        desired_goal (np.ndarray): Desired goal(s), as (..., 3).
+        distance_threshold (float): Success radius, only used by the sparse reward.
+        reward_type (str, optional): "sparse" or "dense". Defaults to "sparse".
+
+    Returns:
+        np.ndarray: The float32 reward(s), as (...,).
+    """
+    return reward_from_distance(distance(achieved_goal, desired_goal), distance_threshold, reward_type)
+
+
+def success_from_distance(d: np.ndarray, distance_threshold: float) -> np.ndarray:
+    """Success flag(s) of `reach_success`, from distance(s) already computed.
+
+    Args:
+        d (np.ndarray): Distance(s) to the desired goal(s), as (...,).
+        distance_threshold (float): Success radius.
+
+    Returns:
+        np.ndarray: Boolean success flag(s), as (...,).
+    """
+    return np.asarray(d < distance_threshold)
+
+
+def reward_from_distance(d: np.ndarray, distance_threshold: float, reward_type: str = "sparse") -> np.ndarray:
+    """Reward(s) of `reach_reward`, from distance(s) already computed.
+
+    Args:
+        d (np.ndarray): Distance(s) to the desired goal(s), as (...,).
+        distance_threshold (float): Success radius, only used by the sparse reward.
+        reward_type (str, optional): "sparse" or "dense". Defaults to "sparse".
+
+    Returns:
+        np.ndarray: The float32 reward(s), as (...,).
+    """
+    if reward_type == "sparse":
+        return np.where(d > distance_threshold, np.float32(-1.0), np.float32(0.0))
+    else:
+        return np.negative(d, dtype=np.float32)
@@ -0,0 +1,222 @@
+"""Reachable workspace of the robots, to sample reach goals the end-effector can actually reach.
+
+The workspace is a voxel grid, in the frame of the robot base: the forward kinematics of `KinematicChain` is
+evaluated on uniform samples of the joint space, within the joint limits, and every voxel that contains an
+end-effector position is reachable. The one voxel holes the sampling leaves in sparsely covered regions are closed.
+Self-collisions and the ground are not taken into account.
+
+Computing the grid of a robot takes a few seconds, so it is stored under `RACCOON_GYM_WORKSPACE_DIR` (default
+`~/.cache/raccoon_gym/workspace`), keyed by the hash of the URDF, the chain and the sampling parameters.
+"""
+import functools
+import hashlib
+import logging
+import os
+import time
+from typing import Optional, Tuple
+
+import numpy as np
+from scipy import ndimage
+
+from raccoon_gym.envs.specs import RobotSpec
+from raccoon_gym.kinematics import KinematicChain
+
+logger = logging.getLogger(__name__)
+
+# changes the cache key when the computation of the grid changes
+_VERSION = 1
+
+CACHE_DIR = os.environ.get(
+    "RACCOON_GYM_WORKSPACE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "raccoon_gym", "workspace")
+)
+
+
+class ReachableWorkspace:
+    """Set of reachable voxels, sampled uniformly.
+
+    Args:
+        low (np.ndarray): Corner of the first voxel, as (x, y, z).
+        voxel_size (float): Side of the voxels, in m.
+        occupied (np.ndarray): Boolean grid, as (nx, ny, nz), True for the reachable voxels.
+        bounds (Tuple[np.ndarray, np.ndarray], optional): Box the samples are drawn in, see `restrict`. Defaults to
+            None.
+    """
+
+    def __init__(
+        self,
+        low: np.ndarray,
+        voxel_size: float,
+        occupied: np.ndarray,
+        bounds: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+    ) -> None:
+        self.low = np.asarray(low, dtype=float)
+        self.voxel_size = float(voxel_size)
+        self.occupied = np.asarray(occupied, dtype=bool)
+        self.bounds = bounds
+        # corners of the reachable voxels, so that sampling is one random index and one uniform offset
+        self._corners = self.low + np.argwhere(self.occupied) * self.voxel_size
+        if len(self._corners) == 0:
+            raise ValueError("The workspace has no reachable voxel.")
+        self._cdf: Optional[np.ndarray] = None
+        if bounds is not None:
+            # the part of every voxel inside the box, drawn with a probability proportional to its volume
+            self._lows = np.maximum(self._corners, bounds[0])
+            self._highs = np.minimum(self._corners + self.voxel_size, bounds[1])
+            volumes = np.prod(np.maximum(self._highs - self._lows, 0.0), axis=-1)
+            self._volume = float(volumes.sum())
+            self._cdf = np.cumsum(volumes) / self._volume
+
+    @property
+    def n_voxels(self) -> int:
+        """Number of reachable voxels."""
+        return len(self._corners)
+
+    @property
+    def volume(self) -> float:
+        """Volume of the reachable voxels, within the bounds, in m^3."""
+        if self._cdf is not None:
+            return self._volume
+        return self.n_voxels * self.voxel_size**3
+
+    @classmethod
+    def from_kinematics(
+        cls,
+        chain: KinematicChain,
+        voxel_size: float = 0.05,
+        n_samples: int = 2_000_000,
+        seed: int = 0,
+        batch_size: int = 100_000,
+    ) -> "ReachableWorkspace":
+        """Compute the workspace of a kinematic chain.
+
+        Args:
+            chain (KinematicChain): Chain of the robot, with its base at the origin.
+            voxel_size (float, optional): Side of the voxels, in m. Defaults to 0.05.
+            n_samples (int, optional): Number of joint configurations. Defaults to 2000000.
+            seed (int, optional): Seed of the configurations. Defaults to 0.
+            batch_size (int, optional): Configurations per forward kinematics call. Defaults to 100000.
+
+        Returns:
+            ReachableWorkspace: The workspace.
+        """
+        rng = np.random.default_rng(seed)
+        # unlimited joints turn at most once
+        lower, upper = np.maximum(chain.lower, -np.pi), np.minimum(chain.upper, np.pi)
+        positions = []
+        for start in range(0, n_samples, batch_size):
+            q = rng.uniform(lower, upper, size=(min(batch_size, n_samples - start), chain.n_joints))
+            positions.append(chain.forward_kinematics(q)[0])
+        voxels = np.floor(np.concatenate(positions) / voxel_size).astype(np.int64)
+        first = voxels.min(axis=0)
+        # one empty voxel of margin, so that the closing does not erode the border
+        occupied = np.zeros(voxels.max(axis=0) - first + 3, dtype=bool)
+        occupied[tuple((voxels - first + 1).T)] = True
+        occupied = ndimage.binary_closing(occupied, structure=np.ones((3, 3, 3), dtype=bool))
+        return cls((first - 1) * voxel_size, voxel_size, occupied)
+
+    def contains(self, points: np.ndarray) -> np.ndarray:
+        """Whether points lie in reachable voxels.
+
+        Args:
+            points (np.ndarray): Positions, as (..., 3).
+
+        Returns:
+            np.ndarray: Boolean flags, as (...,).
+        """
+        index = np.floor((np.asarray(points) - self.low) / self.voxel_size).astype(np.int64)
+        inside = np.all((index >= 0) & (index < self.occupied.shape), axis=-1)
+        result = np.zeros(inside.shape, dtype=bool)
+        result[inside] = self.occupied[tuple(index[inside].T)]
+        return result
+
+    def restrict(self, low: np.ndarray, high: np.ndarray) -> "ReachableWorkspace":
+        """Keep the voxels that overlap a box, and draw the samples in their part inside the box.
+
+        A box smaller than a voxel, e.g. the first levels of a curriculum, keeps the voxels it overlaps.
+
+        Args:
+            low (np.ndarray): Lower corner of the box, as (x, y, z).
+            high (np.ndarray): Upper corner of the box, as (x, y, z).
+
+        Returns:
+            ReachableWorkspace: The restricted workspace.
+
+        Raises:
+            ValueError: If no reachable voxel overlaps the box.
+        """
+        low, high = np.asarray(low, dtype=float), np.asarray(high, dtype=float)
+        corners = self.low + np.indices(self.occupied.shape).reshape(3, -1).T * self.voxel_size
+        overlaps = np.all((corners < high) & (corners + self.voxel_size > low), axis=-1).reshape(self.occupied.shape)
+        return ReachableWorkspace(self.low, self.voxel_size, self.occupied & overlaps, bounds=(low, high))
+
+    def sample(self, rng: np.random.Generator, size: Optional[int] = None) -> np.ndarray:
+        """Sample positions uniformly in the reachable voxels.
+
+        Args:
+            rng (np.random.Generator): Random generator, e.g. the `np_random` of a task.
+            size (int, optional): Number of positions. Defaults to None, a single position.
+
+        Returns:
+            np.ndarray: The positions, as (3,), or (size, 3).
+        """
+        n = 1 if size is None else size
+        if self._cdf is None:
+            points = self._corners[rng.integers(0, self.n_voxels, size=n)] + rng.uniform(0.0, self.voxel_size, (n, 3))
+        else:
+            index = np.minimum(np.searchsorted(self._cdf, rng.random(n), side="right"), self.n_voxels - 1)
+            points = rng.uniform(self._lows[index], self._highs[index])
+        return points[0] if size is None else points
+
+    def save(self, file_name: str) -> None:
+        """Write the grid to a `.npz` file, see `load`."""
+        np.savez_compressed(file_name, low=self.low, voxel_size=self.voxel_size, occupied=self.occupied)
+
+    @classmethod
+    def load(cls, file_name: str) -> "ReachableWorkspace":
+        """Read a grid written by `save`."""
+        with np.load(file_name) as data:
+            return cls(data["low"], float(data["voxel_size"]), data["occupied"])
+
+
+def _cache_key(spec: RobotSpec, voxel_size: float, n_samples: int, seed: int) -> str:
+    digest = hashlib.sha1(os.path.abspath(spec.file_name).encode())
+    with open(spec.file_name, "rb") as file:
+        digest.update(hashlib.sha1(file.read()).digest())
+    digest.update(repr((_VERSION, spec.ee_link, spec.joint_indices.tolist(), voxel_size, n_samples, seed)).encode())
+    return digest.hexdigest()[:16]
+
+
+@functools.lru_cache(maxsize=None)
+def reachable_workspace(
+    spec: RobotSpec,
+    voxel_size: float = 0.05,
+    n_samples: int = 2_000_000,
+    seed: int = 0,
+    cache_dir: Optional[str] = None,
+) -> ReachableWorkspace:
+    """Workspace of a robot, in the frame of its base, computed once and cached on disk and in the process.
+
+    Args:
+        spec (RobotSpec): Description of the robot.
+        voxel_size (float, optional): Side of the voxels, in m. Defaults to 0.05.
+        n_samples (int, optional): Number of joint configurations. Defaults to 2000000.
+        seed (int, optional): Seed of the configurations. Defaults to 0.
+        cache_dir (str, optional): Root of the cache. Defaults to `CACHE_DIR`.
+
+    Returns:
+        ReachableWorkspace: The workspace of the end-effector, relative to the base position.
+    """
+    name = f"{spec.name}-{_cache_key(spec, voxel_size, n_samples, seed)}.npz"
+    file_name = os.path.join(cache_dir or CACHE_DIR, name)
+    if os.path.exists(file_name):
+        return ReachableWorkspace.load(file_name)
+    start = time.perf_counter()
+    chain = KinematicChain(spec.file_name, spec.ee_link, spec.joint_indices)
+    workspace = ReachableWorkspace.from_kinematics(chain, voxel_size=voxel_size, n_samples=n_samples, seed=seed)
+    logger.info("Computed the workspace of %s in %.1f s", spec.name, time.perf_counter() - start)
+    os.makedirs(os.path.dirname(file_name), exist_ok=True)
+    # written under a temporary name, then renamed, so that concurrent envs never read a partial file
+    temporary_file_name = f"{file_name}.{os.getpid()}.npz"
+    workspace.save(temporary_file_name)
+    os.replace(temporary_file_name, file_name)
+    return workspace
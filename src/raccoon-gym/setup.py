@@ -18,6 +18,8 @@ setup(
     install_requires=["gymnasium>=0.26", "pybullet", "numpy", "scipy"],
     extras_require={
         "develop": ["pytest-cov", "black", "isort", "pytype", "sphinx", "sphinx-rtd-theme"],
+        "video": ["imageio[ffmpeg]"],
+        "onnx": ["onnx", "onnxruntime"],
     },
     classifiers=[
         "License :: OSI Approved :: MIT License",
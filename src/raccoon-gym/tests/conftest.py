@@ -0,0 +1,12 @@
+import os
+
+import pytest
+
+# the URDF paths of the robot specs are relative to the root of the repository
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+
+
+@pytest.fixture
+def repo_root(monkeypatch):
+    monkeypatch.chdir(REPO_ROOT)
+    return REPO_ROOT
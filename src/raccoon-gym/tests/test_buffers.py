@@ -0,0 +1,166 @@
+import warnings
+
+import gymnasium as gym
+import numpy as np
+import pytest
+from gymnasium import spaces
+from stable_baselines3.common.vec_env import DummyVecEnv
+from stable_baselines3.her.her_replay_buffer import HerReplayBuffer
+
+from raccoon_gym.buffers import CompactHerReplayBuffer
+from raccoon_gym.utils import reach_reward
+
+OBS_DIM = 6
+N_ENVS = 2
+
+
+class _GoalEnv(gym.Env):
+    """Spaces and reward of a reach task, the buffers never step it."""
+
+    observation_space = spaces.Dict(
+        {
+            "observation": spaces.Box(-10.0, 10.0, shape=(OBS_DIM,), dtype=np.float32),
+            "achieved_goal": spaces.Box(-10.0, 10.0, shape=(3,), dtype=np.float32),
+            "desired_goal": spaces.Box(-10.0, 10.0, shape=(3,), dtype=np.float32),
+        }
+    )
+    action_space = spaces.Box(-1.0, 1.0, shape=(3,), dtype=np.float32)
+
+    def compute_reward(self, achieved_goal, desired_goal, info):
+        return reach_reward(achieved_goal, desired_goal, 0.5, "dense")
+
+
+def _make_buffers(buffer_size, goal_selection_strategy="future"):
+    env = DummyVecEnv([_GoalEnv] * N_ENVS)
+    kwargs = dict(env=env, n_envs=N_ENVS, goal_selection_strategy=goal_selection_strategy)
+    her = HerReplayBuffer(buffer_size * N_ENVS, env.observation_space, env.action_space, **kwargs)
+    compact = CompactHerReplayBuffer(buffer_size * N_ENVS, env.observation_space, env.action_space, **kwargs)
+    return her, compact
+
+
+def _rollout(rng, n_steps, lengths):
+    """Steps of N_ENVS envs with random episodes of lengths in [lengths[0], lengths[1]), as the arguments of `add`."""
+
+    def observation():
+        return rng.normal(size=OBS_DIM).astype(np.float32)
+
+    obs = [observation() for _ in range(N_ENVS)]
+    goals = [rng.normal(size=3).astype(np.float32) for _ in range(N_ENVS)]
+    remaining = rng.integers(*lengths, size=N_ENVS)
+    for _ in range(n_steps):
+        # at the end of an episode, the next observation is the last one, not the first of the next episode
+        next_obs = [observation() for _ in range(N_ENVS)]
+        remaining -= 1
+        done = remaining == 0
+        infos = [{"TimeLimit.truncated": bool(done[i] and rng.random() < 0.5)} for i in range(N_ENVS)]
+        yield (
+            {"observation": np.stack(obs), "achieved_goal": np.stack(obs)[:, :3], "desired_goal": np.stack(goals)},
+            {
+                "observation": np.stack(next_obs),
+                "achieved_goal": np.stack(next_obs)[:, :3],
+                "desired_goal": np.stack(goals),
+            },
+            rng.uniform(-1.0, 1.0, size=(N_ENVS, 3)).astype(np.float32),
+            rng.normal(size=N_ENVS).astype(np.float32),
+            done,
+            infos,
+        )
+        for i in range(N_ENVS):
+            obs[i] = next_obs[i]
+            if done[i]:
+                obs[i] = observation()
+                goals[i] = rng.normal(size=3).astype(np.float32)
+                remaining[i] = rng.integers(*lengths)
+
+
+def _assert_samples_equal(samples, expected):
+    for key in expected.observations:
+        np.testing.assert_array_equal(samples.observations[key].numpy(), expected.observations[key].numpy())
+        np.testing.assert_array_equal(samples.next_observations[key].numpy(), expected.next_observations[key].numpy())
+    for field in ("actions", "rewards", "dones"):
+        np.testing.assert_array_equal(getattr(samples, field).numpy(), getattr(expected, field).numpy())
+
+
+def _assert_buffers_match(her, compact, seed=0):
+    # same valid transitions, same real samples, and same relabeled samples for the same random goal indices
+    np.testing.assert_array_equal(compact.ep_length, her.ep_length)
+    batch_indices, env_indices = np.nonzero(her.ep_length > 0)
+    assert len(batch_indices) > 0
+    _assert_samples_equal(
+        compact._get_real_samples(batch_indices, env_indices), her._get_real_samples(batch_indices, env_indices)
+    )
+    np.random.seed(seed)
+    virtual = compact._get_virtual_samples(batch_indices, env_indices)
+    np.random.seed(seed)
+    _assert_samples_equal(virtual, her._get_virtual_samples(batch_indices, env_indices))
+
+
+@pytest.mark.parametrize("goal_selection_strategy", ["future", "final", "episode"])
+@pytest.mark.parametrize(
+    "lengths, n_steps",
+    [
+        ((3, 12), 40),  # no wrap-around
+        ((3, 12), 170),  # episodes overwritten by the wrap-around
+        ((1, 4), 45),  # more episode ends than the initial final observation pool
+        ((1, 4), 170),  # and the pool slots freed by the wrap-around
+    ],
+)
+def test_matches_her_replay_buffer(goal_selection_strategy, lengths, n_steps):
+    her, compact = _make_buffers(50, goal_selection_strategy)
+    initial_pool = len(compact.final_observations)
+    for transition in _rollout(np.random.default_rng(0), n_steps, lengths):
+        her.add(*transition)
+        compact.add(*transition)
+    _assert_buffers_match(her, compact)
+    if lengths == (1, 4):
+        # the pool grew while its slots were still used, and the moved slots kept their observations
+        assert len(compact.final_observations) > initial_pool
+
+
+def test_next_observations():
+    her, compact = _make_buffers(50)
+    for transition in _rollout(np.random.default_rng(1), 130, (3, 12)):
+        her.add(*transition)
+        compact.add(*transition)
+    batch_indices, env_indices = np.nonzero(her.ep_length > 0)
+    final = compact.final_index[batch_indices, env_indices] >= 0
+    # the next observation is in the final observation pool exactly at the end of the episodes
+    np.testing.assert_array_equal(final, her.dones[batch_indices, env_indices] > 0)
+    assert final.any() and not final.all()
+    np.testing.assert_array_equal(
+        compact._next_observations(batch_indices, env_indices),
+        her.next_observations["observation"][batch_indices, env_indices],
+    )
+
+
+def test_truncate_last_trajectory():
+    her, compact = _make_buffers(100)
+    for transition in _rollout(np.random.default_rng(2), 47, (5, 12)):
+        her.add(*transition)
+        compact.add(*transition)
+    unfinished = np.flatnonzero(compact._current_ep_start != compact.pos)
+    assert len(unfinished) > 0
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        her.truncate_last_trajectory()
+        compact.truncate_last_trajectory()
+    np.testing.assert_array_equal(compact.ep_length, her.ep_length)
+    np.testing.assert_array_equal(compact.dones, her.dones > 0)
+    np.testing.assert_array_equal(compact.timeouts, her.timeouts > 0)
+    # the last observation of a truncated episode is unknown: the one of its last transition stands in for it
+    last = compact.pos - 1
+    np.testing.assert_array_equal(
+        compact._next_observations(np.full(len(unfinished), last), unfinished), compact.observations[last, unfinished]
+    )
+
+    # the next episodes start after the truncated ones; their samples, and the ones before, match HerReplayBuffer
+    for transition in _rollout(np.random.default_rng(3), 40, (5, 12)):
+        her.add(*transition)
+        compact.add(*transition)
+    np.testing.assert_array_equal(compact.ep_length, her.ep_length)
+    batch_indices, env_indices = np.nonzero(her.ep_length > 0)
+    kept = ~((batch_indices == last) & np.isin(env_indices, unfinished))
+    _assert_samples_equal(
+        compact._get_real_samples(batch_indices[kept], env_indices[kept]),
+        her._get_real_samples(batch_indices[kept], env_indices[kept]),
+    )
@@ -0,0 +1,28 @@
+import numpy as np
+import pytest
+
+from raccoon_gym.envs.specs import ROBOT_SPECS
+from raccoon_gym.kinematics import KinematicChain
+
+
+@pytest.mark.parametrize("robot", ["Kr16", "Kr3"])
+@pytest.mark.parametrize("with_orientation", [True, False])
+def test_single_configuration_matches_batched(repo_root, robot, with_orientation):
+    # the unbatched path of a single configuration solves the same iterations as the batched one
+    spec = ROBOT_SPECS[robot]
+    chain = KinematicChain(spec.file_name, spec.ee_link, spec.joint_indices, np.array(spec.base_position))
+    rng = np.random.default_rng(0)
+    q = rng.uniform(np.maximum(chain.lower, -np.pi), np.minimum(chain.upper, np.pi), size=(20, chain.n_joints))
+    targets = chain.forward_kinematics(q)[0] + rng.normal(0.0, 0.05, size=(20, 3))
+    orientation = np.array([1.0, 0.0, 0.0, 0.0]) if with_orientation else None
+
+    jac, position, rotation = chain.jacobian(q)
+    for i in range(len(q)):
+        single_jac, single_position, single_rotation = chain._jacobian_single(q[i])
+        np.testing.assert_allclose(single_jac, jac[i], atol=1e-12)
+        np.testing.assert_allclose(single_position, position[i], atol=1e-12)
+        np.testing.assert_allclose(np.reshape(single_rotation, (3, 3)), rotation[i], atol=1e-12)
+        # batches of one, a batch iterates until all of its configurations converge
+        batched = chain.inverse_kinematics(targets[i : i + 1], q[i : i + 1], orientation=orientation)
+        single = chain.inverse_kinematics(targets[i], q[i], orientation=orientation)
+        np.testing.assert_allclose(single, batched[0], atol=1e-10)
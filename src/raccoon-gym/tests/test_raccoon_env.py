@@ -0,0 +1,37 @@
+import gymnasium as gym
+import numpy as np
+import pytest
+
+import raccoon_gym  # noqa: F401
+
+
+def _rollout(env, actions):
+    transitions = []
+    for action in actions:
+        observation, reward, terminated, truncated, _ = env.step(action)
+        transitions.append(({key: value.copy() for key, value in observation.items()}, reward, terminated, truncated))
+    return transitions
+
+
+@pytest.mark.parametrize("env_id", ["RaccoonKr16Reach-v1", "RaccoonKr16ReachJoints-v1"])
+@pytest.mark.parametrize("zero_alloc", [False, True])
+def test_restored_branch_replays(repo_root, env_id, zero_alloc):
+    env = gym.make(env_id, headless=True, terminate_on_success=False, zero_alloc=zero_alloc).unwrapped
+    actions = np.random.default_rng(0).uniform(-1.0, 1.0, size=(30, env.action_space.shape[0])).astype(np.float32)
+    env.reset(seed=0)
+    observation = _rollout(env, actions[:5])[-1][0]
+    state_id = env.save_state()
+    original = _rollout(env, actions[5:])
+    # another branch in between, so that the restored state does not follow the saved one
+    env.restore_state(state_id)
+    _rollout(env, actions[:5])
+    for _ in range(2):
+        restored_observation = env.restore_state(state_id)
+        for key, value in observation.items():
+            np.testing.assert_array_equal(restored_observation[key], value)
+        branch = _rollout(env, actions[5:])
+        for (observation_a, *rest_a), (observation_b, *rest_b) in zip(original, branch):
+            assert rest_a == rest_b
+            for key in observation_a:
+                np.testing.assert_array_equal(observation_a[key], observation_b[key])
+    env.close()
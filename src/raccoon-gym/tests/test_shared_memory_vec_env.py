@@ -0,0 +1,64 @@
+import gymnasium as gym
+import numpy as np
+import pytest
+from gymnasium import spaces
+
+from raccoon_gym.envs.shared_memory_vec_env import SharedMemoryReachVecEnv
+
+# "module:id" makes the workers import this module, which registers the env
+ENV_ID = f"{__name__}:FaultyGoal-v0"
+
+
+class FaultyGoalEnv(gym.Env):
+    """Goal env without simulation, whose step fails when the first coordinate of the action is 1."""
+
+    def __init__(self) -> None:
+        box = spaces.Box(-10.0, 10.0, shape=(3,), dtype=np.float32)
+        self.observation_space = spaces.Dict(dict(observation=box, achieved_goal=box, desired_goal=box))
+        self.action_space = spaces.Box(-1.0, 1.0, shape=(3,), dtype=np.float32)
+
+    def reset(self, seed=None, options=None):
+        super().reset(seed=seed)
+        return self.observation_space.sample(), {}
+
+    def step(self, action):
+        if action[0] == 1.0:
+            raise ValueError("step failed")
+        return self.observation_space.sample(), -1.0, False, False, {"is_success": False}
+
+
+if "FaultyGoal-v0" not in gym.registry:
+    gym.register("FaultyGoal-v0", entry_point=f"{__name__}:FaultyGoalEnv")
+
+
+@pytest.fixture
+def vec_env():
+    env = SharedMemoryReachVecEnv(ENV_ID, n_envs=2, monitor=False)
+    env.reset()
+    yield env
+    env.close()
+
+
+def test_remote_call_error_is_raised(vec_env):
+    with pytest.raises(AttributeError):
+        vec_env.env_method("does_not_exist")
+    # the workers go on
+    vec_env.step(np.zeros((2, 3), dtype=np.float32))
+    assert vec_env.env_method("get_wrapper_attr", "action_space")[0] == vec_env.action_space
+
+
+def test_step_error_is_raised(vec_env):
+    actions = np.zeros((2, 3), dtype=np.float32)
+    actions[1, 0] = 1.0
+    with pytest.raises(ValueError, match="step failed"):
+        vec_env.step(actions)
+    vec_env.step(np.zeros((2, 3), dtype=np.float32))
+
+
+def test_dead_worker_does_not_hang(vec_env):
+    vec_env.processes[0].kill()
+    vec_env.processes[0].join()
+    with pytest.raises(RuntimeError, match="died"):
+        vec_env.step(np.zeros((2, 3), dtype=np.float32))
+    vec_env.close()
+    assert all(process.exitcode is not None for process in vec_env.processes)
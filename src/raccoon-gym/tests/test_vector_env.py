@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+from raccoon_gym.envs.raccoon_env import ReachEnv
+from raccoon_gym.envs.vector_env import VectorReachEnv
+
+
+@pytest.mark.parametrize("robot", ["Kr16", "Kr3"])
+@pytest.mark.parametrize("control_type", ["ee", "joints"])
+@pytest.mark.parametrize("action_repeat", [1, 3])
+def test_matches_single_env(repo_root, robot, control_type, action_repeat):
+    kwargs = dict(control_type=control_type, headless=True, action_repeat=action_repeat, reward_aggregation="sum")
+    env = ReachEnv(robot, **kwargs)
+    envs = VectorReachEnv(robot, num_envs=2, **kwargs)
+    actions = np.random.default_rng(0).uniform(-1.0, 1.0, size=(20, env.action_space.shape[0])).astype(np.float32)
+    observation, _ = env.reset(seed=1)
+    observations, _ = envs.reset(seed=[1, 2])
+    for action in actions:
+        for key in observation:
+            np.testing.assert_allclose(observations[key][0], observation[key], atol=1e-5)
+        observation, reward, terminated, _, info = env.step(action)
+        observations, rewards, terminateds, _, infos = envs.step(np.stack([action, action]))
+        assert rewards[0] == pytest.approx(reward, abs=1e-5)
+        assert terminateds[0] == terminated
+        assert infos["is_success"][0] == info["is_success"]
+        if terminated:
+            # the copy is reset, its last observation is in the info
+            observations = {key: value[np.newaxis] for key, value in infos["final_observation"][0].items()}
+            break
+    for key in observation:
+        np.testing.assert_allclose(observations[key][0], observation[key], atol=1e-5)
+    env.close()
+    envs.close()
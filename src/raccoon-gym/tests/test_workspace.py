@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+from raccoon_gym.workspace import ReachableWorkspace
+
+
+@pytest.fixture
+def workspace():
+    # 4 x 4 x 4 voxels of 5 cm, the upper half in z is unreachable
+    occupied = np.zeros((4, 4, 4), dtype=bool)
+    occupied[:, :, :2] = True
+    return ReachableWorkspace(np.zeros(3), 0.05, occupied)
+
+
+def test_restrict_to_box_smaller_than_a_voxel(workspace):
+    # the box holds no voxel center
+    low, high = np.array([0.051, 0.051, 0.001]), np.array([0.06, 0.06, 0.01])
+    restricted = workspace.restrict(low, high)
+    assert restricted.n_voxels == 1
+    assert restricted.volume == pytest.approx(np.prod(high - low))
+    points = restricted.sample(np.random.default_rng(0), size=1000)
+    assert np.all((points >= low) & (points <= high))
+
+
+def test_restricted_samples_are_uniform_in_the_box(workspace):
+    # a quarter of the box lies in the first voxel, three quarters in the second one
+    low, high = np.array([0.04, 0.0, 0.0]), np.array([0.08, 0.05, 0.05])
+    restricted = workspace.restrict(low, high)
+    points = restricted.sample(np.random.default_rng(0), size=20_000)
+    assert np.all((points >= low) & (points <= high))
+    assert np.mean(points[:, 0] < 0.05) == pytest.approx(0.25, abs=0.02)
+
+
+def test_restrict_to_unreachable_box_raises(workspace):
+    with pytest.raises(ValueError):
+        workspace.restrict(np.array([0.0, 0.0, 0.11]), np.array([0.2, 0.2, 0.2]))